@@ -0,0 +1,113 @@
+"""
+Uji beban layanan rekomendasi HTTP (crscbr.layanan) yang sudah berjalan.
+
+Contoh:
+    python -m crscbr.layanan --port 8765 --worker 4 &
+    python -m benchmarks.beban_layanan --url http://127.0.0.1:8765 --klien 16 --permintaan 4000
+
+Setiap klien (thread, satu koneksi keep-alive) mengirim /top_k dengan profil
+preferensi acak. Dilaporkan throughput, latensi p50/p95/p99, jumlah jawaban 503
+(antrean penuh) dan statistik batch dari /status.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.hot_paths import buat_profil
+from crscbr.katalog import baca_katalog
+from crscbr.layanan import GalatLayanan, KlienLayanan
+
+
+def jalankan_beban(url, profil, klien, permintaan, k=6):
+    """
+    Kirim permintaan /top_k dari klien thread paralel; kembalikan laporan dict.
+    """
+    latensi = []
+    ditolak = [0]
+    gagal = []
+    lock = threading.Lock()
+    per_klien = [permintaan // klien + (i < permintaan % klien) for i in range(klien)]
+
+    def kerja(i):
+        kl = KlienLayanan(url)
+        lat, tolak = [], 0
+        for j in range(per_klien[i]):
+            user_input, prioritas = profil[(i * 7919 + j) % len(profil)]
+            t0 = time.perf_counter()
+            try:
+                kl.top_k(user_input, prioritas, k=k)
+                lat.append(time.perf_counter() - t0)
+            except GalatLayanan as e:
+                if e.status != 503:
+                    with lock:
+                        gagal.append(f"{e.status}: {e.pesan}")
+                tolak += 1
+        kl.tutup()
+        with lock:
+            latensi.extend(lat)
+            ditolak[0] += tolak
+
+    mulai = time.perf_counter()
+    threads = [threading.Thread(target=kerja, args=(i,)) for i in range(klien)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durasi = time.perf_counter() - mulai
+
+    lat = np.array(latensi) * 1e3
+    return {
+        "klien": klien,
+        "berhasil": len(latensi),
+        "ditolak_503": ditolak[0] - len(gagal),
+        "gagal": gagal[:10],
+        "detik": durasi,
+        "per_detik": len(latensi) / durasi if durasi else 0.0,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p95_ms": float(np.percentile(lat, 95)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban layanan rekomendasi HTTP.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--klien", default="1,4,16", help="Jumlah klien paralel, dipisah koma")
+    parser.add_argument("--permintaan", type=int, default=2000, help="Permintaan per putaran")
+    parser.add_argument("--profil", type=int, default=512, help="Jumlah profil preferensi acak berbeda")
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--final-df", default="final_df_update1.pkl", help="Sumber nilai atribut profil")
+    parser.add_argument("-o", "--output", default=None, help="Tulis laporan JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    profil = buat_profil(baca_katalog(args.final_df), args.profil)
+    laporan = {"putaran": []}
+    for klien in [int(x) for x in args.klien.split(",") if x]:
+        hasil = jalankan_beban(args.url, profil, klien, args.permintaan, k=args.top_k)
+        laporan["putaran"].append(hasil)
+        print(
+            f"{klien:>4} klien: {hasil['per_detik']:8.1f} req/s  p50 {hasil['p50_ms']:.2f} ms  "
+            f"p95 {hasil['p95_ms']:.2f} ms  p99 {hasil['p99_ms']:.2f} ms  503: {hasil['ditolak_503']}",
+            file=sys.stderr,
+        )
+    status = KlienLayanan(args.url).status()
+    laporan["status"] = status
+    statistik = status["statistik"]
+    if statistik["batch"]:
+        print(
+            f"batch: {statistik['batch']}, rata-rata {statistik['query_batch'] / statistik['batch']:.1f} query, "
+            f"terbesar {statistik['batch_terbesar']}, cache hit {status['cache']['hit_ratio']:.0%}",
+            file=sys.stderr,
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(laporan, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Benchmark jalur panas rekomendasi, filter query-based, case base dan load katalog (pickle / bundel).
+
+Contoh:
+    python -m benchmarks.hot_paths -o bench_output.json --baseline benchmarks/baseline.json
+    python -m benchmarks.hot_paths --sizes 100,10000 --case-sizes 100,10000 --simpan-baseline
+
+Hasil ditulis sebagai JSON ({nama: {"median_s": ..., "n": ..., ...}}). Kalau --baseline
+diberikan, benchmark jalur rekomendasi yang lebih lambat dari baseline x toleransi
+membuat proses keluar dengan kode 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from crscbr.ann import AnnIndex
+from crscbr.bulk_score import skor_chunk
+from crscbr.bundel import Bundel, simpan_bundel
+from crscbr.case_store import CaseStore, hitung_dari_records, parse_records
+from crscbr.engine import CaseBaseEngine, buat_user_vector_weighted, rekomendasi_cosine_weighted
+from crscbr.inkremental import SkorInkremental
+from crscbr.katalog import baca_katalog, bangun_artefak
+from crscbr.query import IndeksQuery, saring_query_based
+from crscbr.schema import muat_atau_bangun_skema
+from crscbr.sintetis import buat_case_base_sintetis, buat_katalog_sintetis, vocab_referensi
+
+
+# Benchmark yang dijaga dari regresi sebelum deploy; jalur ini wajib ada di baseline
+JALUR_REKOMENDASI = (
+    "encode_schema", "engine_top_k", "engine_rekomendasi", "ann_top_k", "refine_inkremental",
+    "query_indeks", "load_bundel", "populer_store", "bulk_score",
+)
+
+# Jalur yang diukur minimal satu putaran penuh profil (waktu per query beda jauh antar profil)
+SATU_PUTARAN = (
+    "engine_top_k", "engine_scan", "ann_top_k", "engine_rekomendasi", "refine_inkremental", "query_indeks",
+)
+
+# Skoring massal (crscbr.bulk_score) per profil minimal sekian kali lebih cepat dari
+# loop lama buat_user_vector_weighted + rekomendasi_cosine_weighted di katalog asli
+BULK_SPEEDUP_MIN = 100
+
+OPSI_ATRIBUT = [
+    "Category", "Displacement", "PowerHP", "Brand", "Transmission",
+    "ClutchType", "EngineConfig", "FuelTank", "WeightKG",
+    "FuelConsumptionKML", "Price"
+]
+
+RENTANG_NUMERIK = {
+    "Displacement": (50, 1900),
+    "PowerHP": (3, 240),
+    "FuelTank": (2, 30),
+    "WeightKG": (70, 450),
+    "FuelConsumptionKML": (10, 100),
+    "Price": (10_000_000, 1_450_000_000),
+}
+
+
+# ==========================
+# Data uji
+# ==========================
+def perbesar_katalog(final_df, n, seed=0):
+    """
+    Katalog sintetis berukuran n (lihat crscbr.sintetis) dengan kolom one-hot yang sama
+    seperti katalog asli.
+    """
+    mentah = buat_katalog_sintetis(n, final_df, seed=seed)
+    return bangun_artefak(mentah, vocab=vocab_referensi(final_df))
+
+
+def buat_profil(final_df, jumlah, seed=0):
+    """
+    Profil preferensi acak (user_input, prioritas_user) seperti hasil step_input/step_prioritas.
+    """
+    rng = random.Random(seed)
+    opsi_kategori = {a: sorted(final_df[a].unique()) for a in OPSI_ATRIBUT if a not in RENTANG_NUMERIK}
+    profil = []
+    for _ in range(jumlah):
+        attrs = rng.sample(OPSI_ATRIBUT, rng.randint(1, 5))
+        user_input = {
+            a: rng.randint(*RENTANG_NUMERIK[a]) if a in RENTANG_NUMERIK else rng.choice(opsi_kategori[a])
+            for a in attrs
+        }
+        prioritas = {a: len(attrs) - i for i, a in enumerate(attrs)}
+        profil.append((user_input, prioritas))
+    return profil
+
+
+class FakeSheet:
+    """
+    Pengganti worksheet case_base: get_all_records mengembalikan baris berformat string.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    def get_all_records(self):
+        return [dict(r) for r in self.records]
+
+
+# ==========================
+# Pengukuran
+# ==========================
+def ukur(fn, min_waktu=0.2, max_ulang=1000, min_ulang=1):
+    """
+    Jalankan fn berulang sampai min_waktu terlewati (dan minimal min_ulang kali);
+    kembalikan statistik per panggilan (detik).
+    Satu panggilan pemanasan (import lazy, cache) tidak ikut dihitung.
+    """
+    fn()
+    waktu = []
+    mulai = time.perf_counter()
+    while len(waktu) < max_ulang:
+        t0 = time.perf_counter()
+        fn()
+        waktu.append(time.perf_counter() - t0)
+        if len(waktu) >= min_ulang and time.perf_counter() - mulai > min_waktu:
+            break
+    return {
+        "median_s": statistics.median(waktu),
+        "min_s": min(waktu),
+        "ulang": len(waktu),
+    }
+
+
+def bench_katalog(final_df, n, profil, legacy_max):
+    hasil = {}
+    besar_final, besar_case, schema = perbesar_katalog(final_df, n)
+    engine = CaseBaseEngine(besar_case, besar_final, schema=schema, versi=f"bench-{n}")
+    case_matrix = besar_case.to_numpy()
+    mulai = time.perf_counter()
+    index = AnnIndex(engine)
+    hasil[f"ann_build[n={n}]"] = {"median_s": time.perf_counter() - mulai, "ulang": 1, "n": n}
+    putaran = iter(profil * 1000)
+
+    def q():
+        return next(putaran)
+
+    def encode_legacy():
+        user_input, prioritas = q()
+        buat_user_vector_weighted(user_input, prioritas, besar_case, besar_final)
+
+    def encode_schema():
+        user_input, prioritas = q()
+        schema.encode(user_input, prioritas)
+
+    # Tiap jalur skoring punya putaran sendiri atas profil yang sama (urutan sama),
+    # supaya median engine_top_k / engine_scan / ann_top_k dihitung dari query yang sama
+    vektor = [(u, *schema.encode(u, p)) for u, p in profil]
+
+    def putaran_vektor(fn):
+        putaran_vec = itertools.cycle(vektor)
+        return lambda: fn(*next(putaran_vec))
+
+    rekomendasi_legacy = putaran_vektor(
+        lambda user_input, u, w: rekomendasi_cosine_weighted(u, w, case_matrix, besar_final, user_input, top_n=6)
+    )
+    engine_top_k = putaran_vektor(lambda user_input, u, w: engine.top_k(u, w, user_input, k=6))
+    engine_scan = putaran_vektor(lambda user_input, u, w: engine.top_k(u, w, user_input, k=6, pruning=False))
+    ann_top_k = putaran_vektor(lambda user_input, u, w: index.top_k(u, w, user_input, k=6))
+    engine_rekomendasi = putaran_vektor(lambda user_input, u, w: engine.rekomendasi(u, w, user_input, top_n=6))
+
+    # Rantai refinement: tiap langkah hanya mengubah target harga profil pertama
+    user_input, prioritas = profil[0]
+    rantai = []
+    for i in range(20):
+        user_input = dict(user_input, Price=15_000_000 + (i % 10) * 5_000_000)
+        rantai.append((user_input, *schema.encode(user_input, prioritas)))
+    putaran_refine = iter(rantai * 1000)
+    sesi = SkorInkremental(engine)
+
+    def refine_inkremental():
+        user_input, u, w = next(putaran_refine)
+        sesi.top_k(u, w, user_input, k=6)
+
+    preferensi_query = [
+        {a: v for a, v in u.items() if a in ("Brand", "Category", "Transmission", "Displacement")}
+        for u, _ in profil
+    ]
+    putaran_query = iter(preferensi_query * 1000)
+
+    def query_filter():
+        saring_query_based(besar_final, next(putaran_query))
+
+    indeks_query = IndeksQuery(besar_final)
+
+    def query_indeks():
+        indeks_query.cari(next(putaran_query))
+
+    jalur = {
+        "encode_schema": encode_schema,
+        "engine_top_k": engine_top_k,
+        "engine_scan": engine_scan,
+        "engine_rekomendasi": engine_rekomendasi,
+        "ann_top_k": ann_top_k,
+        "refine_inkremental": refine_inkremental,
+        "query_filter": query_filter,
+        "query_indeks": query_indeks,
+    }
+    if n <= legacy_max:
+        jalur["encode_legacy"] = encode_legacy
+        jalur["rekomendasi_legacy"] = rekomendasi_legacy
+
+    for nama, fn in jalur.items():
+        # Jalur skoring cepat diukur minimal satu putaran penuh profil (median tidak
+        # tergantung beberapa query pertama saja di katalog besar)
+        min_ulang = len(profil) if nama in SATU_PUTARAN else 1
+        hasil[f"{nama}[n={n}]"] = dict(ukur(fn, min_ulang=min_ulang), n=n)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "final_df.pkl")
+        besar_final.to_pickle(path)
+        hasil[f"load_pickle[n={n}]"] = dict(ukur(lambda: baca_katalog(path), max_ulang=20), n=n)
+        folder = os.path.join(tmp, "katalog")
+        simpan_bundel(folder, besar_final, besar_case, schema=schema)
+        hasil[f"load_bundel[n={n}]"] = dict(ukur(lambda: Bundel.muat(folder).engine(), max_ulang=20), n=n)
+    return hasil
+
+
+def bench_case_base(final_df, n, profil, legacy_max):
+    hasil = {}
+    records = buat_case_base_sintetis(final_df, n)
+    sheet = FakeSheet(records)
+    # Separuh query identik dengan preferensi di case base, separuh profil acak
+    dikenal = [json.loads(r["user_input"]) for r in records[:len(profil)]]
+    putaran = iter([u for pasangan in zip(dikenal, (u for u, _ in profil)) for u in pasangan] * 1000)
+
+    def populer_scan():
+        user_input = next(putaran)
+        hitung_dari_records(user_input, parse_records(sheet.get_all_records()))
+
+    store = CaseStore(":memory:")
+    mulai = time.perf_counter()
+    store.tambah_banyak(records)
+    hasil[f"case_store_import[cases={n}]"] = {"median_s": time.perf_counter() - mulai, "ulang": 1, "n": n}
+
+    def populer_store():
+        user_input = next(putaran)
+        store.model_terpopuler(user_input)
+
+    if n <= legacy_max:
+        hasil[f"populer_scan[cases={n}]"] = dict(ukur(populer_scan, max_ulang=50), n=n)
+    hasil[f"populer_store[cases={n}]"] = dict(ukur(populer_store), n=n)
+    store.close()
+    return hasil
+
+
+def bench_bulk(path_final, path_case, jumlah=1024):
+    """
+    Throughput skoring massal di katalog asli: waktu per profil skor_chunk (encode batch +
+    top_k_batch + format hasil) dibanding loop per profil implementasi lama.
+    """
+    final_df = pd.read_pickle(path_final)
+    case_vector_df = pd.read_pickle(path_case)
+    schema = muat_atau_bangun_skema(path_case, case_vector_df, final_df)
+    engine = CaseBaseEngine(case_vector_df, final_df, schema=schema)
+    n = len(final_df)
+    profil = buat_profil(final_df, jumlah)
+    chunk = [(i, u, p) for i, (u, p) in enumerate(profil)]
+    batch = ukur(lambda: skor_chunk(engine, final_df, chunk, 6), max_ulang=50)
+
+    case_matrix = case_vector_df.to_numpy()
+    putaran = iter(profil * 1000)
+
+    def legacy():
+        user_input, prioritas = next(putaran)
+        u, w = buat_user_vector_weighted(user_input, prioritas, case_vector_df, final_df)
+        rekomendasi_cosine_weighted(u, w, case_matrix, final_df, user_input, top_n=6)
+
+    lama = dict(ukur(legacy, max_ulang=200), n=n)
+    per_profil = batch["median_s"] / jumlah
+    return {
+        f"bulk_legacy[n={n}]": lama,
+        f"bulk_score[n={n}]": {
+            "median_s": per_profil,
+            "min_s": batch["min_s"] / jumlah,
+            "ulang": batch["ulang"],
+            "n": n,
+            "profil": jumlah,
+            "speedup": lama["median_s"] / per_profil,
+        },
+    }
+
+
+def cek_throughput(hasil, minimal=BULK_SPEEDUP_MIN):
+    """
+    Daftar (nama, speedup) skoring massal yang di bawah minimal.
+    """
+    return [
+        (nama, data["speedup"]) for nama, data in hasil.items()
+        if nama.startswith("bulk_score") and data["speedup"] < minimal
+    ]
+
+
+def bandingkan(hasil, baseline, toleransi):
+    """
+    Daftar regresi jalur rekomendasi: (nama, median sekarang, median baseline).
+    Jalur yang belum ada di baseline juga dihitung gagal (median baseline None):
+    baseline harus dibuat ulang setiap ada jalur baru.
+    """
+    regresi = []
+    for nama, data in hasil.items():
+        if not nama.startswith(JALUR_REKOMENDASI):
+            continue
+        if nama not in baseline:
+            regresi.append((nama, data["median_s"], None))
+            continue
+        lama = baseline[nama]["median_s"]
+        if data["median_s"] > lama * toleransi:
+            regresi.append((nama, data["median_s"], lama))
+    return regresi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas sistem rekomendasi.")
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--sizes", default="100,10000,1000000", help="Ukuran katalog, dipisah koma")
+    parser.add_argument("--case-sizes", default="100,10000,1000000", help="Ukuran case base, dipisah koma")
+    parser.add_argument("--legacy-max", type=int, default=1_000_000,
+                        help="Lewati implementasi lama (pandas/scan) di atas ukuran ini")
+    parser.add_argument("--baseline", default=None, help="File JSON baseline untuk deteksi regresi")
+    parser.add_argument("--toleransi", type=float, default=1.5, help="Batas rasio terhadap baseline")
+    parser.add_argument("--simpan-baseline", action="store_true",
+                        help="Tulis hasil ke benchmarks/baseline.json")
+    parser.add_argument("--final-df", default="final_df_update1.pkl")
+    parser.add_argument("--case-vector-df", default="case_vector_df_update1.pkl")
+    args = parser.parse_args(argv)
+
+    final_df = baca_katalog(args.final_df)
+    profil = buat_profil(final_df, 64)
+
+    hasil = {}
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        print(f"katalog n={n} ...", file=sys.stderr)
+        hasil.update(bench_katalog(final_df, n, profil, args.legacy_max))
+    for n in [int(x) for x in args.case_sizes.split(",") if x]:
+        print(f"case base n={n} ...", file=sys.stderr)
+        hasil.update(bench_case_base(final_df, n, profil, args.legacy_max))
+    print("skoring massal ...", file=sys.stderr)
+    hasil.update(bench_bulk(args.final_df, args.case_vector_df))
+
+    laporan = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "mesin": platform.machine(),
+            "waktu": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "hasil": hasil,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(laporan, f, indent=2)
+    if args.simpan_baseline:
+        with open(os.path.join(os.path.dirname(__file__), "baseline.json"), "w", encoding="utf-8") as f:
+            json.dump(laporan, f, indent=2)
+
+    for nama, data in hasil.items():
+        print(f"{nama:45s} {data['median_s'] * 1e3:12.4f} ms", file=sys.stderr)
+
+    lambat = cek_throughput(hasil)
+    for nama, speedup in lambat:
+        print(f"THROUGHPUT {nama}: {speedup:.0f}x dari loop lama (minimal {BULK_SPEEDUP_MIN}x)", file=sys.stderr)
+    if lambat:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["hasil"]
+        regresi = bandingkan(hasil, baseline, args.toleransi)
+        for nama, sekarang, lama in regresi:
+            if lama is None:
+                print(f"REGRESI {nama}: tidak ada di baseline (buat ulang dengan --simpan-baseline)", file=sys.stderr)
+            else:
+                print(f"REGRESI {nama}: {sekarang * 1e3:.4f} ms (baseline {lama * 1e3:.4f} ms)", file=sys.stderr)
+        if regresi:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+# Ekspor paket dimuat lazy (PEP 562): `import crscbr.startup` / `crscbr.sheets_client`
+# tidak ikut memuat numpy lewat engine.
+_EKSPOR = {
+    "CaseBaseEngine": "crscbr.engine",
+    "buat_user_vector_weighted": "crscbr.engine",
+    "rekomendasi_cosine_weighted": "crscbr.engine",
+    "FeatureSchema": "crscbr.schema",
+    "muat_atau_bangun_skema": "crscbr.schema",
+    "path_skema": "crscbr.schema",
+}
+
+__all__ = list(_EKSPOR)
+
+
+def __getattr__(nama):
+    if nama not in _EKSPOR:
+        raise AttributeError(f"module 'crscbr' has no attribute {nama!r}")
+    import importlib
+
+    nilai = getattr(importlib.import_module(_EKSPOR[nama]), nama)
+    globals()[nama] = nilai
+    return nilai
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
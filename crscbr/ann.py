@@ -0,0 +1,238 @@
+import numpy as np
+
+from crscbr.engine import PENALTI_NUMERIK, SLACK, target_penalti, urutkan_top_k
+from crscbr.schema import KOLOM_KATEGORIKAL
+from crscbr.sparse import gabung_rentang
+
+
+# Katalog sebesar ini ke atas memakai AnnIndex untuk top_k kalau diaktifkan (registry
+# ann_min_baris): di 1 juta baris ~2 ms per query vs ~45 ms pruning posting list,
+# dengan biaya salinan blok skoring (terurut per bucket) dan beberapa detik build
+ANN_MIN_BARIS = 200_000
+
+
+# ==========================
+# Indeks top-k berbobot untuk katalog besar
+# ==========================
+class AnnIndex:
+    """
+    Indeks top-k untuk CaseBaseEngine dengan katalog berukuran besar.
+
+    Baris dikelompokkan dulu per kombinasi kategori (Brand, Category, ...), lalu
+    tiap kelompok dipecah median per kolom numerik (kd-tree) sampai ukuran bucket.
+    Setiap bucket menyimpan kotak min/max per kolom, sehingga untuk weight_vec
+    apa pun bisa dihitung batas atas FinalScore (cosine berbobot - penalti minimum).
+
+    Query memeriksa bucket dari batas atas tertinggi, menghitung skor persis untuk
+    barisnya (re-rank + penalti), dan berhenti begitu batas atas bucket berikutnya
+    di bawah skor ke-k. Dengan toleransi=0 hasilnya sama dengan engine.top_k
+    (sampai pembulatan float32); toleransi > 0 atau maks_kandidat memangkas lebih
+    banyak bucket dengan jaminan skor yang hilang paling banyak selisih toleransi.
+    """
+
+    def __init__(self, engine, ukuran_bucket=256):
+        self.engine = engine
+        self.ukuran_bucket = ukuran_bucket
+        # Matriks dense hanya dibentuk sementara untuk menghitung kotak bucket
+        matrix = engine.matriks_dense()
+        n = matrix.shape[0]
+
+        urutan, starts = self._bangun_bucket(matrix, engine.schema, ukuran_bucket)
+        ends = np.append(starts[1:], n)
+        self.urutan = urutan
+
+        terurut = matrix[urutan]
+        lo = np.minimum.reduceat(terurut, starts, axis=0).astype(np.float64)
+        hi = np.maximum.reduceat(terurut, starts, axis=0).astype(np.float64)
+        del matrix, terurut
+        # Blok CSR/dense engine dengan baris terurut per bucket (bucket = potongan kontigu)
+        self.blok = engine.permutasi(urutan)
+        min_row = np.minimum.reduceat(urutan, starts)
+
+        # Metadata bucket diurutkan menurut baris asli terkecil, supaya argsort stabil
+        # atas batas atas otomatis mendahulukan bucket yang menang saat skor seri
+        urut_bucket = np.argsort(min_row, kind="stable")
+        self.starts = starts[urut_bucket]
+        self.ends = ends[urut_bucket]
+        self.ukuran = self.ends - self.starts
+        self.min_row = min_row[urut_bucket]
+        self.lo = np.asfortranarray(lo[urut_bucket])
+        self.hi = np.asfortranarray(hi[urut_bucket])
+        # Matriks hasil MinMaxScaler/one-hot tidak pernah negatif; batas atas bisa disederhanakan
+        self.nonnegatif = bool(n == 0 or self.lo.min() >= 0)
+
+        self.numerik_lo = {}
+        self.numerik_hi = {}
+        for kolom, _, _ in PENALTI_NUMERIK:
+            nilai = self.blok.numerik[kolom]
+            self.numerik_lo[kolom] = np.minimum.reduceat(nilai, starts)[urut_bucket]
+            self.numerik_hi[kolom] = np.maximum.reduceat(nilai, starts)[urut_bucket]
+
+        self.statistik_terakhir = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    @staticmethod
+    def _bangun_bucket(matrix, schema, ukuran_bucket):
+        """
+        Kembalikan (urutan baris, indeks awal tiap bucket).
+        """
+        n = matrix.shape[0]
+
+        # Kode kategori per atribut (0 = tidak ada kolom one-hot yang aktif)
+        kode = []
+        for attr in KOLOM_KATEGORIKAL:
+            cols = sorted(schema.vocab.get(attr, {}).values())
+            if not cols:
+                continue
+            blok = matrix[:, cols]
+            kode.append(np.where(blok.max(axis=1) > 0, blok.argmax(axis=1) + 1, 0))
+        if kode:
+            kode = np.stack(kode)
+            urutan = np.lexsort(kode[::-1]).astype(np.int64)
+            terurut = kode[:, urutan]
+            beda = np.flatnonzero((terurut[:, 1:] != terurut[:, :-1]).any(axis=0)) + 1
+        else:
+            urutan = np.arange(n, dtype=np.int64)
+            beda = np.empty(0, dtype=np.int64)
+        batas = np.concatenate([[0], beda, [n]])
+
+        # Pecah tiap kelompok kategori berdasarkan median kolom numerik dengan sebaran terbesar
+        kolom_numerik = sorted(idx for idx, _, _ in schema.numerik.values())
+        numerik = np.ascontiguousarray(matrix[:, kolom_numerik]) if kolom_numerik else None
+        starts = []
+        tumpukan = [(int(s), int(e)) for s, e in zip(batas[:-1][::-1], batas[1:][::-1])]
+        while tumpukan:
+            s, e = tumpukan.pop()
+            if e - s <= ukuran_bucket or numerik is None:
+                starts.append(s)
+                continue
+            seg = urutan[s:e]
+            x = numerik[seg]
+            sebaran = x.max(axis=0) - x.min(axis=0)
+            dim = int(sebaran.argmax())
+            if sebaran[dim] == 0:
+                starts.append(s)  # semua baris identik, tidak bisa dipecah lagi
+                continue
+            tengah = (e - s) // 2
+            urutan[s:e] = seg[np.argpartition(x[:, dim], tengah)]
+            tumpukan.append((s + tengah, e))
+            tumpukan.append((s, s + tengah))
+        return urutan, np.array(sorted(starts), dtype=np.int64)
+
+    def batas_atas(self, user_vec, weight_vec, user_input):
+        """
+        Batas atas FinalScore per bucket untuk query ini (None kalau query tanpa bobot).
+        """
+        aktif = np.flatnonzero(weight_vec)
+        w2 = weight_vec[aktif] ** 2
+        uw2 = user_vec[aktif] * w2
+        user_norm = float(np.sqrt(np.dot(user_vec[aktif] ** 2, w2)))
+        if aktif.size == 0 or user_norm == 0.0:
+            return None
+
+        lo = self.lo[:, aktif]
+        hi = self.hi[:, aktif]
+        if self.nonnegatif:
+            positif = uw2 >= 0
+            num_max = hi[:, positif] @ uw2[positif] + lo[:, ~positif] @ uw2[~positif]
+            den_min = np.sqrt((lo * lo) @ w2) * user_norm
+            den_max = np.sqrt((hi * hi) @ w2) * user_norm
+        else:
+            num_max = np.where(uw2 >= 0, hi, lo) @ uw2
+            abs_lo = np.where(lo > 0, lo, np.where(hi < 0, -hi, 0.0))
+            abs_hi = np.maximum(np.abs(lo), np.abs(hi))
+            den_min = np.sqrt((abs_lo ** 2) @ w2) * user_norm
+            den_max = np.sqrt((abs_hi ** 2) @ w2) * user_norm
+
+        # num_max = 0 berarti dot product maksimum 0, similarity paling tinggi 0
+        bound = np.where(num_max > 0, 1.0, 0.0)
+        np.divide(num_max, den_min, out=bound, where=(num_max > 0) & (den_min > 0))
+        negatif = num_max < 0
+        np.divide(num_max, den_max, out=bound, where=negatif & (den_max > 0))
+        bound = np.minimum(bound, 1.0)
+        # Baris dengan norma nol mendapat similarity 0
+        bound = np.where(den_min == 0, np.maximum(bound, 0.0), bound)
+
+        targets = target_penalti(user_input)
+        for kolom, koef, skala in PENALTI_NUMERIK:
+            if kolom not in targets:
+                continue
+            t = targets[kolom]
+            jarak = np.maximum(0.0, np.maximum(t - self.numerik_hi[kolom], self.numerik_lo[kolom] - t))
+            bound -= (koef / skala) * jarak
+        return bound + SLACK
+
+    def _skor_baris(self, posisi, user_vec, weight_vec, user_input):
+        return self.blok.skor(user_vec, weight_vec, user_input, indeks=posisi)
+
+    def top_k(self, user_vec, weight_vec, user_input, k=6, toleransi=0.0, maks_kandidat=None):
+        """
+        Kembalikan (indeks baris asli, FinalScore, Similarity) seperti engine.top_k.
+
+        toleransi: bucket dengan batas atas < skor ke-k + toleransi dilewati.
+        maks_kandidat: berhenti setelah kira-kira sekian baris dihitung skornya.
+        """
+        user_vec = np.asarray(user_vec, dtype=np.float64)
+        weight_vec = np.asarray(weight_vec, dtype=np.float64)
+        bound = self.batas_atas(user_vec, weight_vec, user_input)
+        if bound is None:
+            self.statistik_terakhir = {"bucket": len(self), "baris": len(self.engine)}
+            return self.engine.top_k(user_vec, weight_vec, user_input, k=k, pruning=False)
+
+        k = min(k, len(self.engine))
+
+        best_idx = np.empty(0, dtype=np.int64)
+        best_final = np.empty(0)
+        best_sim = np.empty(0)
+        diperiksa = np.zeros(len(self), dtype=bool)
+        diskor = 0
+        target_baris = max(8 * k, 2 * self.ukuran_bucket)
+
+        # Putaran pertama: bucket dengan batas atas tertinggi (argpartition, tanpa sort penuh)
+        m = min(len(self), -(-target_baris // self.ukuran_bucket))
+        leaf = np.argpartition(-bound, m - 1)[:m] if m < len(self) else np.arange(len(self))
+
+        while True:
+            diperiksa[leaf] = True
+            posisi = gabung_rentang(self.starts[leaf], self.ends[leaf])
+            final, sim = self._skor_baris(posisi, user_vec, weight_vec, user_input)
+            diskor += len(posisi)
+
+            idx = np.concatenate([best_idx, self.urutan[posisi]])
+            final = np.concatenate([best_final, final])
+            sim = np.concatenate([best_sim, sim])
+            urut = urutkan_top_k(final, k, indeks=idx)
+            best_idx, best_final, best_sim = idx[urut], final[urut], sim[urut]
+
+            if maks_kandidat is not None and diskor >= maks_kandidat:
+                break
+
+            # Bucket yang masih mungkin mengalahkan skor ke-k
+            if len(best_idx) >= k:
+                kth = best_final[k - 1]
+                sisa = np.flatnonzero((bound >= kth + toleransi) & ~diperiksa)
+                # Seri: bound sudah memuat margin SLACK, jadi bucket dengan bound <= skor ke-k
+                # paling tinggi menyamai skor itu, dan kalah kalau semua barisnya berindeks lebih besar
+                seri = (bound[sisa] <= kth) & (self.min_row[sisa] > best_idx[k - 1])
+                sisa = sisa[~seri]
+            else:
+                sisa = np.flatnonzero(~diperiksa)
+            if len(sisa) == 0:
+                break
+
+            sisa = sisa[np.argsort(-bound[sisa], kind="stable")]
+            target_baris *= 2
+            ambil = int(np.searchsorted(np.cumsum(self.ukuran[sisa]), target_baris, side="left")) + 1
+            leaf = sisa[:ambil]
+
+        self.statistik_terakhir = {"bucket": int(diperiksa.sum()), "baris": diskor}
+        return best_idx, best_final, best_sim
+
+    def rekomendasi(self, user_vec, weight_vec, user_input, top_n=6, **kwargs):
+        """
+        Sama seperti engine.rekomendasi, tapi kandidat diambil lewat indeks.
+        """
+        idx, final, sim = self.top_k(user_vec, weight_vec, user_input, k=top_n, **kwargs)
+        return self.engine.materialisasi(idx, final, sim, user_input)
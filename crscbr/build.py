@@ -0,0 +1,223 @@
+"""
+Pipeline build katalog offline: data_motor_excel_*.xlsx -> artefak engine.
+
+Contoh:
+    python -m crscbr.build data_motor_excel_update1.xlsx --nama update1 --bundel
+
+Menulis final_df_<nama>.pkl, case_vector_df_<nama>.pkl, feature_schema_<nama>.json
+(dan bundel katalog_<nama>/ dengan --bundel), plus state build_<nama>.json.
+
+Setiap baris input di-hash isinya. Kalau vocab kategori dan batas min-max
+normalisasi sama dengan build sebelumnya, hanya baris yang baru/berubah yang
+di-encode ulang; baris lain memakai case vector lama. Artefak lama hanya dipakai
+kalau ukuran/mtime file-nya masih sama dengan yang tercatat di state.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from crscbr.bundel import bundel_segar, simpan_bundel
+from crscbr.engine import sidik_katalog
+from crscbr.katalog import baca_katalog, bangun_artefak, encode_case_vector, statistik_numerik, vocab_katalog
+from crscbr.schema import FeatureSchema
+
+
+VERSI_STATE = 1
+
+
+def hash_baris(df):
+    """
+    Hash isi tiap baris (uint64), tidak bergantung pada index.
+    """
+    return pd.util.hash_pandas_object(df.reset_index(drop=True), index=False).to_numpy()
+
+
+def sidik_file(path):
+    """
+    Sidik murah file artefak (ukuran + mtime); isi katalog sendiri diwakili
+    versi (hash case vector) dan hash_katalog (hash baris input) di state.
+    """
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def cari_hash(kunci, hashes):
+    """
+    Untuk tiap hash di hashes: posisi pertama di kunci, atau -1 kalau tidak ada.
+    Baris yang posisinya tidak bergeser langsung cocok; sisanya dicari lewat
+    searchsorted dengan kedua sisi terurut (akses memori berurutan).
+    """
+    hasil = np.full(len(hashes), -1, dtype=np.int64)
+    m = min(len(kunci), len(hashes))
+    tetap = np.flatnonzero(kunci[:m] == hashes[:m])
+    hasil[tetap] = tetap
+    sisa = np.flatnonzero(hasil < 0)
+    if len(sisa) == 0 or len(kunci) == 0:
+        return hasil
+
+    urutan = np.argsort(kunci, kind="stable")
+    terurut = kunci[urutan]
+    cari = sisa[np.argsort(hashes[sisa])]
+    pos = np.minimum(np.searchsorted(terurut, hashes[cari]), len(terurut) - 1)
+    ada = terurut[pos] == hashes[cari]
+    hasil[cari[ada]] = urutan[pos[ada]]
+    return hasil
+
+
+def _simpan_npy(path, arr):
+    with open(path, "wb") as f:  # lewat file handle supaya np.save tidak menambah akhiran .npy
+        np.save(f, arr)
+
+
+def _tulis_atomik(path, tulis):
+    sementara = f"{path}.tmp"
+    tulis(sementara)
+    os.replace(sementara, path)
+
+
+# ==========================
+# State build sebelumnya
+# ==========================
+def path_artefak(out_dir, nama):
+    return {
+        "final_df": os.path.join(out_dir, f"final_df_{nama}.pkl"),
+        "case_vector_df": os.path.join(out_dir, f"case_vector_df_{nama}.pkl"),
+        "schema": os.path.join(out_dir, f"feature_schema_{nama}.json"),
+        "hash": os.path.join(out_dir, f"build_{nama}_hash.npy"),
+        "state": os.path.join(out_dir, f"build_{nama}.json"),
+        "bundel": os.path.join(out_dir, f"katalog_{nama}"),
+    }
+
+
+def muat_state(out_dir, nama):
+    """
+    State build terakhir, atau None kalau tidak ada / artefaknya sudah tidak cocok.
+    """
+    path = path_artefak(out_dir, nama)
+    try:
+        with open(path["state"], encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("versi_state") != VERSI_STATE:
+        return None
+    for kunci, sidik in state["artefak"].items():
+        if not os.path.exists(path[kunci]) or sidik_file(path[kunci]) != sidik:
+            return None
+    return state
+
+
+# ==========================
+# Build
+# ==========================
+def bangun_katalog(df, out_dir, nama, penuh=False, bundel=False):
+    """
+    Bangun (atau perbarui) artefak engine dari katalog mentah df.
+    Kembalikan laporan {"mode", "baris", "diencode", "dihapus", "versi", "detik"}.
+    """
+    mulai = time.perf_counter()
+    df = df.reset_index(drop=True)
+    path = path_artefak(out_dir, nama)
+    hashes = hash_baris(df)
+    hash_katalog = hashlib.sha1(hashes.tobytes()).hexdigest()[:12]
+    vocab = {attr: [str(v) for v in nilai] for attr, nilai in vocab_katalog(df).items()}
+    stats = statistik_numerik(df)
+
+    sumber = (path["final_df"], path["case_vector_df"], path["schema"])
+    lama = None if penuh else muat_state(out_dir, nama)
+    bisa_inkremental = (
+        lama is not None
+        and lama["kolom_mentah"] == list(df.columns)
+        and lama["vocab"] == vocab
+        and {a: tuple(v) for a, v in lama["stats"].items()} == stats
+    )
+
+    laporan = {"baris": len(df), "dihapus": 0}
+    if bisa_inkremental and lama["hash_katalog"] == hash_katalog:
+        laporan.update(mode="tidak_berubah", diencode=0, versi=lama["versi"])
+        if bundel and not bundel_segar(path["bundel"], sumber):
+            final_df = pd.read_pickle(path["final_df"])
+            case_vector_df = pd.read_pickle(path["case_vector_df"])
+            simpan_bundel(path["bundel"], final_df, case_vector_df, FeatureSchema.muat(path["schema"]), sumber=sumber)
+        laporan["detik"] = time.perf_counter() - mulai
+        return laporan
+
+    if bisa_inkremental:
+        # Petakan baris ke case vector lama lewat hash isi; sisanya di-encode ulang
+        hash_lama = np.load(path["hash"])
+        case_lama = pd.read_pickle(path["case_vector_df"])
+        asal = cari_hash(hash_lama, hashes)
+        ada = asal >= 0
+
+        matrix = np.empty((len(df), case_lama.shape[1]))
+        matrix[ada] = case_lama.to_numpy()[asal[ada]]
+        baru = np.flatnonzero(~ada)
+        if len(baru):
+            matrix[baru] = encode_case_vector(df.iloc[baru], vocab, stats).to_numpy()
+        case_vector_df = pd.DataFrame(matrix, columns=case_lama.columns, copy=False)
+        final_df = pd.concat([df, case_vector_df], axis=1)
+        schema = FeatureSchema.dari_kolom(case_vector_df.columns, stats)
+        laporan.update(
+            mode="inkremental",
+            diencode=len(baru),
+            dihapus=int((cari_hash(hashes, hash_lama) < 0).sum()),
+        )
+    else:
+        final_df, case_vector_df, schema = bangun_artefak(df, vocab=vocab, stats=stats)
+        laporan.update(mode="penuh", diencode=len(df))
+
+    versi = sidik_katalog(case_vector_df.to_numpy(dtype=np.float32), list(case_vector_df.columns))
+    os.makedirs(out_dir, exist_ok=True)
+    _tulis_atomik(path["final_df"], lambda p: final_df.to_pickle(p, compression=None))
+    _tulis_atomik(path["case_vector_df"], lambda p: case_vector_df.to_pickle(p, compression=None))
+    _tulis_atomik(path["schema"], schema.simpan)
+    _tulis_atomik(path["hash"], lambda p: _simpan_npy(p, hashes))
+    if bundel:
+        simpan_bundel(path["bundel"], final_df, case_vector_df, schema, sumber=sumber)
+
+    state = {
+        "versi_state": VERSI_STATE,
+        "versi": versi,
+        "hash_katalog": hash_katalog,
+        "kolom_mentah": list(df.columns),
+        "vocab": vocab,
+        "stats": {a: list(v) for a, v in stats.items()},
+        "artefak": {k: sidik_file(path[k]) for k in ("final_df", "case_vector_df", "schema", "hash")},
+    }
+
+    def tulis_state(p):
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+
+    _tulis_atomik(path["state"], tulis_state)
+    laporan["versi"] = versi
+    laporan["detik"] = time.perf_counter() - mulai
+    return laporan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build artefak engine dari katalog xlsx/pkl.")
+    parser.add_argument("input", help="data_motor_excel_*.xlsx (atau .pkl katalog mentah)")
+    parser.add_argument("--nama", required=True, help="Akhiran nama artefak, misal update1")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--penuh", action="store_true", help="Abaikan build sebelumnya, encode ulang semua baris")
+    parser.add_argument("--bundel", action="store_true", help="Tulis juga bundel katalog_<nama>/")
+    args = parser.parse_args(argv)
+
+    laporan = bangun_katalog(baca_katalog(args.input), args.out_dir, args.nama, penuh=args.penuh, bundel=args.bundel)
+    print(
+        f"{laporan['mode']}: {laporan['baris']} motor, {laporan['diencode']} di-encode, "
+        f"{laporan['dihapus']} dihapus, versi {laporan['versi']} ({laporan['detik']:.2f} s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Skoring massal profil preferensi (user_input + prioritas_user) dari file CSV/JSONL.
+
+Contoh:
+    python -m crscbr.bulk_score profil.jsonl -o hasil.jsonl --top-k 6 --chunk 2048
+
+Format input:
+- JSONL: satu objek per baris, {"user_input": {...}, "prioritas_user": {...}, "id": ...}
+- CSV: kolom user_input dan prioritas_user berisi string JSON (seperti sheet case_base),
+  kolom case_id/id opsional.
+
+File dibaca per chunk sehingga memori tetap terbatas berapapun jumlah profilnya.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+import pandas as pd
+
+from crscbr.engine import CaseBaseEngine
+from crscbr.schema import muat_atau_bangun_skema
+
+
+def baca_profil(path):
+    """
+    Generator profil (id, user_input, prioritas_user) dari file CSV atau JSONL.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for i, row in enumerate(csv.DictReader(f)):
+                yield (
+                    row.get("case_id") or row.get("id") or i,
+                    json.loads(row["user_input"]),
+                    json.loads(row.get("prioritas_user") or "{}"),
+                )
+        else:
+            for i, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                data = json.loads(line)
+                yield (
+                    data.get("id", data.get("case_id", i)),
+                    data["user_input"],
+                    data.get("prioritas_user", {}),
+                )
+
+
+def skor_chunk(engine, final_df, chunk, top_k):
+    """
+    Skor satu chunk profil sekaligus dan kembalikan list record hasil.
+    """
+    ids = [c[0] for c in chunk]
+    daftar_input = [c[1] for c in chunk]
+    daftar_prioritas = [c[2] for c in chunk]
+
+    user_matrix, weight_matrix = engine.schema.encode_batch(daftar_input, daftar_prioritas)
+    idx, final, sim = engine.top_k_batch(user_matrix, weight_matrix, daftar_input, k=top_k)
+
+    # Hanya baris hasil yang dibaca (kolom Model bundel besar didekode per baris)
+    model = final_df["Model"].iloc[idx.ravel()].to_numpy().reshape(idx.shape)
+    hasil = []
+    for q, id_ in enumerate(ids):
+        hasil.append({
+            "id": id_,
+            "indeks": idx[q].tolist(),
+            "models": [str(m) for m in model[q]],
+            "final_score": final[q].round(6).tolist(),
+            "similarity": sim[q].round(6).tolist(),
+        })
+    return hasil
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skoring massal profil preferensi dengan CaseBaseEngine.")
+    parser.add_argument("input", help="File profil (.jsonl atau .csv)")
+    parser.add_argument("-o", "--output", default="-", help="File JSONL hasil (default: stdout)")
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--chunk", type=int, default=1024, help="Jumlah profil per batch")
+    parser.add_argument("--final-df", default="final_df_update1.pkl")
+    parser.add_argument("--case-vector-df", default="case_vector_df_update1.pkl")
+    args = parser.parse_args(argv)
+
+    final_df = pd.read_pickle(args.final_df)
+    case_vector_df = pd.read_pickle(args.case_vector_df)
+    schema = muat_atau_bangun_skema(args.case_vector_df, case_vector_df, final_df)
+    engine = CaseBaseEngine(case_vector_df, final_df, schema=schema)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    total = 0
+    mulai = time.perf_counter()
+    try:
+        profil = baca_profil(args.input)
+        while True:
+            chunk = list(islice(profil, args.chunk))
+            if not chunk:
+                break
+            for record in skor_chunk(engine, final_df, chunk, args.top_k):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            total += len(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    durasi = time.perf_counter() - mulai
+    print(f"{total} profil diskor dalam {durasi:.2f} detik "
+          f"({total / durasi if durasi else 0:.0f} profil/detik)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+"""
+Bundel katalog: folder berisi kolom .npy + manifest.json, pengganti read_excel + pickle saat start.
+
+Contoh:
+    python -m crscbr.bundel final_df_update1.pkl case_vector_df_update1.pkl -o katalog_update1
+
+Isi folder:
+    manifest.json       format, versi isi katalog, skema fitur, daftar kolom dan file,
+                        sidik file sumber (pickle/skema) untuk cek kesegaran
+    fitur.npy           case_vector_df (n x D float64)
+    kolom_<i>.npy       kolom mentah final_df; kolom string disimpan sebagai kode
+                        kamus (int), kamusnya di kategori_<i>.npy (UTF-8, lebar tetap)
+    dense.npy, onehot_*.npy, posting.npy, penalti.npy, ...
+                        blok siap pakai CaseBaseEngine (CSR one-hot, dense numerik,
+                        bitset posting list, kolom penalti)
+    pemakai/            satu file lease per proses yang sedang memakai bundel
+
+Semua file dibuka dengan np.load(mmap_mode="r") saat bundel dibuka: start hampir
+instan, halaman dibaca sesuai kebutuhan dan dibagi antar proses (worker
+Streamlit, layanan) oleh OS. Memori anonim per worker tetap kecil karena kolom
+string berkardinalitas tinggi (Model) tidak didekode di muka (crscbr.kamus); di
+katalog sintetis 1 juta baris sekitar 14 MB setelah engine + satu rekomendasi.
+Untuk menyimpan halaman di RAM sejak awal, taruh bundel di tmpfs (misal /dev/shm).
+Modul ini tidak mengimpor openpyxl.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from crscbr.engine import PENALTI_NUMERIK, CaseBaseEngine
+from crscbr.kamus import KolomKamus
+from crscbr.schema import FeatureSchema, muat_atau_bangun_skema, path_skema
+
+
+FORMAT_BUNDEL = "crscbr-katalog"
+VERSI_FORMAT = 2
+VERSI_BISA_DIBACA = (1, 2)  # format 1: daftar kategori langsung di manifest
+NAMA_MANIFEST = "manifest.json"
+DIR_PEMAKAI = "pemakai"
+
+# Kolom string dengan kategori sebanyak ini atau lebih (misal Model di katalog besar)
+# tidak dijadikan Categorical, tapi KolomKamus yang hanya mendekode baris yang dibaca
+KAMUS_LAZY_MIN = 10_000
+
+# Versi aktif (isi file penunjuk) dan versi bawaan tidak pernah dihapus --bersihkan
+PENUNJUK_BAWAAN = "katalog_aktif.txt"
+VERSI_BAWAAN = "update1"
+
+# Bundel yang sedang terbuka di proses ini, supaya pemuatan ulang versi yang sama
+# memakai mapping yang sama (kunci: path, inode manifest)
+_TERBUKA = weakref.WeakValueDictionary()
+
+
+def _simpan_array(folder, nama, arr, daftar_file):
+    file = f"{nama}.npy"
+    np.save(os.path.join(folder, file), arr)
+    daftar_file[nama] = {"file": file, "dtype": str(arr.dtype), "shape": list(arr.shape)}
+
+
+def _dtype_kode(jumlah):
+    for dtype in (np.int8, np.int16, np.int32):
+        if jumlah < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 20), b""):
+            h.update(blok)
+    return h.hexdigest()
+
+
+def sidik_sumber(path):
+    """
+    Sidik file sumber bundel: ukuran, mtime dan sha256 isi (mtime saja tidak cukup
+    karena berubah setiap checkout git).
+    """
+    st = os.stat(path)
+    return {"ukuran": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(path)}
+
+
+def bundel_segar(path, sumber):
+    """
+    True kalau bundel path dibangun dari file sumber yang ada sekarang. File sumber
+    yang tidak ada diabaikan (deploy hanya bundel); kalau ada file sumber yang tidak
+    tercatat atau isinya berbeda, bundel dianggap usang. Hash hanya dihitung kalau
+    ukuran sama tapi mtime berbeda.
+    """
+    ada = [p for p in sumber if os.path.exists(p)]
+    try:
+        with open(os.path.join(path, NAMA_MANIFEST), encoding="utf-8") as f:
+            catatan = json.load(f).get("sumber") or {}
+    except FileNotFoundError:
+        return False
+    for p in ada:
+        sidik = catatan.get(os.path.basename(p))
+        if sidik is None:
+            return False
+        st = os.stat(p)
+        if st.st_size != sidik["ukuran"]:
+            return False
+        if st.st_mtime_ns != sidik["mtime_ns"] and _sha256(p) != sidik["sha256"]:
+            return False
+    return True
+
+
+# ==========================
+# Tulis bundel
+# ==========================
+def simpan_bundel(path, final_df, case_vector_df, schema=None, sumber=()):
+    """
+    Tulis bundel katalog ke folder path (ditulis ke folder sementara dulu, lalu
+    menggantikan bundel lama). sumber: path file asal final_df/case_vector_df/skema,
+    sidiknya dicatat di manifest (lihat bundel_segar). Kembalikan manifest.
+    """
+    engine = CaseBaseEngine(case_vector_df, final_df, schema=schema)
+    kolom_fitur = list(case_vector_df.columns)
+    fitur = set(kolom_fitur)
+
+    sementara = f"{path}.tmp"
+    shutil.rmtree(sementara, ignore_errors=True)
+    os.makedirs(sementara)
+    daftar_file = {}
+
+    # Kolom mentah final_df (di luar case vector)
+    kolom = []
+    for i, nama in enumerate(c for c in final_df.columns if c not in fitur):
+        seri = final_df[nama]
+        spek = {"nama": nama, "array": f"kolom_{i}"}
+        if pd.api.types.is_numeric_dtype(seri) and not pd.api.types.is_bool_dtype(seri):
+            spek["jenis"] = "numerik"
+            _simpan_array(sementara, spek["array"], seri.to_numpy(), daftar_file)
+        else:
+            kode, kategori = pd.factorize(seri, sort=True)
+            spek["jenis"] = "kategori"
+            spek["kategori"] = f"kategori_{i}"
+            _simpan_array(sementara, spek["array"], kode.astype(_dtype_kode(len(kategori))), daftar_file)
+            teks = np.array([str(k).encode("utf-8") for k in kategori], dtype=bytes)
+            _simpan_array(sementara, spek["kategori"], teks, daftar_file)
+        kolom.append(spek)
+
+    _simpan_array(sementara, "fitur", np.ascontiguousarray(case_vector_df.to_numpy(dtype=np.float64)), daftar_file)
+
+    # Blok engine, disimpan persis seperti dipakai saat skoring
+    _simpan_array(sementara, "dense", engine.dense, daftar_file)
+    _simpan_array(sementara, "dense_sq", engine.dense_sq, daftar_file)
+    _simpan_array(sementara, "row_norms", engine.row_norms, daftar_file)
+    _simpan_array(sementara, "onehot_indptr", engine.onehot.indptr, daftar_file)
+    _simpan_array(sementara, "onehot_indices", engine.onehot.indices, daftar_file)
+    _simpan_array(sementara, "onehot_data", engine.onehot.data, daftar_file)
+    _simpan_array(sementara, "penalti", np.stack([engine.numerik[k] for k, _, _ in PENALTI_NUMERIK]), daftar_file)
+    kolom_onehot = sorted(engine.posting)
+    posting = np.stack([engine.posting[idx] for idx in kolom_onehot]) if kolom_onehot \
+        else np.zeros((0, (len(engine) + 7) // 8), dtype=np.uint8)
+    _simpan_array(sementara, "posting", posting, daftar_file)
+
+    manifest = {
+        "format": FORMAT_BUNDEL,
+        "versi_format": VERSI_FORMAT,
+        "versi": engine.versi,
+        "n_baris": len(engine),
+        "skema": engine.schema.to_dict(),
+        "kolom_fitur": kolom_fitur,
+        "kolom": kolom,
+        "urutan_kolom": list(final_df.columns),
+        "posting_rentang": {
+            str(idx): {k: list(r) for k, r in rentang.items()}
+            for idx, rentang in engine.posting_rentang.items()
+        },
+        "rentang_global": {k: list(r) for k, r in engine.rentang_global.items()},
+        "file": daftar_file,
+        "sumber": {os.path.basename(p): sidik_sumber(p) for p in sumber if os.path.exists(p)},
+    }
+    with open(os.path.join(sementara, NAMA_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Dua rename: di antaranya path sesaat tidak ada (Bundel.muat mencoba lagi).
+    # Proses yang masih memakai bundel lama tidak terganggu karena semua file-nya
+    # sudah di-mmap saat dibuka; lease mereka dipindah ke bundel baru supaya
+    # tetap terhitung dan tetap bisa dilepas lewat path yang sama.
+    lama = f"{path}.lama-{os.getpid()}"
+    if os.path.isdir(path):
+        _pindah_lease(path, sementara)
+        os.replace(path, lama)
+    os.replace(sementara, path)
+    if os.path.isdir(lama):
+        _pindah_lease(lama, path)  # lease yang dicatat di antara dua rename
+        shutil.rmtree(lama, ignore_errors=True)
+    return manifest
+
+
+# ==========================
+# Lease pemakai bundel (lintas proses)
+# ==========================
+def _pid_hidup(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lepas_lease(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _pindah_lease(asal, tujuan):
+    folder_asal = os.path.join(asal, DIR_PEMAKAI)
+    try:
+        nama_lease = os.listdir(folder_asal)
+    except FileNotFoundError:
+        return
+    folder_tujuan = os.path.join(tujuan, DIR_PEMAKAI)
+    os.makedirs(folder_tujuan, exist_ok=True)
+    for nama in nama_lease:
+        try:
+            os.replace(os.path.join(folder_asal, nama), os.path.join(folder_tujuan, nama))
+        except FileNotFoundError:
+            pass  # lease baru saja dilepas pemiliknya
+
+
+def pemakai_bundel(path):
+    """
+    PID proses yang sedang memakai bundel path. Lease milik proses yang sudah
+    mati (misal crash) dihapus.
+    """
+    folder = os.path.join(path, DIR_PEMAKAI)
+    try:
+        nama_lease = os.listdir(folder)
+    except FileNotFoundError:
+        return []
+    pids = set()
+    for nama in nama_lease:
+        try:
+            pid = int(nama.split("-", 1)[0])
+        except ValueError:
+            continue
+        if _pid_hidup(pid):
+            pids.add(pid)
+        else:
+            _lepas_lease(os.path.join(folder, nama))
+    return sorted(pids)
+
+
+def hapus_bundel_tak_terpakai(folder, simpan=(), penunjuk=PENUNJUK_BAWAAN, bawaan=VERSI_BAWAAN):
+    """
+    Hapus bundel katalog_* di folder yang tidak dipakai proses mana pun. Tidak pernah
+    dihapus: nama versi di simpan, versi bawaan, versi yang ditulis di file penunjuk
+    (relatif ke folder), serta folder sementara (*.tmp) dan bundel lama yang sedang
+    diganti (*.lama-<pid>) milik simpan_bundel yang masih berjalan.
+    Kembalikan daftar path yang dihapus.
+    """
+    dilindungi = set(simpan)
+    if bawaan:
+        dilindungi.add(bawaan)
+    if penunjuk:
+        try:
+            with open(os.path.join(folder, penunjuk), encoding="utf-8") as f:
+                dilindungi.add(f.read().strip() or bawaan)
+        except FileNotFoundError:
+            pass
+
+    dihapus = []
+    for nama in sorted(os.listdir(folder)):
+        path = os.path.join(folder, nama)
+        if not nama.startswith("katalog_") or nama[len("katalog_"):] in dilindungi:
+            continue
+        if nama.endswith(".tmp") or ".lama-" in nama:
+            continue
+        if not os.path.isfile(os.path.join(path, NAMA_MANIFEST)) or pemakai_bundel(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        dihapus.append(path)
+    return dihapus
+
+
+# ==========================
+# Baca bundel
+# ==========================
+class Bundel:
+    """
+    Bundel katalog yang sudah dibuka. Array dibuka lazy (mmap) saat pertama diminta,
+    DataFrame dibentuk sekali lalu disimpan.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.n_baris = int(manifest["n_baris"])
+        self.lease = None
+        self._array = {}
+        self._cache = {}
+
+    @classmethod
+    def muat(cls, path, percobaan=5, jeda=0.05):
+        """
+        Buka bundel: semua array langsung di-mmap (read-only) supaya proses ini
+        memegang satu snapshot utuh walaupun bundel diterbitkan ulang sesudahnya,
+        lalu catat lease pemakai. Dalam satu proses, bundel yang sama (inode
+        manifest sama) dan masih terbuka dipakai ulang. Kalau bundel sedang
+        diterbitkan ulang (file hilang atau manifest berganti), dicoba lagi
+        sesudah jeda detik.
+        """
+        path_manifest = os.path.join(path, NAMA_MANIFEST)
+        for ke in range(percobaan):
+            if ke:
+                time.sleep(jeda)
+            try:
+                inode = os.stat(path_manifest).st_ino
+                kunci = (os.path.realpath(path), inode)
+                bundel = _TERBUKA.get(kunci)
+                if bundel is not None:
+                    return bundel
+                with open(path_manifest, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                continue  # di antara dua rename simpan_bundel
+            if manifest.get("format") != FORMAT_BUNDEL:
+                raise ValueError(f"{path} bukan bundel katalog.")
+            if manifest.get("versi_format") not in VERSI_BISA_DIBACA:
+                raise ValueError(
+                    f"Versi format bundel {path} = {manifest.get('versi_format')}, "
+                    f"yang didukung {VERSI_FORMAT}; bangun ulang bundel."
+                )
+            bundel = cls(path, manifest)
+            try:
+                for nama in manifest["file"]:
+                    bundel.array(nama)
+            except FileNotFoundError:
+                continue  # bundel sedang diganti penerbit: coba lagi
+            try:
+                if os.stat(path_manifest).st_ino != inode:
+                    continue
+            except FileNotFoundError:
+                continue
+            bundel._catat_lease()
+            _TERBUKA[kunci] = bundel
+            return bundel
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Bundel {path} tidak ditemukan.")
+        raise ValueError(f"Bundel {path} terus berganti saat dibuka.")
+
+    def _catat_lease(self):
+        folder = os.path.join(self.path, DIR_PEMAKAI)
+        lease = os.path.join(folder, f"{os.getpid()}-{id(self):x}")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(lease, "w", encoding="utf-8") as f:
+                f.write(self.manifest["versi"])
+        except OSError:
+            return  # folder read-only: bundel tetap bisa dipakai, hanya tidak terhitung
+        self.lease = lease
+        # Lease dilepas saat bundel tidak direferensikan lagi (engine/katalog ikut
+        # memegang bundel) atau saat proses keluar
+        weakref.finalize(self, _lepas_lease, lease)
+
+    @property
+    def versi(self):
+        return self.manifest["versi"]
+
+    def array(self, nama):
+        """
+        Array read-only (memory-mapped) dari file .npy bundel.
+        """
+        if nama not in self._array:
+            info = self.manifest["file"][nama]
+            arr = np.load(os.path.join(self.path, info["file"]), mmap_mode="r")
+            if list(arr.shape) != info["shape"] or str(arr.dtype) != info["dtype"]:
+                raise ValueError(f"File {info['file']} tidak cocok dengan manifest bundel {self.path}.")
+            self._array[nama] = arr
+        return self._array[nama]
+
+    def schema(self):
+        if "schema" not in self._cache:
+            self._cache["schema"] = FeatureSchema.from_dict(self.manifest["skema"])
+        return self._cache["schema"]
+
+    def _kategori(self, spek):
+        kategori = spek["kategori"]
+        if isinstance(kategori, list):  # format 1
+            return kategori
+        return [teks.decode("utf-8") for teks in self.array(kategori).tolist()]
+
+    def _kolom_mentah(self):
+        """
+        Kolom mentah final_df (dibentuk sekali, dipakai bersama katalog() dan final_df()).
+        Kolom string jadi Categorical di atas kode mmap; hanya kamusnya yang dibuat per proses.
+        Kolom dengan kamus besar (>= KAMUS_LAZY_MIN) jadi KolomKamus: kode dan kamus
+        tetap di mmap, nilai didekode hanya untuk baris yang dibaca.
+        """
+        if "kolom_mentah" not in self._cache:
+            data = {}
+            for spek in self.manifest["kolom"]:
+                arr = self.array(spek["array"])
+                kamus = spek.get("kategori")
+                if isinstance(kamus, str) and self.manifest["file"][kamus]["shape"][0] >= KAMUS_LAZY_MIN:
+                    data[spek["nama"]] = pd.array(KolomKamus(arr, self.array(kamus)))
+                elif spek["jenis"] == "kategori":
+                    dtype = pd.CategoricalDtype(self._kategori(spek), ordered=False)
+                    data[spek["nama"]] = pd.Categorical.from_codes(arr, dtype=dtype, validate=False)
+                else:
+                    data[spek["nama"]] = arr
+            self._cache["kolom_mentah"] = data
+        return dict(self._cache["kolom_mentah"])
+
+    def katalog(self):
+        """
+        Katalog mentah (kolom final_df di luar case vector), pengganti load_df.
+        Kolom string berupa Categorical (kode kamus), kolom numerik view ke file mmap.
+        """
+        if "katalog" not in self._cache:
+            self._cache["katalog"] = pd.DataFrame(self._kolom_mentah(), copy=False)
+        return self._cache["katalog"]
+
+    def case_vector_df(self):
+        if "case_vector_df" not in self._cache:
+            self._cache["case_vector_df"] = pd.DataFrame(
+                self.array("fitur"), columns=self.manifest["kolom_fitur"], copy=False
+            )
+        return self._cache["case_vector_df"]
+
+    def final_df(self):
+        if "final_df" not in self._cache:
+            data = self._kolom_mentah()
+            fitur = self.array("fitur")
+            for j, nama in enumerate(self.manifest["kolom_fitur"]):
+                data[nama] = fitur[:, j]
+            self._cache["final_df"] = pd.DataFrame(data, copy=False)[self.manifest["urutan_kolom"]]
+        return self._cache["final_df"]
+
+    def engine(self, pruning=True):
+        return CaseBaseEngine.dari_bundel(self, pruning=pruning)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tulis bundel katalog (kolom .npy + manifest) dari artefak pickle.")
+    parser.add_argument("final_df", nargs="?", help="final_df_*.pkl")
+    parser.add_argument("case_vector_df", nargs="?", help="case_vector_df_*.pkl")
+    parser.add_argument("-o", "--output", help="Folder bundel tujuan")
+    parser.add_argument("--bersihkan", metavar="FOLDER",
+                        help="Hapus bundel katalog_* di FOLDER yang tidak dipakai proses mana pun")
+    parser.add_argument("--simpan", action="append", default=[],
+                        help="Nama versi lain yang tidak dihapus --bersihkan (versi di file penunjuk dan "
+                             "versi bawaan selalu disimpan)")
+    parser.add_argument("--penunjuk", default=PENUNJUK_BAWAAN, help="File penunjuk versi aktif, relatif ke FOLDER")
+    parser.add_argument("--bawaan", default=VERSI_BAWAAN, help="Versi bawaan kalau file penunjuk kosong/tidak ada")
+    args = parser.parse_args(argv)
+
+    if args.bersihkan:
+        dihapus = hapus_bundel_tak_terpakai(
+            args.bersihkan, simpan=args.simpan, penunjuk=args.penunjuk, bawaan=args.bawaan,
+        )
+        for path in dihapus:
+            print(f"dihapus {path}", file=sys.stderr)
+        return 0
+    if not (args.final_df and args.case_vector_df and args.output):
+        parser.error("final_df, case_vector_df dan -o wajib diisi (kecuali dengan --bersihkan)")
+
+    final_df = pd.read_pickle(args.final_df)
+    case_vector_df = pd.read_pickle(args.case_vector_df)
+    schema = muat_atau_bangun_skema(args.case_vector_df, case_vector_df, final_df)
+    manifest = simpan_bundel(
+        args.output, final_df, case_vector_df, schema=schema,
+        sumber=(args.final_df, args.case_vector_df, path_skema(args.case_vector_df)),
+    )
+    print(f"bundel {args.output}: {manifest['n_baris']} motor, versi {manifest['versi']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
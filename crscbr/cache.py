@@ -0,0 +1,158 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ==========================
+# Kunci cache hasil rekomendasi
+# ==========================
+def kunci_query(user_input, prioritas_user, versi_katalog, top_n=6):
+    """
+    Hash kanonik dari (user_input, prioritas_user, versi katalog, top_n).
+    Urutan atribut tidak berpengaruh; nilai dibandingkan sebagai string.
+    """
+    raw = json.dumps(
+        {
+            "u": sorted((str(k), str(v)) for k, v in user_input.items()),
+            "p": sorted((str(k), float(v)) for k, v in prioritas_user.items()),
+            "v": versi_katalog,
+            "n": top_n,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# ==========================
+# Memo hasil rekomendasi per sesi
+# ==========================
+class SessionResultCache:
+    """
+    Memo kecil per sesi (disimpan di st.session_state). Rerun karena klik tombol
+    atau radio yang tidak mengubah input memakai ranking yang sudah dihitung.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def ambil_atau_hitung(self, kunci, hitung):
+        if kunci in self._data:
+            self.hits += 1
+            self._data.move_to_end(kunci)
+            return self._data[kunci]
+
+        self.misses += 1
+        hasil = hitung()
+        self._data[kunci] = hasil
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return hasil
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+
+
+# ==========================
+# Cache hasil lintas sesi (LRU dibatasi byte)
+# ==========================
+def ukuran_hasil(hasil):
+    """
+    Perkiraan ukuran memori hasil top-k (tuple array indeks/skor) dalam byte.
+    """
+    ukuran = 64 * len(hasil)  # overhead kasar tuple + objek array
+    for arr in hasil:
+        ukuran += arr.nbytes if isinstance(arr, np.ndarray) else 64
+    return ukuran
+
+
+class SharedResultCache:
+    """
+    Cache top-k (indeks baris + skor, bukan DataFrame) yang dipakai bersama semua sesi
+    dalam satu proses. Thread-safe untuk thread script Streamlit, eviction LRU
+    berdasarkan total byte, dan dikosongkan saat versi katalog berganti.
+    """
+
+    OVERHEAD_KUNCI = 120  # string hash 40 karakter + entri OrderedDict
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.versi = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pastikan_versi(self, versi):
+        """
+        Kosongkan cache kalau katalog yang aktif sudah berbeda versi.
+        """
+        with self._lock:
+            if self.versi != versi:
+                self._data.clear()
+                self.bytes = 0
+                self.versi = versi
+
+    def invalidasi(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def get(self, kunci):
+        with self._lock:
+            entri = self._data.get(kunci)
+            if entri is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(kunci)
+            return entri[0]
+
+    def put(self, kunci, hasil):
+        hasil = tuple(hasil)
+        for arr in hasil:
+            if isinstance(arr, np.ndarray):
+                arr.setflags(write=False)
+        ukuran = ukuran_hasil(hasil) + self.OVERHEAD_KUNCI
+        if ukuran > self.max_bytes:
+            return
+        with self._lock:
+            lama = self._data.pop(kunci, None)
+            if lama is not None:
+                self.bytes -= lama[1]
+            self._data[kunci] = (hasil, ukuran)
+            self.bytes += ukuran
+            while self.bytes > self.max_bytes:
+                _, (_, ukuran_lama) = self._data.popitem(last=False)
+                self.bytes -= ukuran_lama
+                self.evictions += 1
+
+    def ambil_atau_hitung(self, kunci, hitung):
+        hasil = self.get(kunci)
+        if hasil is None:
+            # Dihitung di luar lock supaya sesi lain tidak ikut menunggu
+            hasil = hitung()
+            self.put(kunci, hasil)
+        return hasil
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "versi": self.versi,
+            }
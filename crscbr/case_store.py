@@ -0,0 +1,271 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from crscbr.metrik import METRIK
+
+
+# ==========================
+# Signature preferensi (kanonik)
+# ==========================
+def signature_preferensi(user_input):
+    """
+    Signature kanonik user_input: pasangan (atribut, nilai) lowercase yang diurutkan.
+    Dua preferensi dianggap identik kalau himpunan pasangannya sama, seperti
+    perbandingan set di hitung_model_terpopuler_dari_case_gsheet.
+    """
+    pasangan = sorted(set((str(k).lower(), str(v).lower()) for k, v in user_input.items()))
+    raw = json.dumps(pasangan, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def parse_records(records, dilewati=None):
+    """
+    Parse ulang field JSON/boolean dari baris sheet case_base (hasil get_all_records).
+    Baris rusak (kolom hilang, JSON atau angka tidak valid, case_id kosong) dilewati
+    tanpa menggagalkan baris lain; kalau dilewati berupa list, (nomor baris sheet,
+    pesan error) baris tersebut ditambahkan ke sana.
+    """
+    hasil = []
+    for i, r in enumerate(records):
+        try:
+            if r.get("case_id") in (None, ""):
+                raise ValueError("case_id kosong")
+            r["user_input"] = json.loads(r["user_input"])
+            r["refine_steps"] = json.loads(r["refine_steps"])
+            r["chosen_models"] = json.loads(r["chosen_models"])
+            r["is_refined"] = str(r["is_refined"]).lower() == "true"
+            r["user_ranked"] = str(r["user_ranked"]).lower() == "true"
+            r["refine_iteration_count"] = int(r["refine_iteration_count"])
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            if dilewati is not None:
+                dilewati.append((i + 2, f"{type(e).__name__}: {e}"))  # baris 1 sheet = header
+            continue
+        hasil.append(r)
+    return hasil
+
+
+def hitung_dari_records(user_input, records):
+    """
+    Implementasi awal (scan linear) untuk menghitung model yang dipilih user lain
+    dengan preferensi identik. Dipakai sebagai pembanding CaseStore.
+    """
+    user_set = set((k.lower(), str(v).lower()) for k, v in user_input.items())
+
+    hitung_model = {}
+    for case in records:
+        case_input = case.get("user_input", {})
+        if not isinstance(case_input, dict):
+            continue
+
+        case_set = set((k.lower(), str(v).lower()) for k, v in case_input.items())
+        if case_set == user_set:
+            for model_info in case.get("chosen_models", []):
+                model = model_info.get("model")
+                if model:
+                    hitung_model[model] = hitung_model.get(model, 0) + 1
+
+    return sorted(hitung_model.items(), key=lambda x: x[1], reverse=True)
+
+
+def buat_data_case(case_id, timestamp, user_input, row_model, refined=False, refine_log=None, user_ranked=False):
+    """
+    Satu baris sheet case_base (urutan kolom sama dengan sheet) untuk model yang dipilih user.
+    """
+    return {
+        "case_id": case_id,
+        "user_input": json.dumps(user_input, ensure_ascii=False),
+        "is_refined": refined,
+        "refine_steps": json.dumps(refine_log if refine_log else [], ensure_ascii=False),
+        "refine_iteration_count": len(refine_log) if refine_log else 0,
+        "chosen_models": json.dumps([{
+            "model": row_model["Model"],
+            "similarity_score": float(row_model["Similarity"]) if "Similarity" in row_model else None,
+            "source": row_model.get("source", "cosine_similarity")
+        }], ensure_ascii=False),
+        "user_ranked": user_ranked,
+        "timestamp": timestamp
+    }
+
+
+def _decode(nilai, default):
+    if isinstance(nilai, str):
+        try:
+            return json.loads(nilai)
+        except ValueError:
+            return default
+    return default if nilai is None else nilai
+
+
+def _bool(nilai):
+    if isinstance(nilai, str):
+        return nilai.strip().lower() == "true"
+    return bool(nilai)
+
+
+# ==========================
+# Case base lokal (SQLite)
+# ==========================
+class CaseStore:
+    """
+    Case base lokal berbasis SQLite. Selain tabel cases, jumlah pilihan model per
+    signature disimpan di tabel model_counts, jadi "model yang dipilih untuk
+    preferensi yang sama" cukup satu lookup berindeks.
+    """
+
+    def __init__(self, path="case_base.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cases (
+                case_id TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                user_input TEXT NOT NULL,
+                is_refined INTEGER NOT NULL,
+                refine_steps TEXT NOT NULL,
+                refine_iteration_count INTEGER NOT NULL,
+                chosen_models TEXT NOT NULL,
+                user_ranked INTEGER NOT NULL,
+                timestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_cases_signature ON cases(signature);
+            CREATE TABLE IF NOT EXISTS model_counts (
+                signature TEXT NOT NULL,
+                model TEXT NOT NULL,
+                jumlah INTEGER NOT NULL,
+                PRIMARY KEY (signature, model)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, case):
+        user_input = _decode(case.get("user_input"), {})
+        if not isinstance(user_input, dict):
+            return False
+        chosen_models = _decode(case.get("chosen_models"), [])
+        refine_steps = _decode(case.get("refine_steps"), [])
+        signature = signature_preferensi(user_input)
+
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO cases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(case["case_id"]),
+                signature,
+                json.dumps(user_input, ensure_ascii=False),
+                int(_bool(case.get("is_refined"))),
+                json.dumps(refine_steps, ensure_ascii=False),
+                int(case.get("refine_iteration_count") or 0),
+                json.dumps(chosen_models, ensure_ascii=False),
+                int(_bool(case.get("user_ranked"))),
+                case.get("timestamp"),
+            ),
+        )
+        if cur.rowcount == 0:
+            return False  # case_id sudah ada
+
+        for model_info in chosen_models:
+            model = model_info.get("model") if isinstance(model_info, dict) else None
+            if model:
+                self._conn.execute(
+                    "INSERT INTO model_counts VALUES (?, ?, 1) "
+                    "ON CONFLICT(signature, model) DO UPDATE SET jumlah = jumlah + 1",
+                    (signature, model),
+                )
+        return True
+
+    @METRIK.ukur("storage.case_store.tambah_case")
+    def tambah_case(self, case):
+        """
+        Simpan satu case (format baris sheet case_base, field JSON boleh string atau sudah di-decode).
+        Kembalikan False kalau case_id sudah pernah disimpan.
+        """
+        with self._lock:
+            ditambah = self._insert(case)
+            self._conn.commit()
+        return ditambah
+
+    @METRIK.ukur("storage.case_store.tambah_banyak")
+    def tambah_banyak(self, records):
+        """
+        Impor banyak case sekaligus (misal hasil load_case_base_from_gsheet) dalam satu transaksi.
+        """
+        with self._lock:
+            jumlah = sum(1 for case in records if self._insert(case))
+            self._conn.commit()
+        return jumlah
+
+    @METRIK.ukur("storage.case_store.model_terpopuler")
+    def model_terpopuler(self, user_input):
+        """
+        List (model, jumlah) untuk preferensi yang identik, urut dari yang paling sering dipilih.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, jumlah FROM model_counts WHERE signature = ? "
+                "ORDER BY jumlah DESC, model ASC",
+                (signature_preferensi(user_input),),
+            ).fetchall()
+        return [(model, jumlah) for model, jumlah in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+
+# ==========================
+# Sinkronisasi latar belakang dari mirror (Google Sheets)
+# ==========================
+class SinkronLatar:
+    """
+    Thread daemon yang berkala memanggil loader (misal load_case_base_from_gsheet,
+    mengembalikan baris mentah get_all_records), mem-parse per baris lalu mengimpor
+    case baru ke CaseStore. Gagal sinkron tidak mengganggu UI: error terakhir disimpan
+    di last_error, baris sheet rusak yang dilewati di dilewati (nomor baris, pesan).
+    """
+
+    def __init__(self, store, loader, interval=300):
+        self.store = store
+        self.loader = loader
+        self.interval = interval
+        self.last_sync = None
+        self.last_error = None
+        self.dilewati = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="case-store-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sinkron_sekarang(self):
+        try:
+            with METRIK.span("storage.sinkron.loader"):
+                records = self.loader()
+            dilewati = []
+            records = parse_records(records, dilewati)
+            ditambah = self.store.tambah_banyak(records)
+            self.last_sync = time.time()
+            self.last_error = None
+            self.dilewati = dilewati
+            return ditambah
+        except Exception as e:
+            self.last_error = e
+            return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sinkron_sekarang()
+            self._stop.wait(self.interval)
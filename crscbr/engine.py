@@ -0,0 +1,817 @@
+import copy
+import hashlib
+
+import numpy as np
+
+from crscbr.metrik import METRIK
+from crscbr.schema import KOLOM_KATEGORIKAL, FeatureSchema
+from crscbr.sparse import MatriksCSR
+
+
+# (kolom mentah, koefisien penalti, pembagi skala)
+PENALTI_NUMERIK = [
+    ("PowerHP", 0.04, 1.0),
+    ("Displacement", 0.02, 1.0),
+    ("Price", 0.01, 1_000_000.0),
+    ("WeightKG", 0.01, 1.0),
+    ("FuelTank", 0.01, 1.0),
+]
+
+# Margin pembulatan float32 antara batas atas (float64) dan skor yang dihitung
+SLACK = 1e-6
+
+# Pruning posting list hanya dipakai untuk katalog sebesar ini ke atas, dan
+# dibatalkan (kembali ke scan penuh) kalau baris yang harus diskor melewati fraksi ini
+PRUNING_MIN_BARIS = 20_000
+PRUNING_FRAKSI_MAKS = 0.3
+
+NAMA_KOLOM_PENALTI = {
+    "PowerHP": "PowerPenalty",
+    "Displacement": "CCPenalty",
+    "Price": "PricePenalty",
+    "WeightKG": "WeightPenalty",
+    "FuelTank": "FuelPenalty",
+}
+
+
+# ==========================
+# Buat user_vector dan weight_vector berdasarkan preferensi user
+# ==========================
+def buat_user_vector_weighted(user_input, prioritas_user, final_df, df_mentah):
+    """
+    Buat user_vector dan weight_vector berdasarkan preferensi user,
+    dengan bobot eksplisit dari prioritas_user.
+    """
+    user_vector = np.zeros(len(final_df.columns), dtype=float)
+    weight_vector = np.zeros(len(final_df.columns), dtype=float)
+    col_index = {col: i for i, col in enumerate(final_df.columns)}
+
+    for attr, val in user_input.items():
+        weight = prioritas_user.get(attr, 1.0)  # default ke 1.0 kalau tidak ditemukan
+
+        # One-hot encoding
+        if attr in KOLOM_KATEGORIKAL:
+            prefix = attr.replace(" ", "")
+            col_name = f"{prefix}_{val}".lower()
+            match = [col for col in final_df.columns if col.lower() == col_name]
+            if match:
+                idx = col_index[match[0]]
+                user_vector[idx] = 1.0
+                weight_vector[idx] = weight
+
+        # Numerikal
+        else:
+            norm_col = f"{attr}_normalized"
+            if norm_col in final_df.columns and attr in df_mentah.columns:
+                idx = col_index[norm_col]
+                max_val = df_mentah[attr].max()
+                norm_val = float(val) / max_val
+                user_vector[idx] = norm_val
+                weight_vector[idx] = weight
+
+    return user_vector, weight_vector
+
+
+# ==========================
+# Rekomendasi Cosine Similarity Berbobot (implementasi referensi)
+# ==========================
+def rekomendasi_cosine_weighted(user_vec, weight_vec, case_matrix, final_df, user_input, top_n=6):
+    """
+    Menghitung cosine similarity berbobot + penalti selisih nilai numerik dari preferensi user.
+    Versi awal berbasis pandas, dipakai sebagai pembanding untuk CaseBaseEngine.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    # Konversi preferensi user ke dict
+    user_pref = dict(user_input)
+
+    # Siapkan target numerik dari preferensi user (jika ada)
+    target_power = float(user_pref.get("PowerHP", 0))
+    target_cc = float(user_pref.get("Displacement", 0))
+    target_price = float(user_pref.get("Price", 0))
+    target_weight = float(user_pref.get("WeightKG", 0))
+    target_fuel = float(user_pref.get("FuelTank", 0))
+
+    # Hitung cosine similarity (berbobot)
+    weighted_user_vector = user_vec * weight_vec
+    weighted_case_matrix = case_matrix * weight_vec
+    similarity_scores = cosine_similarity([weighted_user_vector], weighted_case_matrix)[0]
+
+    # Tempel ke final_df
+    final_df_with_score = final_df.copy()
+    final_df_with_score["Similarity"] = similarity_scores
+
+    # Hitung penalti
+    final_df_with_score["PowerPenalty"] = abs(final_df_with_score["PowerHP"] - target_power) if target_power else 0
+    final_df_with_score["CCPenalty"] = abs(final_df_with_score["Displacement"] - target_cc) if target_cc else 0
+    final_df_with_score["PricePenalty"] = abs(final_df_with_score["Price"] - target_price) / 1_000_000 if target_price else 0
+    final_df_with_score["WeightPenalty"] = abs(final_df_with_score["WeightKG"] - target_weight) if target_weight else 0
+    final_df_with_score["FuelPenalty"] = abs(final_df_with_score["FuelTank"] - target_fuel) if target_fuel else 0
+
+    # Final score: cosine - penalti (atur skala sesuai preferensi) <<<<<------ buat atur skala prioritas numerikal
+    final_df_with_score["FinalScore"] = (
+        final_df_with_score["Similarity"]
+        - 0.04 * final_df_with_score["PowerPenalty"]
+        - 0.02 * final_df_with_score["CCPenalty"]
+        - 0.01 * final_df_with_score["PricePenalty"]
+        - 0.01 * final_df_with_score["WeightPenalty"]
+        - 0.01 * final_df_with_score["FuelPenalty"]
+    )
+
+    # Urutkan dan ambil top-N
+    sorted_df = final_df_with_score.sort_values(by="FinalScore", ascending=False)
+    return sorted_df.head(top_n)
+
+
+# ==========================
+# Target penalti dari preferensi user
+# ==========================
+def target_penalti(user_input):
+    """
+    Ambil target numerik yang dipakai untuk penalti (nilai 0/kosong = tidak dipenalti).
+    """
+    targets = {}
+    for kolom, _, _ in PENALTI_NUMERIK:
+        target = float(user_input.get(kolom, 0) or 0)
+        if target:
+            targets[kolom] = target
+    return targets
+
+
+def matriks_target_penalti(daftar_user_input):
+    """
+    Target penalti untuk banyak query sekaligus: array (Q x jumlah kolom penalti),
+    nilai NaN berarti kolom tersebut tidak dipenalti.
+    """
+    targets = np.full((len(daftar_user_input), len(PENALTI_NUMERIK)), np.nan)
+    for q, user_input in enumerate(daftar_user_input):
+        for j, (kolom, _, _) in enumerate(PENALTI_NUMERIK):
+            target = float(user_input.get(kolom, 0) or 0)
+            if target:
+                targets[q, j] = target
+    return targets
+
+
+def urutkan_top_k(scores, k, indeks=None):
+    """
+    Ambil posisi top-k (skor menurun) pakai argpartition, bukan sort penuh.
+    Seri diurutkan berdasarkan indeks baris (atau array indeks kalau diberikan)
+    supaya hasilnya deterministik, termasuk seri yang melewati batas ke-k.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kandidat = np.argpartition(-scores, k - 1)[:k]
+        batas = scores[kandidat].min()
+        seri_total = np.count_nonzero(scores == batas)
+        if seri_total > np.count_nonzero(scores[kandidat] == batas):
+            # Ada baris seri di luar kandidat: ambil yang indeksnya paling kecil
+            lebih = np.flatnonzero(scores > batas)
+            seri = np.flatnonzero(scores == batas)
+            if indeks is not None:
+                seri = seri[np.argsort(indeks[seri], kind="stable")]
+            kandidat = np.concatenate([lebih, seri[:k - len(lebih)]])
+    else:
+        kandidat = np.arange(n)
+    kunci = kandidat if indeks is None else indeks[kandidat]
+    urutan = np.lexsort((kunci, -scores[kandidat]))
+    return kandidat[urutan]
+
+
+def jumlah_kolom(matrix, kolom, koef, indeks=None, kuadrat=False):
+    """
+    sum_j matrix[:, kolom[j]] * koef[j] dengan urutan penjumlahan tetap (float32).
+    Nilai per baris sama persis baik dihitung untuk seluruh katalog maupun untuk
+    subset baris indeks, jadi jalur yang memangkas kandidat tetap identik.
+    kuadrat=True memakai matrix^2 tanpa perlu menyimpan salinan kuadratnya.
+    Hanya dua array yang dialokasikan (hasil + satu buffer kerja).
+    """
+    if len(kolom) == 0:
+        return None
+    n = matrix.shape[0] if indeks is None else len(indeks)
+    hasil = np.empty(n, dtype=matrix.dtype)
+    buf = np.empty(n, dtype=matrix.dtype)
+    for j, (c, kf) in enumerate(zip(kolom, koef)):
+        if indeks is None:
+            col = matrix[:, c]
+        else:
+            col = np.take(matrix[:, c], indeks, out=buf)
+        if kuadrat:
+            col = np.multiply(col, col, out=buf)
+        tujuan = hasil if j == 0 else buf
+        np.multiply(col, kf, out=tujuan)
+        if j:
+            hasil += buf
+    return hasil
+
+
+# Jumlah bit 1 untuk setiap nilai byte (popcount bitset tanpa unpack)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def baris_dari_bitset(bits):
+    """
+    Indeks baris (urut naik) dari bitset hasil np.packbits.
+    Bitset jarang: hanya byte yang tidak nol yang di-unpack.
+    """
+    byte_idx = np.flatnonzero(bits)
+    if byte_idx.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if byte_idx.size * 8 > bits.size:
+        return np.flatnonzero(np.unpackbits(bits))
+    r, c = np.nonzero(np.unpackbits(bits[byte_idx]).reshape(-1, 8))
+    return byte_idx[r].astype(np.int64) * 8 + c
+
+
+def sidik_katalog(case_matrix, kolom):
+    """
+    Sidik jari isi katalog (hash kolom + matriks case), 12 karakter hex.
+    """
+    h = hashlib.sha1("|".join(kolom).encode("utf-8"))
+    h.update(np.ascontiguousarray(case_matrix).tobytes())
+    return h.hexdigest()[:12]
+
+
+# ==========================
+# Engine rekomendasi case-based (tanpa Streamlit)
+# ==========================
+class CaseBaseEngine:
+    """
+    Menyimpan case_vector_df dalam dua blok float32 read-only:
+    - kolom one-hot sebagai MatriksCSR (tiap baris hanya satu non-zero per atribut),
+    - kolom lain (*_normalized) sebagai matriks dense column-major kecil, beserta
+      kuadrat elemennya untuk norma berbobot,
+    plus kolom numerik mentah untuk penalti.
+
+    Cosine berbobot dihitung hanya pada kolom yang bobotnya tidak nol:
+        sim = (x . u*w^2) / (||u*w|| * sqrt(x^2 . w^2))
+    sehingga biaya per query O(n x atribut aktif), bukan O(n x D).
+
+    Dengan pruning=True, kolom one-hot juga disimpan sebagai bitset per nilai
+    (posting list). top_k lalu menghitung batas atas skor per pola kecocokan
+    kategori dan hanya menyentuh kolom numerik untuk baris yang masih bisa
+    masuk top-k. Hasilnya identik dengan pruning=False.
+
+    Untuk katalog sangat besar indeks bucket crscbr.ann.AnnIndex bisa dipasang
+    dengan pasang_ann; top_k (dengan pruning) lalu memakainya, hasil tetap identik.
+    """
+
+    def __init__(self, case_vector_df, final_df, schema=None, versi=None, pruning=True):
+        if len(case_vector_df) != len(final_df):
+            raise ValueError("case_vector_df dan final_df harus punya jumlah baris yang sama.")
+        if schema is None:
+            schema = FeatureSchema.dari_dataframe(case_vector_df, final_df)
+        elif schema.kolom != list(case_vector_df.columns):
+            raise ValueError("Skema fitur tidak cocok dengan kolom case_vector_df.")
+        kolom_onehot = self._pasang_skema(schema)
+        self.final_df = final_df
+
+        # Matriks dense hanya sementara, selama membangun blok CSR/dense
+        matrix = case_vector_df.to_numpy(dtype=np.float32)
+        self.onehot = MatriksCSR.dari_dense(matrix, kolom=kolom_onehot)
+        # Column-major supaya ambil subset kolom aktif murah
+        self.dense = np.asfortranarray(matrix[:, self.kolom_dense])
+        self.dense_sq = np.asfortranarray(self.dense * self.dense)
+        self.dense.setflags(write=False)
+        self.dense_sq.setflags(write=False)
+        self.row_norms = np.sqrt((matrix * matrix).sum(axis=1, dtype=np.float32))
+        self.row_norms.setflags(write=False)
+
+        self.numerik = {}
+        for kolom, _, _ in PENALTI_NUMERIK:
+            arr = np.ascontiguousarray(final_df[kolom].to_numpy(dtype=np.float64))
+            arr.setflags(write=False)
+            self.numerik[kolom] = arr
+
+        # Versi katalog: dipakai sebagai bagian kunci cache hasil rekomendasi
+        self.versi = versi or sidik_katalog(matrix, self.kolom)
+
+        self.pruning = pruning
+        self.ann = None
+        self._bangun_posting(matrix, kolom_onehot)
+
+    @classmethod
+    def dari_bundel(cls, bundel, pruning=True):
+        """
+        Engine dari bundel katalog (crscbr.bundel) tanpa membentuk matriks dense:
+        blok CSR, dense, kolom penalti dan posting list dipakai langsung dari
+        file .npy yang di-mmap, jadi halaman memori dibagi antar proses oleh OS.
+        """
+        self = cls.__new__(cls)
+        self._bundel = bundel  # lease pemakai bundel dilepas bersama engine
+        kolom_onehot = self._pasang_skema(bundel.schema())
+        self.final_df = bundel.final_df()
+
+        self.onehot = MatriksCSR(
+            bundel.array("onehot_indptr"), bundel.array("onehot_indices"),
+            bundel.array("onehot_data"), (bundel.n_baris, len(self.kolom)),
+        )
+        self.dense = bundel.array("dense")
+        self.dense_sq = bundel.array("dense_sq")
+        self.row_norms = bundel.array("row_norms")
+        penalti = bundel.array("penalti")
+        self.numerik = {kolom: penalti[j] for j, (kolom, _, _) in enumerate(PENALTI_NUMERIK)}
+        self.versi = bundel.manifest["versi"]
+
+        self.pruning = pruning
+        self.ann = None
+        posting = bundel.array("posting")
+        self.posting = {idx: posting[j] for j, idx in enumerate(kolom_onehot)}
+        self.posting_rentang = {
+            int(idx): {kolom: tuple(r) for kolom, r in rentang.items()}
+            for idx, rentang in bundel.manifest["posting_rentang"].items()
+        }
+        self.rentang_global = {kolom: tuple(r) for kolom, r in bundel.manifest["rentang_global"].items()}
+        self._semua_baris = np.packbits(np.ones(len(self), dtype=bool))
+        return self
+
+    def _pasang_skema(self, schema):
+        """
+        Simpan skema beserta pembagian kolom dense / one-hot; kembalikan kolom one-hot.
+        """
+        self.schema = schema
+        self.kolom = list(schema.kolom)
+        self.col_index = {col: i for i, col in enumerate(self.kolom)}
+        kolom_onehot = sorted(idx for vocab in schema.vocab.values() for idx in vocab.values())
+        onehot = set(kolom_onehot)
+        self.kolom_dense = [i for i in range(len(self.kolom)) if i not in onehot]
+        # Posisi kolom global di blok dense (-1 = kolom one-hot)
+        self._lokal_dense = np.full(len(self.kolom), -1, dtype=np.int64)
+        self._lokal_dense[self.kolom_dense] = np.arange(len(self.kolom_dense))
+        return kolom_onehot
+
+    def _bangun_posting(self, matrix, kolom_onehot):
+        """
+        Bitset baris per kolom one-hot, plus rentang (min, max) kolom penalti
+        untuk baris di posting list tersebut.
+        """
+        n = len(self)
+        self.posting = {}
+        self.posting_rentang = {}
+        self._semua_baris = np.packbits(np.ones(n, dtype=bool))
+        for idx in kolom_onehot:
+            mask = matrix[:, idx] > 0
+            self.posting[idx] = np.packbits(mask)
+            if not mask.any():
+                continue
+            self.posting_rentang[idx] = {
+                kolom: (float(nilai[mask].min()), float(nilai[mask].max()))
+                for kolom, nilai in self.numerik.items()
+            }
+        self.rentang_global = {
+            kolom: (float(nilai.min()), float(nilai.max())) if n else (0.0, 0.0)
+            for kolom, nilai in self.numerik.items()
+        }
+
+    def __len__(self):
+        return self.dense.shape[0]
+
+    @property
+    def nbytes(self):
+        """
+        Memori blok skoring (CSR one-hot + dense numerik + kuadrat + norma), dalam byte.
+        """
+        return self.onehot.nbytes + self.dense.nbytes + self.dense_sq.nbytes + self.row_norms.nbytes
+
+    def matriks_dense(self, indeks=None):
+        """
+        Bentuk ulang matriks case vector dense float32 (semua baris atau baris indeks).
+        Hanya untuk keperluan build/debug; skoring tidak memakainya.
+        """
+        hasil = self.onehot.toarray(indeks)
+        hasil[:, self.kolom_dense] = self.dense if indeks is None else self.dense[indeks]
+        return hasil
+
+    def permutasi(self, urutan):
+        """
+        Salinan engine dengan baris disusun ulang menurut urutan (tanpa posting list).
+
+        Skor per baris identik dengan engine asal; dipakai indeks yang ingin
+        membaca kandidatnya sebagai potongan kontigu, bukan gather acak.
+        """
+        urutan = np.asarray(urutan, dtype=np.int64)
+        salinan = copy.copy(self)
+        salinan.final_df = None
+        salinan.onehot = self.onehot.ambil_baris(urutan)
+        salinan.dense = np.asfortranarray(self.dense[urutan])
+        salinan.dense_sq = np.asfortranarray(self.dense_sq[urutan])
+        salinan.row_norms = self.row_norms[urutan]
+        salinan.numerik = {kolom: nilai[urutan] for kolom, nilai in self.numerik.items()}
+        for arr in (salinan.dense, salinan.dense_sq, salinan.row_norms, *salinan.numerik.values()):
+            arr.setflags(write=False)
+        salinan.pruning = False
+        salinan.ann = None
+        salinan.posting = {}
+        salinan.posting_rentang = {}
+        salinan._semua_baris = None
+        return salinan
+
+    def encode(self, user_input, prioritas_user):
+        """
+        Encode preferensi user ke (user_vector, weight_vector) lewat skema fitur.
+        """
+        return self.schema.encode(user_input, prioritas_user)
+
+    def _koefisien(self, user_vec, weight_vec):
+        """
+        (kolom aktif, u*w^2 float32, w^2 float32, ||u*w||) atau None kalau norma user nol.
+        """
+        weight_vec = np.asarray(weight_vec, dtype=np.float64)
+        user_vec = np.asarray(user_vec, dtype=np.float64)
+        aktif = np.flatnonzero(weight_vec)
+        if aktif.size == 0:
+            return None
+        w2 = weight_vec[aktif] ** 2
+        # Jumlahan berurutan (cumsum), bukan np.dot: top_k_batch menghitung norma yang
+        # sama persis untuk banyak query sekaligus tanpa bergantung urutan BLAS
+        user_norm = float(np.sqrt(np.cumsum(user_vec[aktif] ** 2 * w2)[-1]))
+        if user_norm == 0.0:
+            return None
+        uw2 = (user_vec[aktif] * w2).astype(np.float32)
+        return aktif, uw2, w2.astype(np.float32), user_norm
+
+    def similarity(self, user_vec, weight_vec, indeks=None):
+        """
+        Cosine similarity berbobot untuk seluruh katalog (atau baris indeks saja), float64.
+        Baris/query dengan norma nol mendapat skor 0, sama seperti sklearn.
+        """
+        n = len(self) if indeks is None else len(indeks)
+        koef = self._koefisien(user_vec, weight_vec)
+        if koef is None or n == 0:
+            return np.zeros(n)
+        aktif, uw2, w2, user_norm = koef
+
+        # Blok dense: jumlah berurutan per kolom aktif
+        lokal = self._lokal_dense[aktif]
+        di_dense = lokal >= 0
+        lokal = lokal[di_dense]
+        dot = jumlah_kolom(self.dense, lokal, uw2[di_dense], indeks)
+        norm_sq = jumlah_kolom(self.dense_sq, lokal, w2[di_dense], indeks)
+
+        # Blok one-hot: perkalian CSR x vektor koefisien (sparse-dense)
+        if not di_dense.all():
+            kat = aktif[~di_dense]
+            vec_dot = np.zeros(len(self.kolom), dtype=np.float32)
+            vec_dot[kat] = uw2[~di_dense]
+            sparse_dot = self.onehot.matvec(vec_dot, indeks)
+            if np.array_equal(uw2[~di_dense], w2[~di_dense]) and self.onehot.biner:
+                sparse_norm = sparse_dot  # one-hot dengan u = 1: kontribusi dot = kontribusi norma
+            else:
+                vec_norm = np.zeros(len(self.kolom), dtype=np.float32)
+                vec_norm[kat] = w2[~di_dense]
+                sparse_norm = self.onehot.matvec(vec_norm, indeks, kuadrat=True)
+            if dot is None:
+                dot, norm_sq = sparse_dot, sparse_norm
+            else:
+                dot += sparse_dot
+                norm_sq += sparse_norm
+        # Penyebut dihitung di tempat: sqrt(norm_sq) * ||u*w||
+        ada = norm_sq > 0
+        penyebut = np.sqrt(norm_sq, dtype=np.float64)
+        penyebut *= user_norm
+        sim = np.zeros(n)
+        np.divide(dot, penyebut, out=sim, where=ada)
+        return sim
+
+    def penalti(self, user_input, indeks=None, out=None):
+        """
+        Total penalti selisih numerik (sudah dikali koefisien) per baris.
+
+        Satu akumulator plus satu buffer kerja; semua operasi per kolom dilakukan
+        di tempat, jadi alokasi tidak bertambah dengan jumlah kolom penalti.
+        out: array float64 tujuan (boleh dipakai ulang pemanggil).
+        """
+        targets = target_penalti(user_input)
+        n = len(self) if indeks is None else len(indeks)
+        total = np.zeros(n) if out is None else out
+        if out is not None:
+            total.fill(0.0)
+        if not targets or n == 0:
+            return total
+        buf = np.empty(n)
+        for kolom, koef, skala in PENALTI_NUMERIK:
+            if kolom not in targets:
+                continue
+            if indeks is None:
+                np.subtract(self.numerik[kolom], targets[kolom], out=buf)
+            else:
+                np.take(self.numerik[kolom], indeks, out=buf)
+                buf -= targets[kolom]
+            np.abs(buf, out=buf)
+            buf *= koef / skala
+            total += buf
+        return total
+
+    def skor(self, user_vec, weight_vec, user_input, indeks=None):
+        """
+        Hitung (FinalScore, Similarity) untuk seluruh katalog (atau baris indeks saja).
+        FinalScore = Similarity - penalti, ditulis ke buffer penalti tanpa array baru.
+        """
+        sim = self.similarity(user_vec, weight_vec, indeks=indeks)
+        final = self.penalti(user_input, indeks=indeks)
+        np.subtract(sim, final, out=final)
+        return final, sim
+
+    @METRIK.ukur("engine.top_k")
+    def top_k(self, user_vec, weight_vec, user_input, k=6, pruning=None):
+        """
+        Kembalikan (indeks baris, FinalScore, Similarity) untuk k model teratas.
+        pruning=None mengikuti setelan engine.
+        """
+        if self.pruning if pruning is None else pruning:
+            if self.ann is not None:
+                return self.ann.top_k(user_vec, weight_vec, user_input, k=k)
+            hasil = self._top_k_pruning(user_vec, weight_vec, user_input, k)
+            if hasil is not None:
+                return hasil
+        final, sim = self.skor(user_vec, weight_vec, user_input)
+        idx = urutkan_top_k(final, k)
+        return idx, final[idx], sim[idx]
+
+    def pasang_ann(self, indeks):
+        """
+        Pakai indeks top-k (crscbr.ann.AnnIndex milik engine ini, toleransi 0) untuk
+        top_k dengan pruning; None melepasnya.
+        """
+        if indeks is not None and indeks.engine is not self:
+            raise ValueError("Indeks ANN dibangun untuk engine lain.")
+        self.ann = indeks
+
+    def _top_k_pruning(self, user_vec, weight_vec, user_input, k):
+        """
+        Top-k gaya threshold algorithm di atas posting list kategori.
+
+        Baris dikelompokkan menurut pola kecocokan S (kolom kategori aktif yang cocok).
+        Dengan Cauchy-Schwarz, similarity baris di pola S paling tinggi
+        ||v_(S + numerik)|| / ||v||, dan penalti paling rendah dihitung dari rentang
+        kolom penalti di posting list S. Pola diperiksa dari batas atas tertinggi
+        dan berhenti begitu batas atas pola berikutnya di bawah skor ke-k.
+        Kembalikan None (pakai scan penuh) kalau query tidak punya kolom kategori
+        aktif, katalog terlalu kecil, atau pruning tidak cukup memangkas baris.
+        """
+        if len(self) < PRUNING_MIN_BARIS:
+            return None
+        koef = self._koefisien(user_vec, weight_vec)
+        if koef is None:
+            return None
+        aktif, uw2, w2, user_norm = koef
+        kat = [j for j, c in enumerate(aktif) if c in self.posting]
+        if not kat:
+            return None
+        k = min(k, len(self))
+
+        u2w2 = np.asarray(user_vec, dtype=np.float64)[aktif] ** 2 * w2.astype(np.float64)
+        sisa_numerik = float(sum(u2w2[j] for j in range(len(aktif)) if j not in kat))
+        targets = target_penalti(user_input)
+
+        pola = []
+        for kode in range(1 << len(kat)):
+            cocok = [aktif[kat[b]] for b in range(len(kat)) if kode >> b & 1]
+            sim_max = np.sqrt(sisa_numerik + sum(u2w2[kat[b]] for b in range(len(kat)) if kode >> b & 1))
+            bound = min(1.0, sim_max / user_norm) if sim_max > 0 else 0.0
+            for kolom, koef_p, skala in PENALTI_NUMERIK:
+                if kolom not in targets:
+                    continue
+                t = targets[kolom]
+                rentang = [self.posting_rentang[c][kolom] for c in cocok if c in self.posting_rentang] \
+                    or [self.rentang_global[kolom]]
+                jarak = max(max(0.0, t - hi, lo - t) for lo, hi in rentang)
+                bound -= (koef_p / skala) * jarak
+            pola.append((bound + SLACK, kode))
+        pola.sort(key=lambda p: -p[0])
+
+        best_idx = np.empty(0, dtype=np.int64)
+        best_final = np.empty(0)
+        best_sim = np.empty(0)
+        batas_baris = PRUNING_FRAKSI_MAKS * len(self)
+        diskor = 0
+        for bound, kode in pola:
+            if len(best_idx) >= k and bound < best_final[k - 1]:
+                break
+            bits = self._semua_baris.copy()
+            for b in range(len(kat)):
+                posting = self.posting[aktif[kat[b]]]
+                if kode >> b & 1:
+                    bits &= posting
+                else:
+                    bits &= ~posting
+            jumlah = int(POPCOUNT[bits].sum())
+            if jumlah == 0:
+                continue
+            diskor += jumlah
+            if diskor > batas_baris:
+                return None
+            rows = baris_dari_bitset(bits)
+
+            final, sim = self.skor(user_vec, weight_vec, user_input, indeks=rows)
+            idx = np.concatenate([best_idx, rows])
+            final = np.concatenate([best_final, final])
+            sim = np.concatenate([best_sim, sim])
+            urut = urutkan_top_k(final, k, indeks=idx)
+            best_idx, best_final, best_sim = idx[urut], final[urut], sim[urut]
+        return best_idx, best_final, best_sim
+
+    @METRIK.ukur("engine.materialisasi")
+    def materialisasi(self, idx, final, sim, user_input):
+        """
+        Bentuk DataFrame hasil (format rekomendasi_cosine_weighted) hanya untuk baris idx.
+        """
+        hasil = self.final_df.iloc[idx].copy()
+        hasil["Similarity"] = sim
+        for nama, nilai in self.kolom_penalti(idx, user_input):
+            hasil[nama] = nilai
+        hasil["FinalScore"] = final
+        return hasil
+
+    def kolom_penalti(self, idx, user_input):
+        """
+        List (nama kolom *Penalty, nilai untuk baris idx); 0 untuk atribut tanpa target.
+        """
+        targets = target_penalti(user_input)
+        hasil = []
+        for kolom, _, skala in PENALTI_NUMERIK:
+            nama = NAMA_KOLOM_PENALTI[kolom]
+            if kolom in targets:
+                hasil.append((nama, np.abs(self.numerik[kolom][idx] - targets[kolom]) / skala))
+            else:
+                hasil.append((nama, 0))
+        return hasil
+
+    def rekomendasi(self, user_vec, weight_vec, user_input, top_n=6):
+        """
+        Pengganti rekomendasi_cosine_weighted: hanya top-N baris yang dibentuk jadi DataFrame,
+        lengkap dengan kolom Similarity, *Penalty dan FinalScore.
+        """
+        idx, final, sim = self.top_k(user_vec, weight_vec, user_input, k=top_n)
+        return self.materialisasi(idx, final, sim, user_input)
+
+    def _skor_pasangan(self, uw2, w2, user_norm, targets, qs, rs):
+        """
+        (FinalScore, Similarity) untuk banyak pasangan (query qs, baris rs) sekaligus.
+
+        Urutan operasi float sama dengan skor() per query: kolom dense naik, lalu slot
+        one-hot, lalu penalti per kolom; suku kolom yang bobotnya nol bernilai nol persis,
+        jadi hasilnya identik bit per bit dengan skor(). uw2, w2: (Q x D) float32,
+        user_norm: (Q,) seperti _koefisien (0 = query tanpa bobot).
+        """
+        p = len(qs)
+        dot = np.zeros(p, dtype=np.float32)
+        norm_sq = np.zeros(p, dtype=np.float32)
+        for lokal, c in enumerate(self.kolom_dense):
+            kw = w2[qs, c]
+            if not kw.any():
+                continue
+            dot += self.dense[rs, lokal] * uw2[qs, c]
+            norm_sq += self.dense_sq[rs, lokal] * kw
+
+        slot = self.onehot.slot
+        sparse_dot = np.zeros(p, dtype=np.float32)
+        sparse_norm = np.zeros(p, dtype=np.float32)
+        idx2 = self.onehot.indices.reshape(-1, slot)
+        data2 = self.onehot.data.reshape(-1, slot)
+        for s in range(slot):
+            idx = idx2[rs, s]
+            nilai_dot = uw2[qs, idx]
+            nilai_norm = w2[qs, idx]
+            if not self.onehot.biner:
+                d = data2[rs, s]
+                nilai_dot *= d
+                nilai_norm *= d * d
+            sparse_dot += nilai_dot
+            sparse_norm += nilai_norm
+        dot += sparse_dot
+        norm_sq += sparse_norm
+
+        norma = user_norm[qs]
+        penyebut = np.sqrt(norm_sq, dtype=np.float64)
+        penyebut *= norma
+        sim = np.zeros(p)
+        np.divide(dot, penyebut, out=sim, where=(norm_sq > 0) & (norma > 0))
+
+        total = np.zeros(p)
+        for j, (kolom, koef, skala) in enumerate(PENALTI_NUMERIK):
+            t = targets[qs, j]
+            aktif = ~np.isnan(t)
+            if not aktif.any():
+                continue
+            buf = self.numerik[kolom][rs] - np.where(aktif, t, 0.0)
+            np.abs(buf, out=buf)
+            buf *= koef / skala
+            buf[~aktif] = 0.0
+            total += buf
+        return np.subtract(sim, total, out=total), sim
+
+    @METRIK.ukur("engine.top_k_batch")
+    def top_k_batch(self, user_matrix, weight_matrix, daftar_user_input, k=6,
+                    blok_query=256, blok_baris=16384):
+        """
+        Skor banyak query sekaligus dengan perkalian matriks per blok.
+
+        Memori sementara dibatasi blok_baris x blok_query. Perkalian matriks hanya
+        menyaring kandidat (skor dalam 2 * SLACK dari ambang ke-k); semua pasangan
+        (query, kandidat) diskor ulang sekaligus dengan urutan operasi skor() lalu
+        diurutkan seperti top_k, jadi hasilnya identik dengan top_k per query,
+        termasuk pemilihan baris seri berdasarkan indeks terkecil.
+        Kembalikan (indeks, FinalScore, Similarity), masing-masing array (Q x k).
+        """
+        user_matrix = np.asarray(user_matrix, dtype=np.float64)
+        weight_matrix = np.asarray(weight_matrix, dtype=np.float64)
+        n_query = user_matrix.shape[0]
+        n = len(self)
+        k = min(k, n)
+
+        targets = matriks_target_penalti(daftar_user_input)
+        out_idx = np.zeros((n_query, k), dtype=np.int64)
+        out_final = np.zeros((n_query, k))
+        out_sim = np.zeros((n_query, k))
+        if k <= 0:
+            return out_idx, out_final, out_sim
+
+        for q0 in range(0, n_query, blok_query):
+            q1 = min(q0 + blok_query, n_query)
+            w2 = weight_matrix[q0:q1] ** 2
+            uw2 = (user_matrix[q0:q1] * w2).astype(np.float32).T
+            # Sama dengan _koefisien: suku kolom tanpa bobot bernilai nol, jumlahan berurutan
+            user_norm = np.sqrt(np.cumsum(user_matrix[q0:q1] ** 2 * w2, axis=1)[:, -1])
+            w2 = w2.astype(np.float32).T
+            t = targets[q0:q1]
+
+            ambang = np.full(q1 - q0, -np.inf)
+            calon_q, calon_r = [], []  # pasangan (query lokal, baris) kandidat per blok baris
+            jumlah = np.zeros(q1 - q0, dtype=np.int64)
+
+            for r0 in range(0, n, blok_baris):
+                r1 = min(r0 + blok_baris, n)
+                dot = self.dense[r0:r1] @ uw2[self.kolom_dense] + self.onehot.matmat(uw2, r0, r1)
+                norm_sq = self.dense_sq[r0:r1] @ w2[self.kolom_dense] + self.onehot.matmat(w2, r0, r1, kuadrat=True)
+                case_norm = np.sqrt(norm_sq, dtype=np.float64)
+                denom = case_norm * user_norm
+                sim = np.zeros(denom.shape)
+                np.divide(dot, denom, out=sim, where=denom > 0)
+
+                final = sim.copy()
+                for j, (kolom, koef, skala) in enumerate(PENALTI_NUMERIK):
+                    aktif = ~np.isnan(t[:, j])
+                    if not aktif.any():
+                        continue
+                    nilai = self.numerik[kolom][r0:r1, None]
+                    selisih = np.abs(nilai - np.where(aktif, t[:, j], 0.0))
+                    final -= (koef / skala) * selisih * aktif
+
+                # Ambang = batas bawah skor ke-k sejauh ini; baris di bawah ambang - 2 * SLACK
+                # pasti kalah dari k baris lain (galat pembulatan perkalian matriks < SLACK).
+                # Blok yang lebih kecil dari k tidak memberi batas bawah skor ke-k.
+                if r1 - r0 >= k:
+                    ambang = np.maximum(ambang, -np.partition(-final, k - 1, axis=0)[k - 1])
+                kolom_q, baris = np.nonzero((final >= ambang - 2 * SLACK).T)
+                calon_q.append(kolom_q)
+                calon_r.append(baris + r0)
+                jumlah += np.bincount(kolom_q, minlength=q1 - q0)
+                if (jumlah > max(blok_baris, k)).any():
+                    calon_q, calon_r = self._padatkan(
+                        calon_q, calon_r, jumlah, max(blok_baris, k), k,
+                        user_matrix[q0:q1], weight_matrix[q0:q1], daftar_user_input[q0:q1],
+                    )
+
+            # Skor perkalian matriks berbeda pembulatan dengan skor(); kandidat diskor ulang
+            # persis lalu diurutkan seperti urutkan_top_k, jadi hasil (termasuk seri) sama dengan top_k
+            qs = np.concatenate(calon_q)
+            rs = np.concatenate(calon_r)
+            if self.onehot.slot:
+                final, sim = self._skor_pasangan(uw2.T, w2.T, user_norm, t, qs, rs)
+            else:
+                final, sim = np.empty(len(qs)), np.empty(len(qs))
+                for j in range(q1 - q0):
+                    pilih = qs == j
+                    final[pilih], sim[pilih] = self.skor(
+                        user_matrix[q0 + j], weight_matrix[q0 + j], daftar_user_input[q0 + j], indeks=rs[pilih]
+                    )
+            urut = np.lexsort((rs, -final, qs))
+            awal = np.searchsorted(qs[urut], np.arange(q1 - q0))
+            ambil = urut[awal[:, None] + np.arange(k)]
+            out_idx[q0:q1] = rs[ambil]
+            out_final[q0:q1] = final[ambil]
+            out_sim[q0:q1] = sim[ambil]
+
+        return out_idx, out_final, out_sim
+
+    def _padatkan(self, calon_q, calon_r, jumlah, batas, k, user_matrix, weight_matrix, daftar_user_input):
+        """
+        Query yang kandidatnya lebih dari batas (banyak baris seri) dipadatkan ke top-k
+        persis dari baris yang sudah dilihat, supaya memori kandidat tetap terbatas.
+        """
+        qs = np.concatenate(calon_q)
+        rs = np.concatenate(calon_r)
+        padat = jumlah > batas
+        tetap = ~padat[qs]
+        hasil_q, hasil_r = [qs[tetap]], [rs[tetap]]
+        for j in np.flatnonzero(padat):
+            indeks = rs[qs == j]
+            skor_persis, _ = self.skor(user_matrix[j], weight_matrix[j], daftar_user_input[j], indeks=indeks)
+            pilih = np.sort(indeks[urutkan_top_k(skor_persis, k, indeks=indeks)])
+            hasil_q.append(np.full(len(pilih), j))
+            hasil_r.append(pilih)
+            jumlah[j] = len(pilih)
+        return [np.concatenate(hasil_q)], [np.concatenate(hasil_r)]
@@ -0,0 +1,326 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from crscbr.engine import PENALTI_NUMERIK, SLACK, baris_dari_bitset, target_penalti, urutkan_top_k
+from crscbr.metrik import METRIK
+
+
+# Di bawah ukuran katalog ini engine.top_k langsung lebih cepat (overhead per panggilan)
+INKREMENTAL_MIN_BARIS = 20_000
+
+# Langkah delta sebelum jumlahan parsial dihitung ulang dari awal (membatasi galat float64)
+MAKS_LANGKAH_DELTA = 32
+
+# Delta dipakai hanya kalau kolom yang berubah paling banyak fraksi ini dari kolom aktif
+FRAKSI_DELTA_MAKS = 0.5
+
+# Baris dengan norma (float64) di bawah fraksi ini dari skala jumlahan selalu diskor ulang
+# persis, karena galat relatif jumlahan inkremental bisa besar di sana
+NORMA_RAWAN = 1e-6
+
+
+# ==========================
+# Skoring inkremental untuk iterasi refinement
+# ==========================
+class SkorInkremental:
+    """
+    Jumlahan parsial cosine berbobot per sesi, diperbarui hanya untuk kolom yang berubah.
+
+    Untuk tiap baris disimpan (float64):
+        dot  = sum_c x_c * u_c * w_c^2
+        norm = sum_c x_c^2 * w_c^2
+        pen  = total penalti numerik
+    plus jumlah suku non-zero per baris (integer, persis) supaya baris yang norma
+    sebenarnya nol tetap mendapat similarity 0 walaupun jumlahan float64 menyisakan
+    galat pembatalan.
+
+    Iterasi berikutnya membandingkan koefisien u*w^2, w^2 dan target penalti dengan
+    iterasi sebelumnya; hanya kolom yang berubah yang dibaca ulang, jadi biayanya
+    O(n x kolom berubah), bukan O(n x D). Skor inkremental hanya dipakai untuk
+    memilih kandidat (skor ke-k dikurangi margin pembulatan); kandidat lalu diskor
+    persis dengan engine.skor, jadi hasilnya identik dengan engine.top_k.
+
+    Memori per sesi sekitar 34 byte per baris katalog.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statistik_terakhir = {}
+        self._reset()
+
+    @property
+    def nbytes(self):
+        """
+        Memori jumlahan parsial (dot, norm, pen, suku, buffer kerja), dalam byte.
+        """
+        if self._uw2 is None:
+            return 0
+        return self.dot.nbytes + self.norm.nbytes + self.pen.nbytes + self.suku.nbytes + self._buf.nbytes
+
+    def _reset(self):
+        self._uw2 = None
+        self._w2 = None
+        self._targets = {}
+        self._top_lama = None
+        self._maks_kuadrat = {}
+        self.langkah_delta = 0
+
+    def _kolom(self, c):
+        """
+        (baris, nilai, nilai^2) untuk kolom case vector c; baris=None berarti semua
+        baris (nilai berupa view float32 blok dense, tanpa salinan).
+        """
+        engine = self.engine
+        lokal = engine._lokal_dense[c]
+        if lokal >= 0:
+            return None, engine.dense[:, lokal], engine.dense_sq[:, lokal]
+        posting = engine.posting.get(c)
+        if posting is not None and engine.onehot.biner:
+            baris = baris_dari_bitset(posting)
+            satu = np.ones(len(baris))
+            return baris, satu, satu
+        nilai = engine.onehot.kolom_dense(c)
+        baris = np.flatnonzero(nilai)
+        nilai = nilai[baris].astype(np.float64)
+        return baris, nilai, nilai * nilai
+
+    def _tambah_kolom(self, c, d_uw2, d_w2, d_aktif):
+        """
+        dot += x_c * d_uw2, norm += x_c^2 * d_w2, suku += d_aktif (baris x_c != 0).
+        """
+        baris, nilai, kuadrat = self._kolom(c)
+        if c not in self._maks_kuadrat:
+            self._maks_kuadrat[c] = float(kuadrat.max()) if len(kuadrat) else 0.0
+        self.skala += abs(d_w2) * self._maks_kuadrat[c]
+
+        if baris is None:
+            buf = self._buf
+            if d_uw2:
+                np.multiply(nilai, d_uw2, out=buf)
+                self.dot += buf
+            if d_w2:
+                np.multiply(kuadrat, d_w2, out=buf)
+                self.norm += buf
+            if d_aktif:
+                np.add(self.suku, d_aktif, out=self.suku, where=nilai != 0)
+                if d_aktif < 0:
+                    kosong = self.suku == 0
+                    self.dot[kosong] = 0.0
+                    self.norm[kosong] = 0.0
+            return
+
+        if d_uw2:
+            self.dot[baris] += nilai * d_uw2
+        if d_w2:
+            self.norm[baris] += kuadrat * d_w2
+        if d_aktif:
+            baris = baris[nilai != 0]
+            self.suku[baris] += d_aktif
+            if d_aktif < 0:
+                # Baris tanpa suku aktif: buang sisa galat pembatalan
+                kosong = baris[self.suku[baris] == 0]
+                self.dot[kosong] = 0.0
+                self.norm[kosong] = 0.0
+
+    def _tambah_penalti(self, kolom, target, tanda):
+        """
+        pen += tanda * koef/skala * |numerik - target|, di tempat lewat buffer kerja.
+        """
+        _, koef, skala = next(p for p in PENALTI_NUMERIK if p[0] == kolom)
+        buf = self._buf
+        np.subtract(self.engine.numerik[kolom], target, out=buf)
+        np.abs(buf, out=buf)
+        buf *= tanda * koef / skala
+        self.pen += buf
+
+    def _bangun(self, uw2, w2, targets):
+        n = len(self.engine)
+        self.dot = np.zeros(n)
+        self.norm = np.zeros(n)
+        self.suku = np.zeros(n, dtype=np.int16)
+        self._buf = np.empty(n)
+        self.skala = 0.0
+        for c in np.flatnonzero(w2):
+            self._tambah_kolom(c, uw2[c], w2[c], 1)
+        self.pen = np.zeros(n)
+        for kolom, t in targets.items():
+            self._tambah_penalti(kolom, t, 1.0)
+        self.langkah_delta = 0
+
+    def _perbarui(self, uw2, w2, targets):
+        """
+        Terapkan perubahan koefisien ke jumlahan parsial; kembalikan jumlah kolom yang dibaca.
+        """
+        aktif_baru = w2 != 0
+        if self._uw2 is None or self.langkah_delta >= MAKS_LANGKAH_DELTA:
+            self._bangun(uw2, w2, targets)
+            return int(aktif_baru.sum()), "penuh"
+        aktif_lama = self._w2 != 0
+        berubah = np.flatnonzero((uw2 != self._uw2) | (w2 != self._w2))
+        if len(berubah) > FRAKSI_DELTA_MAKS * max(int(aktif_baru.sum()), 1):
+            self._bangun(uw2, w2, targets)
+            return int(aktif_baru.sum()), "penuh"
+
+        for c in berubah:
+            d_aktif = int(aktif_baru[c]) - int(aktif_lama[c])
+            self._tambah_kolom(c, uw2[c] - self._uw2[c], w2[c] - self._w2[c], d_aktif)
+        for kolom in set(self._targets) | set(targets):
+            lama, baru = self._targets.get(kolom), targets.get(kolom)
+            if lama == baru:
+                continue
+            if lama is not None:
+                self._tambah_penalti(kolom, lama, -1.0)
+            if baru is not None:
+                self._tambah_penalti(kolom, baru, 1.0)
+        self.langkah_delta += 1
+        return len(berubah), "delta"
+
+    def _perkiraan(self, indeks, user_norm, rawan=False):
+        """
+        FinalScore perkiraan float64 (semua baris atau baris indeks). Dengan rawan=True
+        juga mask baris yang normanya terlalu kecil dibanding skala jumlahan.
+        """
+        if indeks is None:
+            dot, norm, pen, suku = self.dot, self.norm, self.pen, self.suku
+        else:
+            dot, norm, pen, suku = self.dot[indeks], self.norm[indeks], self.pen[indeks], self.suku[indeks]
+        batas_norma = NORMA_RAWAN * self.skala
+        ada = norm > batas_norma
+        hasil = np.zeros(len(dot))
+        penyebut = np.sqrt(norm, out=np.ones(len(dot)), where=ada)
+        penyebut *= user_norm
+        np.divide(dot, penyebut, out=hasil, where=ada)
+        hasil -= pen
+        if not rawan:
+            return hasil
+        return hasil, ~ada & (suku > 0)
+
+    @METRIK.ukur("engine.top_k_inkremental")
+    def top_k(self, user_vec, weight_vec, user_input, k=6):
+        """
+        Kembalikan (indeks baris, FinalScore, Similarity) seperti engine.top_k.
+        """
+        engine = self.engine
+        koef = engine._koefisien(user_vec, weight_vec)
+        n = len(engine)
+        if koef is None or n == 0:
+            self.statistik_terakhir = {"mode": "engine", "kolom": 0, "kandidat": n}
+            return engine.top_k(user_vec, weight_vec, user_input, k=k)
+        aktif, uw2_aktif, w2_aktif, user_norm = koef
+
+        # Koefisien dalam float32 yang sama dengan jalur skor persis
+        uw2 = np.zeros(len(engine.kolom))
+        w2 = np.zeros(len(engine.kolom))
+        uw2[aktif] = uw2_aktif
+        w2[aktif] = w2_aktif
+        targets = target_penalti(user_input)
+        kolom, mode = self._perbarui(uw2, w2, targets)
+        self._uw2, self._w2, self._targets = uw2, w2, targets
+
+        k = min(k, n)
+        if k < n and self._top_lama is not None and len(self._top_lama) >= k:
+            # Skor baru top-k iterasi sebelumnya = batas bawah skor ke-k. Similarity
+            # paling tinggi 1, jadi baris dengan 1 - penalti di bawah batas itu
+            # tidak perlu dihitung sama sekali.
+            batas = self._perkiraan(self._top_lama, user_norm).min() - 4 * SLACK
+            pool = np.flatnonzero(self.pen <= 1.0 + SLACK - batas)
+            if len(pool) * 2 > n:
+                pool = None  # hampir semua baris: hitung tanpa gather
+        else:
+            batas = -np.inf
+            pool = None
+        perkiraan, rawan = self._perkiraan(pool, user_norm, rawan=True)
+        if pool is None:
+            pool = np.arange(n)
+
+        if k < n:
+            pilih = perkiraan >= batas
+            if pilih.sum() > 4 * k:
+                kth = np.partition(perkiraan[pilih], pilih.sum() - k)[pilih.sum() - k]
+                pilih &= perkiraan >= kth - 4 * SLACK
+            # Baris rawan (norma sangat kecil) selalu diskor persis
+            kandidat = pool[pilih | rawan]
+        else:
+            kandidat = pool
+
+        final, sim = engine.skor(user_vec, weight_vec, user_input, indeks=kandidat)
+        urut = urutkan_top_k(final, k, indeks=kandidat)
+        self.statistik_terakhir = {"mode": mode, "kolom": kolom, "kandidat": len(kandidat)}
+        self._top_lama = kandidat[urut]
+        return kandidat[urut], final[urut], sim[urut]
+
+    def rekomendasi(self, user_vec, weight_vec, user_input, top_n=6):
+        idx, final, sim = self.top_k(user_vec, weight_vec, user_input, k=top_n)
+        return self.engine.materialisasi(idx, final, sim, user_input)
+
+
+# ==========================
+# SkorInkremental per sesi (dibagi satu proses)
+# ==========================
+class SesiSkor:
+    """
+    SkorInkremental per id sesi untuk semua sesi di satu proses (app Streamlit, layanan),
+    dengan eviction LRU berdasarkan total byte jumlahan parsial (~34 byte per baris katalog
+    per sesi), seperti SharedResultCache. Sesi yang tergeser mulai lagi dari skor penuh
+    di iterasi berikutnya.
+    """
+
+    def __init__(self, maks_byte=64 * 1024 * 1024):
+        self.maks_byte = maks_byte
+        self.bytes = 0
+        self.evictions = 0
+        self._sesi = OrderedDict()  # id sesi -> [lock, SkorInkremental atau None, byte]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sesi)
+
+    def _entri(self, sesi):
+        with self._lock:
+            entri = self._sesi.get(sesi)
+            if entri is None:
+                entri = self._sesi[sesi] = [threading.Lock(), None, 0]
+            else:
+                self._sesi.move_to_end(sesi)
+        return entri
+
+    def _catat_ukuran(self, sesi, entri):
+        """
+        Perbarui ukuran sesi setelah diskor lalu geser sesi terlama sampai di bawah maks_byte.
+        """
+        ukuran = entri[1].nbytes
+        with self._lock:
+            if self._sesi.get(sesi) is not entri:
+                return  # sudah dihapus / tergeser selama diskor
+            self.bytes += ukuran - entri[2]
+            entri[2] = ukuran
+            while self.bytes > self.maks_byte and self._sesi:
+                _, lama = self._sesi.popitem(last=False)
+                self.bytes -= lama[2]
+                self.evictions += 1
+
+    def top_k(self, sesi, engine, user_vec, weight_vec, user_input, k=6):
+        """
+        SkorInkremental.top_k dengan jumlahan parsial milik sesi ini.
+        """
+        entri = self._entri(sesi)
+        with entri[0]:  # satu sesi tidak diskor paralel (jumlahan parsialnya dipakai bergantian)
+            if entri[1] is None or entri[1].engine is not engine:
+                entri[1] = SkorInkremental(engine)
+            hasil = entri[1].top_k(user_vec, weight_vec, user_input, k=k)
+            self._catat_ukuran(sesi, entri)
+            return hasil
+
+    def hapus(self, sesi):
+        """
+        Lepas jumlahan parsial sesi (misal saat sesi selesai).
+        """
+        with self._lock:
+            entri = self._sesi.pop(sesi, None)
+            if entri is not None:
+                self.bytes -= entri[2]
+
+    def stats(self):
+        return {"sesi": len(self._sesi), "bytes": self.bytes, "evictions": self.evictions}
@@ -0,0 +1,117 @@
+"""
+Kolom string berkamus untuk katalog besar: kode int (view mmap bundel) + kamus UTF-8
+lebar tetap yang terurut, didekode hanya untuk baris yang benar-benar dibaca.
+
+pd.Categorical membentuk semua kategori sebagai objek str di setiap proses; untuk kolom
+yang hampir unik per baris (misal Model di katalog jutaan baris) itu ratusan MB memori
+privat per worker. KolomKamus memakai pandas ExtensionArray supaya tetap bisa dipakai di
+DataFrame biasa (iloc, baris hasil, perbandingan dengan string), tetapi memilih baris
+hanya menyalin kode dan mendekode nilai yang diminta.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, take
+from pandas.api.indexers import check_array_indexer
+
+
+class KamusDtype(ExtensionDtype):
+    name = "kamus"
+    type = str
+    kind = "O"
+    na_value = np.nan
+
+    @classmethod
+    def construct_array_type(cls):
+        return KolomKamus
+
+
+class KolomKamus(ExtensionArray):
+    """
+    kode: array int (-1 = NaN), kamus: array bytes UTF-8 terurut (hasil pd.factorize(sort=True)).
+    Tidak bisa diubah isinya (katalog hanya dibaca).
+    """
+
+    def __init__(self, kode, kamus):
+        self.kode = kode
+        self.kamus = kamus
+
+    # ---------- konstruksi ----------
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        kode, kategori = pd.factorize(np.asarray(scalars, dtype=object), sort=True)
+        return cls(kode, np.array([str(k).encode("utf-8") for k in kategori], dtype=bytes))
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls(values, original.kamus)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        kamus = to_concat[0].kamus
+        if all(x.kamus is kamus for x in to_concat):
+            return cls(np.concatenate([x.kode for x in to_concat]), kamus)
+        return cls._from_sequence(np.concatenate([x._dekode() for x in to_concat]))
+
+    # ---------- dekode ----------
+    def _dekode(self, kode=None):
+        kode = self.kode if kode is None else kode
+        hasil = np.full(len(kode), np.nan, dtype=object)
+        ada = kode >= 0
+        hasil[ada] = np.char.decode(self.kamus[kode[ada]], "utf-8")
+        return hasil
+
+    def _kode_untuk(self, nilai):
+        """
+        Kode nilai string di kamus, atau -2 kalau tidak ada (tidak cocok dengan baris mana pun).
+        """
+        teks = str(nilai).encode("utf-8")
+        pos = int(np.searchsorted(self.kamus, teks))
+        return pos if pos < len(self.kamus) and self.kamus[pos] == teks else -2
+
+    def __array__(self, dtype=None, copy=None):
+        return self._dekode().astype(dtype or object, copy=False)
+
+    # ---------- antarmuka ExtensionArray ----------
+    @property
+    def dtype(self):
+        return KamusDtype()
+
+    @property
+    def nbytes(self):
+        return self.kode.nbytes + self.kamus.nbytes
+
+    def __len__(self):
+        return len(self.kode)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            k = int(self.kode[item])
+            return self.kamus[k].decode("utf-8") if k >= 0 else np.nan
+        if not isinstance(item, slice):
+            item = check_array_indexer(self, item)
+        return type(self)(self.kode[item], self.kamus)
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        if isinstance(other, str):
+            return np.asarray(self.kode == self._kode_untuk(other))
+        return self._dekode() == np.asarray(other, dtype=object)
+
+    def isna(self):
+        return np.asarray(self.kode < 0)
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        if allow_fill and fill_value is not None and not pd.isna(fill_value):
+            raise ValueError("KolomKamus hanya bisa diisi NaN.")
+        kode = take(np.asarray(self.kode), indices, allow_fill=allow_fill, fill_value=-1)
+        return type(self)(kode, self.kamus)
+
+    def copy(self):
+        return type(self)(np.array(self.kode), self.kamus)
+
+    def _values_for_factorize(self):
+        return np.asarray(self.kode, dtype=np.int64), -1
+
+    def _values_for_argsort(self):
+        return np.asarray(self.kode)
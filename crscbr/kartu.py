@@ -0,0 +1,185 @@
+"""
+Kartu hasil rekomendasi: satu blok HTML per model (atau per daftar model), bukan satu
+elemen Streamlit per atribut.
+
+Isi kartu (atribut terkelompok, Harga sudah berformat) dibentuk sekali per baris katalog
+dan dipakai ulang oleh semua sesi; setiap rerun hanya menambahkan Skor Kemiripan.
+Kartu memakai <details>, jadi isinya hanya tampil saat dibuka tanpa elemen tambahan.
+"""
+import html
+import re
+import threading
+
+
+ATRIBUT_KELOMPOK = {
+    "🔧 Spesifikasi Mesin": [
+        "Displacement", "PowerHP", "Bore", "Stroke", "PistonCount", "EngineConfig"
+    ],
+    "⚙️ Transmisi & Struktur": [
+        "Transmission", "ClutchType", "WeightKG", "Brand", "Category"
+    ],
+    "⛽ Konsumsi & Kapasitas": [
+        "FuelTank", "FuelConsumptionKML"
+    ],
+    "💰 Harga": [
+        "Price"
+    ],
+    "📊 Skor Kemiripan": [
+        "Similarity"
+    ]
+}
+
+LABEL_ATRIBUT = {
+    "Brand": "Merek",
+    "Category": "Kategori",
+    "Transmission": "Transmisi",
+    "ClutchType": "Jenis Kopling",
+    "Bore": "Diameter Silinder (mm)",
+    "Stroke": "Langkah Piston (mm)",
+    "PistonCount": "Jumlah Piston",
+    "Displacement": "Kapasitas Mesin (cc)",
+    "PowerHP": "Tenaga Maksimum (HP)",
+    "EngineConfig": "Konfigurasi Mesin",
+    "FuelTank": "Kapasitas Tangki (L)",
+    "WeightKG": "Berat Motor (kg)",
+    "FuelConsumptionKML": "Konsumsi BBM (km/L)",
+    "Similarity": "Skor Kemiripan",
+    "Price": "Harga (Rp)"
+}
+
+# Kelompok terakhir (Skor Kemiripan) berubah tiap query; sisanya statis per baris katalog
+KELOMPOK_SKOR = "📊 Skor Kemiripan"
+
+# Sampai ukuran katalog ini isi kartu semua baris dibentuk saat dimuat; di atasnya per baris
+# saat pertama ditampilkan (katalog sintetis jutaan baris tidak perlu ratusan MB string)
+PRAKOMPUTASI_MAKS = 20_000
+CACHE_MAKS = 100_000
+
+
+def format_nilai(attr, value):
+    """
+    Teks tampilan satu atribut (Price pakai pemisah ribuan, Similarity dalam persen).
+    """
+    if attr == "Price":
+        try:
+            return f"{int(value):,}".replace(",", ".")
+        except (TypeError, ValueError):
+            return value
+    if attr == "Similarity":
+        try:
+            return f"{float(value)*100:.4f}%"
+        except (TypeError, ValueError):
+            return value
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return value
+
+
+def _kelompok_html(kategori, pasangan):
+    butir = "".join(
+        f"<li><b>{html.escape(LABEL_ATRIBUT.get(attr, attr))}</b>: {html.escape(str(teks))}</li>"
+        for attr, teks in pasangan
+    )
+    return f"<p><b>{html.escape(kategori)}</b></p>" + (f"<ul>{butir}</ul>" if butir else "")
+
+
+def isi_statis(row):
+    """
+    HTML semua kelompok atribut kecuali Skor Kemiripan untuk satu baris (Series/dict).
+    """
+    return "".join(
+        _kelompok_html(kategori, [(attr, format_nilai(attr, row[attr])) for attr in atribut if attr in row])
+        for kategori, atribut in ATRIBUT_KELOMPOK.items() if kategori != KELOMPOK_SKOR
+    )
+
+
+def isi_skor(row):
+    ada = "Similarity" in row
+    return _kelompok_html(KELOMPOK_SKOR, [("Similarity", format_nilai("Similarity", row["Similarity"]))] if ada else [])
+
+
+def judul_html(judul):
+    """
+    Judul kartu gaya markdown (**tebal**) jadi HTML aman.
+    """
+    return re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", html.escape(judul))
+
+
+def html_kartu(judul, statis, skor):
+    return f'<details><summary>{judul_html(judul)}</summary>{statis}{skor}</details>'
+
+
+# ==========================
+# Isi kartu per baris katalog (dipakai bersama semua sesi)
+# ==========================
+class KartuKatalog:
+    """
+    Cache HTML isi kartu per baris katalog untuk satu versi katalog.
+    Baris dikenali dari label index (row.name, sama untuk final_df dan katalog mentah)
+    dan dicek ulang lewat nama Model; baris lain (misal dict di session_state)
+    diformat langsung.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        # Series, bukan to_numpy(): kolom Model bundel besar didekode per baris (KolomKamus)
+        self._model = df["Model"] if "Model" in df.columns else None
+        self._isi = {}
+        self._lock = threading.Lock()
+        if len(df) <= PRAKOMPUTASI_MAKS:
+            self._prakomputasi()
+
+    def _prakomputasi(self):
+        # Format per kolom (sekali per atribut), lalu gabung per baris
+        kolom = {
+            attr: [format_nilai(attr, v) for v in self.df[attr].to_numpy()]
+            for atribut in ATRIBUT_KELOMPOK.values() for attr in atribut if attr in self.df.columns
+        }
+        for i in range(len(self.df)):
+            self._isi[i] = "".join(
+                _kelompok_html(kategori, [(attr, kolom[attr][i]) for attr in atribut if attr in kolom])
+                for kategori, atribut in ATRIBUT_KELOMPOK.items() if kategori != KELOMPOK_SKOR
+            )
+
+    def posisi(self, row):
+        """
+        Posisi baris katalog untuk row (Series hasil iloc), atau None kalau bukan baris katalog ini.
+        """
+        label = getattr(row, "name", None)
+        if label is None or self._model is None:
+            return None
+        try:
+            pos = self.df.index.get_loc(label)
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(pos, int) or row.get("Model") != self._model.iloc[pos]:
+            return None
+        return pos
+
+    def isi(self, row):
+        pos = self.posisi(row)
+        if pos is None:
+            return isi_statis(row)
+        teks = self._isi.get(pos)
+        if teks is None:
+            teks = isi_statis(self.df.iloc[pos])
+            with self._lock:
+                if len(self._isi) >= CACHE_MAKS:
+                    self._isi.clear()
+                self._isi[pos] = teks
+        return teks
+
+    def kartu(self, row, judul=None):
+        """
+        HTML satu kartu; judul bawaan nama model (huruf besar, tebal).
+        """
+        if judul is None:
+            judul = f"🏍️ **{row.get('Model', 'Model X').upper()}**"
+        return html_kartu(judul, self.isi(row), isi_skor(row))
+
+    def kartu_banyak(self, daftar, pemisah=False):
+        """
+        HTML beberapa kartu sekaligus dari [(row, judul), ...]; pemisah=True menambah garis di antaranya.
+        """
+        sela = "<hr>" if pemisah else ""
+        return sela.join(self.kartu(row, judul) for row, judul in daftar) + sela
@@ -0,0 +1,88 @@
+import pandas as pd
+
+from crscbr.schema import KOLOM_KATEGORIKAL, KOLOM_NUMERIK, FeatureSchema
+
+
+# ==========================
+# Baca file katalog (xlsx / pickle)
+# ==========================
+def baca_katalog(path):
+    """
+    Baca katalog motor dari .xlsx atau .pkl, kolom string dinormalisasi ke str
+    seperti di load_df/load_final_df/load_case_vector_df.
+    """
+    if path.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_pickle(path)
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype(str)
+    return df
+
+
+# ==========================
+# One-hot + min-max (sama seperti Prototype.ipynb)
+# ==========================
+def bangun_artefak(df, vocab=None, stats=None):
+    """
+    Bangun final_df, case_vector_df dan FeatureSchema dari katalog mentah.
+
+    Urutan kolom sama dengan notebook: kolom mentah, *_normalized (MinMaxScaler),
+    lalu one-hot per atribut dengan kategori terurut (OneHotEncoder).
+    vocab = {atribut: [nilai, ...]} dipakai kalau kolom one-hot harus tetap
+    walaupun ada nilai yang tidak muncul di df. stats = {atribut: (min, max)}
+    dipakai kalau batas normalisasi sudah ditentukan (misal build inkremental).
+    """
+    df = df.reset_index(drop=True)
+    if vocab is None:
+        vocab = vocab_katalog(df)
+    if stats is None:
+        stats = statistik_numerik(df)
+    case_vector_df = encode_case_vector(df, vocab, stats)
+    final_df = pd.concat([df, case_vector_df], axis=1)
+    schema = FeatureSchema.dari_kolom(case_vector_df.columns, stats)
+    return final_df, case_vector_df, schema
+
+
+def vocab_katalog(df):
+    """
+    Kategori one-hot per atribut (terurut, sama seperti OneHotEncoder).
+    """
+    return {attr: sorted(df[attr].dropna().unique()) for attr in KOLOM_KATEGORIKAL}
+
+
+def statistik_numerik(df):
+    """
+    Batas min-max per kolom numerik (sama seperti MinMaxScaler.fit).
+    """
+    stats = {}
+    for attr in KOLOM_NUMERIK:
+        nilai = df[attr].to_numpy(dtype=float)
+        stats[attr] = (float(nilai.min()), float(nilai.max()))
+    return stats
+
+
+def encode_case_vector(df, vocab, stats):
+    """
+    case_vector_df untuk baris df dengan vocab dan batas normalisasi tetap.
+    Tiap baris di-encode sendiri-sendiri, jadi hasilnya sama untuk subset baris.
+    """
+    df = df.reset_index(drop=True)
+    scaled = {}
+    for attr in KOLOM_NUMERIK:
+        # Rumus MinMaxScaler (x * scale_ + min_), supaya hasilnya identik dengan notebook
+        min_val, max_val = stats[attr]
+        rentang = max_val - min_val
+        scale = 1.0 / (rentang if rentang else 1.0)
+        nilai = df[attr].to_numpy(dtype=float) * scale
+        nilai += -min_val * scale
+        scaled[f"{attr}_normalized"] = nilai
+
+    encoded = {}
+    for attr in KOLOM_KATEGORIKAL:
+        nilai = df[attr].to_numpy()
+        for val in vocab[attr]:
+            encoded[f"{attr}_{val}"] = (nilai == val).astype(float)
+
+    return pd.DataFrame({**scaled, **encoded})
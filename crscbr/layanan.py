@@ -0,0 +1,626 @@
+"""
+Layanan rekomendasi HTTP/JSON lokal (asyncio, standard library) di atas satu engine hangat.
+
+Contoh:
+    python -m crscbr.layanan --port 8765 --katalog update1 --worker 4
+
+Beberapa proses UI (atau klien lain) bisa memakai satu engine yang sama lewat
+layanan ini, dan layanan bisa diuji beban sendiri (benchmarks/beban_layanan.py).
+
+Endpoint (body dan jawaban JSON):
+    POST /encode   {"user_input", "prioritas"}
+                   -> {"versi", "kolom", "user_vec", "weight_vec"} (kolom non-nol saja)
+    POST /top_k    {"user_input", "prioritas", "k"}
+                   -> {"katalog", "versi", "hasil": [baris katalog + skor]}
+    POST /refine   {"sesi", "user_input", "perubahan", "prioritas", "k"}
+                   -> seperti /top_k plus "user_input" sesudah perubahan; skor
+                      inkremental per sesi (SkorInkremental) untuk katalog besar
+    POST /case     {"user_input", "model", "similarity", "source", "refine_steps", "user_ranked"}
+                   -> {"case_id", "ditambah"}
+    GET  /status   versi katalog, cache, antrean, statistik batch
+    GET  /metrics  histogram latensi span (teks Prometheus, lihat crscbr.metrik);
+                   /metrics.json ringkasan yang sama dalam JSON. Kosong kecuali
+                   dijalankan dengan --metrik atau CRSCBR_METRIK=1
+
+Permintaan /top_k masuk antrean; pengumpul mengambil satu batch setiap ada
+worker kosong, jadi saat beban tinggi batch terisi sendiri. Query yang identik
+dalam satu batch (dan di cache hasil bersama) hanya dihitung sekali.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from crscbr.ann import ANN_MIN_BARIS
+from crscbr.cache import SharedResultCache, kunci_query
+from crscbr.case_store import CaseStore, buat_data_case
+from crscbr.inkremental import INKREMENTAL_MIN_BARIS, SesiSkor
+from crscbr.metrik import METRIK
+from crscbr.registry import RegistriKatalog, muat_versi
+
+
+MAKS_BODY = 1024 * 1024
+MAKS_K = 100
+TIMEOUT_IDLE = 30.0
+
+
+class GalatLayanan(Exception):
+    """
+    Error dengan status HTTP (dipakai server untuk jawaban, dan klien untuk jawaban non-200).
+    """
+
+    def __init__(self, status, pesan):
+        super().__init__(pesan)
+        self.status = int(status)
+        self.pesan = pesan
+
+
+# ==========================
+# Validasi body dan serialisasi hasil
+# ==========================
+def _ambil(body, nama, jenis, bawaan=None, wajib=False):
+    nilai = body.get(nama, bawaan)
+    if nilai is None:
+        if wajib:
+            raise ValueError(f"Field {nama} wajib diisi.")
+        return bawaan
+    if not isinstance(nilai, jenis) or isinstance(nilai, bool) and jenis is not bool:
+        raise ValueError(f"Field {nama} harus bertipe {getattr(jenis, '__name__', 'angka')}.")
+    return nilai
+
+
+def _ambil_k(body):
+    k = _ambil(body, "k", int, bawaan=6)
+    if not 1 <= k <= MAKS_K:
+        raise ValueError(f"k harus di antara 1 dan {MAKS_K}.")
+    return k
+
+
+def _nilai_json(v):
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+
+def _waktu_WIB():
+    import pytz  # baru di-import saat case pertama dicatat
+    return datetime.now(pytz.timezone("Asia/Jakarta"))
+
+
+# ==========================
+# Layanan
+# ==========================
+class Layanan:
+    """
+    Server HTTP/JSON di atas RegistriKatalog (versi aktif bisa diganti tanpa restart).
+
+    Batas konkurensi:
+        worker         thread skoring (numpy melepas GIL di operasi besar)
+        ukuran_batch   query /top_k maksimal per batch
+        tunggu_batch   detik menunggu query lain sebelum batch dikirim (0 = tidak menunggu)
+        maks_antrean   query /top_k yang boleh menunggu; lebih dari itu dijawab 503
+        maks_koneksi   koneksi terbuka; lebih dari itu dijawab 503 lalu ditutup
+        maks_byte_sesi total byte jumlahan parsial sesi refinement (LRU); tiap sesi ~34
+                       byte per baris katalog kalau katalog >= INKREMENTAL_MIN_BARIS
+    """
+
+    def __init__(self, registri, worker=4, ukuran_batch=32, tunggu_batch=0.0, maks_antrean=1024,
+                 maks_koneksi=256, maks_byte_sesi=64 * 1024 * 1024, case_store=None, penulis=None, spreadsheet_id=None,
+                 sheet_case="case_base", cache=None):
+        self.registri = registri
+        self.worker = worker
+        self.ukuran_batch = ukuran_batch
+        self.tunggu_batch = tunggu_batch
+        self.maks_antrean = maks_antrean
+        self.maks_koneksi = maks_koneksi
+        self.maks_byte_sesi = maks_byte_sesi
+        self.case_store = case_store
+        self.penulis = penulis
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_case = sheet_case
+
+        self.cache = cache if cache is not None else SharedResultCache(max_bytes=8 * 1024 * 1024)
+        registri.tambah_pendengar(lambda lama, baru: self.cache.pastikan_versi(baru.versi))
+        if registri.aktif() is not None:
+            self.cache.pastikan_versi(registri.aktif().versi)
+
+        self._executor = ThreadPoolExecutor(max_workers=worker, thread_name_prefix="layanan")
+        self._sesi = SesiSkor(maks_byte_sesi)
+        self._cache_kolom = None
+        self._antrean = None
+        self._slot_worker = None
+        self._koneksi = 0
+        self._server = None
+        self._tugas = []
+        self._batch_jalan = set()
+        self.statistik = {
+            "permintaan": 0, "ditolak": 0, "error": 0,
+            "batch": 0, "query_batch": 0, "query_unik": 0, "batch_terbesar": 0,
+        }
+
+        self._rute = {
+            ("POST", "/encode"): self._encode,
+            ("POST", "/top_k"): self._top_k,
+            ("POST", "/refine"): self._refine,
+            ("POST", "/case"): self._case,
+            ("GET", "/status"): self._status,
+            ("GET", "/metrics"): self._metrik,
+            ("GET", "/metrics.json"): self._metrik_json,
+        }
+
+    # ---------- siklus hidup ----------
+    async def mulai(self, host="127.0.0.1", port=8765):
+        if self.registri.aktif() is None:
+            raise ValueError("Registry belum punya versi katalog aktif; panggil muat_awal dulu.")
+        self._antrean = asyncio.Queue(maxsize=self.maks_antrean)
+        self._slot_worker = asyncio.Semaphore(self.worker)
+        self._tugas.append(asyncio.create_task(self._kumpulkan_batch()))
+        self._server = await asyncio.start_server(self._tangani_koneksi, host, port)
+        return self._server
+
+    def pantau_penunjuk(self, path, bawaan, interval=1.0):
+        """
+        Periksa file penunjuk versi katalog secara berkala (lihat RegistriKatalog.pantau_penunjuk).
+        """
+        async def pantau():
+            while True:
+                try:
+                    self.registri.pantau_penunjuk(path, bawaan)
+                except Exception as e:
+                    print(f"penunjuk katalog {path}: {e}", file=sys.stderr)
+                await asyncio.sleep(interval)
+        self._tugas.append(asyncio.create_task(pantau()))
+
+    async def berhenti(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for tugas in self._tugas:
+            tugas.cancel()
+        self._executor.shutdown(wait=True)
+        if self.penulis is not None:
+            self.penulis.stop()
+
+    # ---------- HTTP ----------
+    async def _tangani_koneksi(self, reader, writer):
+        if self._koneksi >= self.maks_koneksi:
+            self.statistik["ditolak"] += 1
+            await self._tulis(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Terlalu banyak koneksi."}, False)
+            writer.close()
+            return
+        self._koneksi += 1
+        try:
+            while True:
+                try:
+                    permintaan = await asyncio.wait_for(self._baca(reader), TIMEOUT_IDLE)
+                except GalatLayanan as e:
+                    await self._tulis(writer, e.status, {"error": e.pesan}, False)
+                    break
+                if permintaan is None:
+                    break
+                metode, path, tetap, body = permintaan
+                status, jawaban = await self._jawab(metode, path, body)
+                await self._tulis(writer, status, jawaban, tetap)
+                if not tetap:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._koneksi -= 1
+            writer.close()
+
+    async def _baca(self, reader):
+        """
+        (metode, path, keep_alive, body) satu permintaan HTTP/1.x, atau None kalau koneksi ditutup.
+        """
+        baris = await reader.readline()
+        if not baris:
+            return None
+        try:
+            metode, target, versi_http = baris.decode("latin-1").split()
+        except ValueError:
+            raise GalatLayanan(HTTPStatus.BAD_REQUEST, "Baris permintaan HTTP tidak valid.")
+        header = {}
+        while True:
+            baris = await reader.readline()
+            if baris in (b"\r\n", b"\n", b""):
+                break
+            nama, _, nilai = baris.decode("latin-1").partition(":")
+            header[nama.strip().lower()] = nilai.strip()
+
+        try:
+            panjang = int(header.get("content-length") or 0)
+        except ValueError:
+            raise GalatLayanan(HTTPStatus.BAD_REQUEST, "Content-Length tidak valid.")
+        if panjang > MAKS_BODY:
+            raise GalatLayanan(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body lebih dari {MAKS_BODY} byte.")
+        body = await reader.readexactly(panjang) if panjang else b""
+        koneksi = header.get("connection", "").lower()
+        tetap = koneksi == "keep-alive" if versi_http == "HTTP/1.0" else koneksi != "close"
+        return metode.upper(), target.split("?", 1)[0], tetap, body
+
+    async def _tulis(self, writer, status, jawaban, tetap):
+        if isinstance(jawaban, str):  # /metrics: teks Prometheus
+            data, jenis = jawaban.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data, jenis = json.dumps(jawaban, ensure_ascii=False, default=str).encode("utf-8"), "application/json; charset=utf-8"
+        status = HTTPStatus(status)
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {jenis}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if tetap else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _jawab(self, metode, path, body):
+        self.statistik["permintaan"] += 1
+        handler = self._rute.get((metode, path))
+        if handler is None:
+            if any(p == path for _, p in self._rute):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"Metode {metode} tidak didukung untuk {path}."}
+            return HTTPStatus.NOT_FOUND, {"error": f"Endpoint {path} tidak ada."}
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError("Body harus objek JSON.")
+            aktif = self.registri.aktif()
+            with METRIK.konteks(step=path, versi=aktif.versi if aktif is not None else None), METRIK.span("layanan.permintaan"):
+                return HTTPStatus.OK, await handler(data)
+        except GalatLayanan as e:
+            if e.status == HTTPStatus.SERVICE_UNAVAILABLE:
+                self.statistik["ditolak"] += 1
+            return e.status, {"error": e.pesan}
+        except (ValueError, KeyError, TypeError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            self.statistik["error"] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _di_worker(self, fn, *args):
+        # Konteks disalin supaya span di thread worker ikut berlabel endpoint dan versi katalog
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, contextvars.copy_context().run, fn, *args
+        )
+
+    # ---------- batching /top_k ----------
+    async def _kumpulkan_batch(self):
+        antrean = self._antrean
+        while True:
+            await self._slot_worker.acquire()  # batch baru dibentuk hanya kalau ada worker kosong
+            batch = [await antrean.get()]
+            while len(batch) < self.ukuran_batch and not antrean.empty():
+                batch.append(antrean.get_nowait())
+            if len(batch) < self.ukuran_batch and self.tunggu_batch > 0:
+                await asyncio.sleep(self.tunggu_batch)
+                while len(batch) < self.ukuran_batch and not antrean.empty():
+                    batch.append(antrean.get_nowait())
+            tugas = asyncio.create_task(self._jalankan_batch(batch))
+            self._batch_jalan.add(tugas)  # simpan referensi supaya task tidak dibuang GC
+            tugas.add_done_callback(self._batch_jalan.discard)
+
+    async def _jalankan_batch(self, batch):
+        try:
+            versi = self.registri.aktif()
+            hasil, jumlah_unik = await self._di_worker(self._skor_batch, versi, [p[:3] for p in batch])
+            statistik = self.statistik
+            statistik["batch"] += 1
+            statistik["query_batch"] += len(batch)
+            statistik["query_unik"] += jumlah_unik
+            statistik["batch_terbesar"] = max(statistik["batch_terbesar"], len(batch))
+            for (_, _, _, future), h in zip(batch, hasil):
+                if future.done():
+                    continue
+                if isinstance(h, Exception):
+                    future.set_exception(h)
+                else:
+                    future.set_result(h)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slot_worker.release()
+
+    def _skor_batch(self, versi, batch):
+        """
+        Jalan di thread worker: skor tiap query unik sekali (lewat cache hasil bersama),
+        lalu kembalikan (jawaban per permintaan, jumlah query unik).
+        """
+        engine = versi.engine
+        unik = {}
+        hasil = []
+        with METRIK.konteks(step="/top_k", versi=versi.versi), METRIK.span("layanan.batch"):
+            for user_input, prioritas, k in batch:
+                kunci = kunci_query(user_input, prioritas, versi.versi, k)
+                if kunci not in unik:
+                    def hitung(user_input=user_input, prioritas=prioritas, k=k):
+                        user_vec, weight_vec = engine.encode(user_input, prioritas)
+                        return engine.top_k(user_vec, weight_vec, user_input, k=k)
+                    try:
+                        unik[kunci] = self._jawaban_hasil(versi, self.cache.ambil_atau_hitung(kunci, hitung), user_input)
+                    except Exception as e:
+                        unik[kunci] = e
+                hasil.append(unik[kunci])
+        return hasil, len(unik)
+
+    def _kolom_katalog(self, versi):
+        """
+        (nama, array) kolom katalog mentah versi ini, urutan kolom final_df; dibentuk
+        sekali per versi supaya jawaban tidak perlu DataFrame (materialisasi ~2 ms).
+        """
+        cache = self._cache_kolom
+        if cache is None or cache[0] is not versi:
+            fitur = set(versi.engine.kolom)
+            kolom = [(c, versi.final_df[c].to_numpy()) for c in versi.final_df.columns if c not in fitur]
+            cache = self._cache_kolom = (versi, kolom)
+        return cache[1]
+
+    def _jawaban_hasil(self, versi, topk, user_input):
+        """
+        Baris hasil seperti engine.materialisasi (kolom katalog, Similarity, *Penalty,
+        FinalScore) tanpa kolom case vector.
+        """
+        idx, final, sim = topk
+        kolom = [(c, arr[idx]) for c, arr in self._kolom_katalog(versi)]
+        kolom.append(("Similarity", sim))
+        for nama, nilai in versi.engine.kolom_penalti(idx, user_input):
+            kolom.append((nama, nilai if isinstance(nilai, np.ndarray) else np.full(len(idx), nilai)))
+        kolom.append(("FinalScore", final))
+        rekaman = [{"indeks": int(i)} for i in idx]
+        for c, nilai in kolom:
+            for r, v in zip(rekaman, nilai.tolist()):
+                r[c] = _nilai_json(v)
+        return {"katalog": versi.nama, "versi": versi.versi, "hasil": rekaman}
+
+    # ---------- endpoint ----------
+    def _preferensi(self, body):
+        user_input = _ambil(body, "user_input", dict, wajib=True)
+        prioritas = _ambil(body, "prioritas", dict, bawaan={})
+        return user_input, prioritas
+
+    async def _encode(self, body):
+        user_input, prioritas = self._preferensi(body)
+        versi = self.registri.aktif()
+        user_vec, weight_vec = versi.engine.encode(user_input, prioritas)
+        aktif = np.flatnonzero((np.asarray(user_vec) != 0) | (np.asarray(weight_vec) != 0))
+        return {
+            "versi": versi.versi,
+            "kolom": [versi.engine.kolom[c] for c in aktif],
+            "user_vec": [float(user_vec[c]) for c in aktif],
+            "weight_vec": [float(weight_vec[c]) for c in aktif],
+        }
+
+    async def _top_k(self, body):
+        user_input, prioritas = self._preferensi(body)
+        k = _ambil_k(body)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._antrean.put_nowait((user_input, prioritas, k, future))
+        except asyncio.QueueFull:
+            raise GalatLayanan(HTTPStatus.SERVICE_UNAVAILABLE, "Antrean skoring penuh, coba lagi.")
+        return await future
+
+    def _skor_refine(self, versi, sesi, user_input, prioritas, k):
+        engine = versi.engine
+        kunci = kunci_query(user_input, prioritas, versi.versi, k)
+
+        def hitung():
+            user_vec, weight_vec = engine.encode(user_input, prioritas)
+            if len(engine) < INKREMENTAL_MIN_BARIS:
+                return engine.top_k(user_vec, weight_vec, user_input, k=k)
+            return self._sesi.top_k(sesi, engine, user_vec, weight_vec, user_input, k=k)
+        topk = self.cache.ambil_atau_hitung(kunci, hitung)
+        return self._jawaban_hasil(versi, topk, user_input)
+
+    async def _refine(self, body):
+        sesi = _ambil(body, "sesi", str, wajib=True)
+        user_input, prioritas = self._preferensi(body)
+        perubahan = _ambil(body, "perubahan", dict, bawaan={})
+        k = _ambil_k(body)
+        user_input = {**user_input, **perubahan}
+        jawaban = await self._di_worker(self._skor_refine, self.registri.aktif(), sesi, user_input, prioritas, k)
+        return {**jawaban, "user_input": user_input}
+
+    def _simpan_case(self, case_data):
+        ditambah = self.case_store.tambah_case(case_data)
+        if self.penulis is not None and self.spreadsheet_id:
+            self.penulis.kirim(self.spreadsheet_id, self.sheet_case, list(case_data.values()))
+        return ditambah
+
+    async def _case(self, body):
+        if self.case_store is None:
+            raise GalatLayanan(HTTPStatus.NOT_IMPLEMENTED, "Layanan dijalankan tanpa case store.")
+        user_input = _ambil(body, "user_input", dict, wajib=True)
+        row_model = {"Model": _ambil(body, "model", str, wajib=True)}
+        similarity = _ambil(body, "similarity", (int, float))
+        if similarity is not None:
+            row_model["Similarity"] = similarity
+        row_model["source"] = _ambil(body, "source", str, bawaan="cosine_similarity")
+        refine_log = _ambil(body, "refine_steps", list, bawaan=[])
+
+        waktu = _waktu_WIB()
+        case_data = buat_data_case(
+            f"case_{waktu.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}",
+            waktu.strftime("%Y-%m-%d %H:%M:%S"),
+            user_input, row_model,
+            refined=bool(refine_log), refine_log=refine_log,
+            user_ranked=bool(body.get("user_ranked", False)),
+        )
+        ditambah = await self._di_worker(self._simpan_case, case_data)
+        return {"case_id": case_data["case_id"], "ditambah": ditambah}
+
+    async def _status(self, body):
+        return {
+            "registri": self.registri.status(),
+            "cache": self.cache.stats(),
+            "statistik": dict(self.statistik),
+            "antrean": self._antrean.qsize(),
+            "koneksi": self._koneksi,
+            "sesi": self._sesi.stats(),
+            "batas": {
+                "worker": self.worker, "ukuran_batch": self.ukuran_batch, "tunggu_batch": self.tunggu_batch,
+                "maks_antrean": self.maks_antrean, "maks_koneksi": self.maks_koneksi, "maks_byte_sesi": self.maks_byte_sesi,
+            },
+        }
+
+    async def _metrik(self, body):
+        return METRIK.prometheus()
+
+    async def _metrik_json(self, body):
+        return METRIK.ke_dict()
+
+
+# ==========================
+# Klien (satu koneksi keep-alive; satu klien per thread)
+# ==========================
+class KlienLayanan:
+    """
+    Klien sinkron kecil untuk Layanan, misal dari proses Streamlit lain atau uji beban.
+    """
+
+    def __init__(self, url="http://127.0.0.1:8765", timeout=30.0):
+        bagian = urlsplit(url)
+        self.host = bagian.hostname or "127.0.0.1"
+        self.port = bagian.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def _panggil(self, metode, path, data=None):
+        body = None if data is None else json.dumps(data, ensure_ascii=False).encode("utf-8")
+        header = {"Content-Type": "application/json"} if body is not None else {}
+        for coba in range(2):
+            if self._conn is None:
+                self._conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(metode, path, body=body, headers=header)
+                jawaban = self._conn.getresponse()
+                isi = json.loads(jawaban.read() or b"{}")
+                break
+            except (ConnectionError, OSError):
+                # Koneksi keep-alive ditutup server (idle/restart): sambung ulang sekali
+                self.tutup()
+                if coba:
+                    raise
+        if jawaban.getheader("Connection", "").lower() == "close":
+            self.tutup()
+        if jawaban.status != HTTPStatus.OK:
+            raise GalatLayanan(jawaban.status, isi.get("error", jawaban.reason))
+        return isi
+
+    def tutup(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def encode(self, user_input, prioritas):
+        return self._panggil("POST", "/encode", {"user_input": user_input, "prioritas": prioritas})
+
+    def top_k(self, user_input, prioritas, k=6):
+        return self._panggil("POST", "/top_k", {"user_input": user_input, "prioritas": prioritas, "k": k})
+
+    def refine(self, sesi, user_input, perubahan, prioritas, k=6):
+        return self._panggil("POST", "/refine", {
+            "sesi": sesi, "user_input": user_input, "perubahan": perubahan, "prioritas": prioritas, "k": k,
+        })
+
+    def simpan_case(self, user_input, model, similarity=None, source="cosine_similarity",
+                    refine_steps=None, user_ranked=False):
+        return self._panggil("POST", "/case", {
+            "user_input": user_input, "model": model, "similarity": similarity, "source": source,
+            "refine_steps": refine_steps or [], "user_ranked": user_ranked,
+        })
+
+    def status(self):
+        return self._panggil("GET", "/status")
+
+    def metrik(self):
+        return self._panggil("GET", "/metrics.json")
+
+
+# ==========================
+# CLI
+# ==========================
+async def _jalankan(args):
+    ann_min_baris = args.ann_min_baris or None
+    registri = RegistriKatalog(pemuat=lambda nama: muat_versi(nama, args.folder, ann_min_baris=ann_min_baris))
+    if args.penunjuk:
+        registri.pantau_penunjuk(args.penunjuk, args.katalog)
+    else:
+        registri.muat_awal(args.katalog)
+
+    penulis = None
+    if args.kredensial and args.spreadsheet_id:
+        from crscbr.sheets_client import SheetsClientPool
+        from crscbr.writer import SheetsBackend, WriteBehindQueue
+        with open(args.kredensial, encoding="utf-8") as f:
+            pool = SheetsClientPool(json.load(f))
+        penulis = WriteBehindQueue(SheetsBackend(pool), journal_path=args.journal).start()
+
+    layanan = Layanan(
+        registri, worker=args.worker, ukuran_batch=args.ukuran_batch, tunggu_batch=args.tunggu_batch_ms / 1e3,
+        maks_antrean=args.maks_antrean, maks_koneksi=args.maks_koneksi, maks_byte_sesi=args.maks_mb_sesi * 1024 * 1024,
+        case_store=CaseStore(args.case_store) if args.case_store else None,
+        penulis=penulis, spreadsheet_id=args.spreadsheet_id,
+    )
+    server = await layanan.mulai(args.host, args.port)
+    if args.penunjuk:
+        layanan.pantau_penunjuk(args.penunjuk, args.katalog)
+    aktif = registri.aktif()
+    print(
+        f"layanan {args.host}:{args.port}: katalog {aktif.nama} ({len(aktif.engine)} motor, versi {aktif.versi}), "
+        f"{args.worker} worker",
+        file=sys.stderr,
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await layanan.berhenti()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan rekomendasi HTTP/JSON lokal di atas satu engine.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--katalog", default="update1", help="Nama versi katalog (akhiran artefak)")
+    parser.add_argument("--folder", default=".", help="Folder artefak / bundel katalog")
+    parser.add_argument("--penunjuk", help="File penunjuk versi aktif (misal katalog_aktif.txt), diperiksa tiap detik")
+    parser.add_argument("--ann-min-baris", type=int, default=ANN_MIN_BARIS,
+                        help="Katalog sebesar ini ke atas memakai indeks AnnIndex untuk top-k (0 = tidak pernah)")
+    parser.add_argument("--worker", type=int, default=4)
+    parser.add_argument("--ukuran-batch", type=int, default=32)
+    parser.add_argument("--tunggu-batch-ms", type=float, default=0.0)
+    parser.add_argument("--maks-antrean", type=int, default=1024)
+    parser.add_argument("--maks-koneksi", type=int, default=256)
+    parser.add_argument("--maks-mb-sesi", type=int, default=64, help="Batas memori jumlahan parsial sesi refinement")
+    parser.add_argument("--case-store", default="case_base.sqlite", help="SQLite case base ('' = tanpa /case)")
+    parser.add_argument("--kredensial", help="JSON service account untuk mirror case ke Google Sheets")
+    parser.add_argument("--spreadsheet-id")
+    parser.add_argument("--journal", default="gsheet_journal.jsonl.layanan")
+    parser.add_argument("--metrik", action="store_true", help="Catat histogram latensi span (GET /metrics)")
+    args = parser.parse_args(argv)
+
+    METRIK.mulai_jika_aktif()
+    if args.metrik:
+        METRIK.aktif = True
+
+    try:
+        asyncio.run(_jalankan(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Metrik latensi: span waktu per langkah UI, skoring engine dan panggilan storage,
+diagregasi jadi histogram per (span, step, versi katalog).
+
+Aktif lewat environment:
+    CRSCBR_METRIK=1              catat span
+    CRSCBR_METRIK_PORT=9464      catat span + endpoint http://127.0.0.1:9464/metrics
+                                 (format teks Prometheus) dan /metrics.json
+    CRSCBR_METRIK_JSON=path      tulis ringkasan JSON ke path saat proses keluar
+
+Kalau tidak aktif, span() mengembalikan context manager kosong yang sama setiap
+kali, jadi biayanya hanya satu pemanggilan fungsi. Modul ini hanya memakai
+standard library (sama seperti crscbr.startup).
+"""
+import atexit
+import bisect
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+
+ENV_AKTIF = "CRSCBR_METRIK"
+ENV_PORT = "CRSCBR_METRIK_PORT"
+ENV_JSON = "CRSCBR_METRIK_JSON"
+
+NAMA_METRIK = "crscbr_span_seconds"
+LABEL = ("span", "step", "versi")
+
+# Batas atas bucket histogram (detik), kira-kira 1-2.5-5 per dekade dari 100 us sampai 10 s
+BUCKET = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label step/versi yang berlaku untuk span di konteks ini (thread script Streamlit, task asyncio)
+_KONTEKS = contextvars.ContextVar("crscbr_metrik_konteks", default={})
+
+
+class _Histogram:
+    __slots__ = ("bucket", "jumlah", "total", "maks")
+
+    def __init__(self):
+        self.bucket = [0] * (len(BUCKET) + 1)  # terakhir = +Inf
+        self.jumlah = 0
+        self.total = 0.0
+        self.maks = 0.0
+
+    def tambah(self, detik):
+        self.bucket[bisect.bisect_left(BUCKET, detik)] += 1
+        self.jumlah += 1
+        self.total += detik
+        if detik > self.maks:
+            self.maks = detik
+
+    def kuantil(self, q):
+        """
+        Perkiraan kuantil dari bucket (interpolasi linear di dalam bucket, seperti histogram_quantile).
+        """
+        if not self.jumlah:
+            return None
+        target = q * self.jumlah
+        kumulatif = 0
+        for i, n in enumerate(self.bucket):
+            if kumulatif + n >= target and n:
+                bawah = BUCKET[i - 1] if i else 0.0
+                atas = BUCKET[i] if i < len(BUCKET) else self.maks
+                return min(bawah + (atas - bawah) * (target - kumulatif) / n, self.maks)
+            kumulatif += n
+        return self.maks
+
+
+class _Span:
+    __slots__ = ("metrik", "nama", "label", "t0")
+
+    def __init__(self, metrik, nama, label):
+        self.metrik = metrik
+        self.nama = nama
+        self.label = label
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrik.catat(self.nama, time.perf_counter() - self.t0, **self.label)
+        return False
+
+
+class _SpanKosong:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SPAN_KOSONG = _SpanKosong()
+
+
+class Metrik:
+    """
+    Kumpulan histogram durasi span, thread-safe.
+
+    Label span: span (nama, misal "step" atau "storage.case_store.tambah_case"),
+    step dan versi (diambil dari konteks() kalau tidak diberikan langsung).
+    """
+
+    def __init__(self):
+        self.aktif = False
+        self.mulai = time.time()
+        self._histogram = {}  # (span, step, versi) -> _Histogram
+        self._lock = threading.Lock()
+        self._server = None
+        self._json_saat_keluar = None
+
+    def mulai_jika_aktif(self):
+        """
+        Aktifkan dari environment (idempoten; rerun Streamlit tidak memasang ulang).
+        """
+        port = os.environ.get(ENV_PORT)
+        if os.environ.get(ENV_AKTIF) == "1" or port or os.environ.get(ENV_JSON):
+            self.aktif = True
+        if port:
+            self.layani(int(port))
+        path = os.environ.get(ENV_JSON)
+        if path and self._json_saat_keluar is None:
+            self._json_saat_keluar = path
+            atexit.register(self.simpan_json, path)
+        return self
+
+    # ---------- pencatatan ----------
+    def span(self, nama, **label):
+        """
+        Context manager yang mencatat durasi blok sebagai span nama.
+        """
+        if not self.aktif:
+            return _SPAN_KOSONG
+        return _Span(self, nama, label)
+
+    def ukur(self, nama):
+        """
+        Decorator: setiap pemanggilan fungsi dicatat sebagai span nama (dicek saat dipanggil,
+        jadi fungsi yang didekorasi sebelum metrik diaktifkan tetap ikut tercatat).
+        """
+        def dekorator(fn):
+            @functools.wraps(fn)
+            def bungkus(*args, **kwargs):
+                if not self.aktif:
+                    return fn(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.catat(nama, time.perf_counter() - t0)
+            return bungkus
+        return dekorator
+
+    @contextlib.contextmanager
+    def konteks(self, **label):
+        """
+        Label (step, versi) untuk semua span di dalam blok ini, termasuk span di modul lain.
+        """
+        token = _KONTEKS.set({**_KONTEKS.get(), **{k: v for k, v in label.items() if v is not None}})
+        try:
+            yield
+        finally:
+            _KONTEKS.reset(token)
+
+    def catat(self, nama, detik, step=None, versi=None):
+        konteks = _KONTEKS.get()
+        kunci = (
+            nama,
+            str(step if step is not None else konteks.get("step", "")),
+            str(versi if versi is not None else konteks.get("versi", "")),
+        )
+        with self._lock:
+            hist = self._histogram.get(kunci)
+            if hist is None:
+                hist = self._histogram[kunci] = _Histogram()
+            hist.tambah(detik)
+
+    def reset(self):
+        with self._lock:
+            self._histogram.clear()
+            self.mulai = time.time()
+
+    # ---------- ekspor ----------
+    def _salinan(self):
+        with self._lock:
+            salinan = []
+            for kunci, hist in sorted(self._histogram.items()):
+                h = _Histogram()
+                h.bucket, h.jumlah, h.total, h.maks = list(hist.bucket), hist.jumlah, hist.total, hist.maks
+                salinan.append((kunci, h))
+        return salinan
+
+    def prometheus(self):
+        """
+        Semua histogram dalam format teks eksposisi Prometheus.
+        """
+        baris = [
+            f"# HELP {NAMA_METRIK} Durasi span (detik) per langkah UI dan versi katalog.",
+            f"# TYPE {NAMA_METRIK} histogram",
+        ]
+        for kunci, hist in self._salinan():
+            label = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(LABEL, kunci))
+            kumulatif = 0
+            for batas, n in zip(BUCKET + ("+Inf",), hist.bucket):
+                kumulatif += n
+                baris.append(f'{NAMA_METRIK}_bucket{{{label},le="{batas}"}} {kumulatif}')
+            baris.append(f"{NAMA_METRIK}_sum{{{label}}} {hist.total!r}")
+            baris.append(f"{NAMA_METRIK}_count{{{label}}} {hist.jumlah}")
+        return "\n".join(baris) + "\n"
+
+    def ke_dict(self):
+        """
+        Ringkasan JSON: per span jumlah, total, rata-rata, maks, perkiraan p50/p95/p99, dan bucket.
+        """
+        span = []
+        for kunci, hist in self._salinan():
+            span.append({
+                **dict(zip(LABEL, kunci)),
+                "jumlah": hist.jumlah,
+                "total_s": hist.total,
+                "rata_s": hist.total / hist.jumlah if hist.jumlah else None,
+                "maks_s": hist.maks,
+                "p50_s": hist.kuantil(0.5),
+                "p95_s": hist.kuantil(0.95),
+                "p99_s": hist.kuantil(0.99),
+                "bucket": dict(zip([str(b) for b in BUCKET] + ["+Inf"], hist.bucket)),
+            })
+        return {"aktif": self.aktif, "mulai": self.mulai, "waktu": time.time(), "span": span}
+
+    def simpan_json(self, path):
+        sementara = f"{path}.tmp"
+        with open(sementara, "w", encoding="utf-8") as f:
+            json.dump(self.ke_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(sementara, path)
+
+    def layani(self, port=9464, host="127.0.0.1"):
+        """
+        Jalankan endpoint /metrics (Prometheus) dan /metrics.json di thread latar (sekali per proses).
+        """
+        # http.server baru di-import di sini supaya import modul ini tetap murah
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            metrik = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    jalur = self.path.split("?", 1)[0]
+                    if jalur == "/metrics":
+                        isi, jenis = metrik.prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+                    elif jalur == "/metrics.json":
+                        isi, jenis = json.dumps(metrik.ke_dict()).encode("utf-8"), "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", jenis)
+                    self.send_header("Content-Length", str(len(isi)))
+                    self.end_headers()
+                    self.wfile.write(isi)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrik-http", daemon=True).start()
+            return self._server
+
+
+def _escape(nilai):
+    return nilai.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Satu kumpulan metrik per proses, dipakai bersama app, layanan dan modul crscbr
+METRIK = Metrik()
@@ -0,0 +1,290 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from crscbr.metrik import METRIK
+
+
+# ==========================
+# Filter query-based (Aplikasi 1)
+# ==========================
+def saring_query_based(df, preferensi):
+    """
+    Saring katalog supaya hanya tersisa motor yang sama persis dengan preferensi.
+    Nilai preferensi sama seperti IndeksQuery: skalar, rentang (Rentang atau tuple
+    (bawah, atas)) atau list/set nilai kategori.
+    """
+    hasil = df.copy()
+    for attr, val in preferensi.items():
+        if isinstance(val, tuple) and len(val) == 2:
+            val = Rentang(*val)
+        if isinstance(val, Rentang):
+            hasil = hasil[val.cocok(hasil[attr].to_numpy(dtype=np.float64, na_value=np.nan))]
+        elif isinstance(val, (list, set, frozenset)):
+            hasil = hasil[hasil[attr].isin(list(val))]
+        # Kalau numeric, cocokkan dengan toleransi kecil karena bisa float
+        elif pd.api.types.is_numeric_dtype(df[attr]):
+            hasil = hasil[np.isclose(hasil[attr], float(val), atol=1e-1)]
+        else:
+            hasil = hasil[hasil[attr] == val]
+    return hasil
+
+
+# ==========================
+# Indeks query (exact & rentang) untuk katalog besar
+# ==========================
+# Toleransi np.isclose default yang dipakai saring_query_based
+ATOL_NUMERIK = 1e-1
+RTOL_NUMERIK = 1e-5
+
+# Kandidat sebanyak <= n / RASIO_PROBE dicek langsung ke nilai kolom (gather);
+# di atas itu predikat digabung sebagai bitset (np.packbits, AND per byte)
+RASIO_PROBE = 8
+
+
+class Rentang:
+    """
+    Predikat rentang numerik tertutup [bawah, atas]; None berarti tidak dibatasi.
+    """
+
+    __slots__ = ("bawah", "atas")
+
+    def __init__(self, bawah=None, atas=None):
+        self.bawah = None if bawah is None else float(bawah)
+        self.atas = None if atas is None else float(atas)
+
+    def __repr__(self):
+        return f"Rentang({self.bawah}, {self.atas})"
+
+    def cocok(self, nilai):
+        mask = ~np.isnan(nilai)
+        if self.bawah is not None:
+            mask &= nilai >= self.bawah
+        if self.atas is not None:
+            mask &= nilai <= self.atas
+        return mask
+
+
+def _bitset(ids, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[ids] = True
+    return np.packbits(mask)
+
+
+class _KolomKategori:
+    """
+    Indeks hash: nilai -> posting list (baris terurut), bitset dibentuk sekali untuk nilai yang sering.
+    """
+
+    def __init__(self, seri):
+        if isinstance(seri.dtype, pd.CategoricalDtype) and seri.cat.categories.is_monotonic_increasing:
+            # Kolom bundel: kode kamus dipakai langsung (view mmap, tanpa salinan per proses)
+            kode, nilai = seri.array.codes, seri.cat.categories
+        else:
+            kode, nilai = pd.factorize(seri, sort=True)
+        self.n = len(kode)
+        # Kode sekecil mungkin supaya probe (gather kode kandidat) hemat cache
+        self.kode = kode.astype(np.min_scalar_type(-max(len(nilai), 1)), copy=False)
+        self.nilai = list(nilai)
+        self.posisi = {v: i for i, v in enumerate(self.nilai)}
+        urutan = np.argsort(kode, kind="stable")
+        jumlah = np.bincount(kode[kode >= 0], minlength=len(self.nilai))
+        awal = (kode < 0).sum()  # NaN (kode -1) ada di depan urutan
+        self.offset = np.concatenate([[0], np.cumsum(jumlah)]) + awal
+        self.urutan = urutan
+        self._bitset = {}
+
+    def kode_untuk(self, val):
+        if isinstance(val, (list, tuple, set, frozenset)):
+            kode = [self.posisi[v] for v in val if v in self.posisi]
+        else:
+            kode = [self.posisi[val]] if val in self.posisi else []
+        return np.array(sorted(set(kode)), dtype=np.int64)
+
+    def perkiraan(self, kode):
+        return int((self.offset[kode + 1] - self.offset[kode]).sum())
+
+    def ids(self, kode):
+        if len(kode) == 1:
+            return self.urutan[self.offset[kode[0]]:self.offset[kode[0] + 1]]
+        return np.sort(np.concatenate([self.urutan[self.offset[c]:self.offset[c + 1]] for c in kode]))
+
+    def bitset(self, kode):
+        if len(kode) != 1:
+            return _bitset(self.ids(kode), self.n)
+        c = int(kode[0])
+        if c not in self._bitset:
+            self._bitset[c] = _bitset(self.ids(kode), self.n)
+        return self._bitset[c]
+
+    def probe(self, kandidat, kode):
+        k = self.kode[kandidat]
+        return kandidat[k == kode[0]] if len(kode) == 1 else kandidat[np.isin(k, kode)]
+
+
+class _KolomNumerik:
+    """
+    Indeks terurut: nilai kolom (tanpa NaN) terurut + baris asalnya, dicari dengan searchsorted.
+    """
+
+    def __init__(self, seri):
+        self.nilai_baris = seri.to_numpy(dtype=np.float64, na_value=np.nan)
+        self.n = len(self.nilai_baris)
+        urutan = np.argsort(self.nilai_baris, kind="stable")  # NaN di akhir
+        valid = int((~np.isnan(self.nilai_baris)).sum())
+        self.urutan = urutan[:valid]
+        self.terurut = self.nilai_baris[self.urutan]
+
+    def predikat(self, val):
+        if isinstance(val, Rentang):
+            return val
+        if isinstance(val, tuple) and len(val) == 2:
+            return Rentang(*val)
+        # Nilai tunggal: sama dengan np.isclose(x, val, atol=0.1) seperti saring_query_based
+        return float(val)
+
+    def _cocok(self, nilai, pred):
+        if isinstance(pred, Rentang):
+            return pred.cocok(nilai)
+        return np.isclose(nilai, pred, atol=ATOL_NUMERIK, rtol=RTOL_NUMERIK)
+
+    def _irisan(self, pred):
+        """
+        Rentang posisi [a, b) di self.terurut yang mungkin cocok (sedikit dilebarkan
+        untuk nilai tunggal; isclose memastikan hasil persis di ids()).
+        """
+        if isinstance(pred, Rentang):
+            a = 0 if pred.bawah is None else np.searchsorted(self.terurut, pred.bawah, side="left")
+            b = len(self.terurut) if pred.atas is None else np.searchsorted(self.terurut, pred.atas, side="right")
+            return int(a), int(max(a, b))
+        tol = (ATOL_NUMERIK + RTOL_NUMERIK * abs(pred)) * (1 + 1e-9)
+        a = np.searchsorted(self.terurut, np.nextafter(pred - tol, -np.inf), side="left")
+        b = np.searchsorted(self.terurut, np.nextafter(pred + tol, np.inf), side="right")
+        return int(a), int(b)
+
+    def perkiraan(self, pred):
+        a, b = self._irisan(pred)
+        return b - a
+
+    def ids(self, pred):
+        a, b = self._irisan(pred)
+        ids = self.urutan[a:b]
+        if not isinstance(pred, Rentang):
+            ids = ids[self._cocok(self.terurut[a:b], pred)]
+        return np.sort(ids)
+
+    def bitset(self, pred):
+        a, b = self._irisan(pred)
+        ids = self.urutan[a:b]  # urutan baris tidak perlu disortir untuk bitset
+        if not isinstance(pred, Rentang):
+            ids = ids[self._cocok(self.terurut[a:b], pred)]
+        return _bitset(ids, self.n)
+
+    def probe(self, kandidat, pred):
+        return kandidat[self._cocok(self.nilai_baris[kandidat], pred)]
+
+
+class IndeksQuery:
+    """
+    Indeks untuk filter query-based di atas katalog mentah.
+
+    Kolom kategori memakai indeks hash (nilai -> posting list / bitset), kolom
+    numerik memakai array terurut. Indeks per atribut dibangun saat atribut itu
+    pertama kali ditanya. Predikat dievaluasi dari yang paling selektif: selama
+    kandidat masih sedikit, predikat berikutnya dicek langsung ke nilai baris
+    kandidat; kalau kandidat masih banyak, digabung sebagai irisan bitset.
+
+    Nilai preferensi:
+        skalar              sama persis (numerik: np.isclose atol=0.1)
+        Rentang(a, b) / (a, b)   rentang numerik tertutup, None = tanpa batas
+        list/set            salah satu dari nilai kategori
+
+    Hasilnya sama dengan saring_query_based (posisi baris, terurut).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n = len(df)
+        self._kolom = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.n
+
+    def kolom(self, attr):
+        indeks = self._kolom.get(attr)
+        if indeks is None:
+            with self._lock:
+                indeks = self._kolom.get(attr)
+                if indeks is None:
+                    seri = self.df[attr]
+                    if pd.api.types.is_numeric_dtype(seri):
+                        indeks = _KolomNumerik(seri)
+                    else:
+                        indeks = _KolomKategori(seri)
+                    self._kolom[attr] = indeks
+        return indeks
+
+    def nilai(self, attr):
+        """
+        Nilai unik terurut (tanpa NaN) dari atribut kategori, untuk pilihan di UI.
+        """
+        return list(self.kolom(attr).nilai)
+
+    def _predikat(self, preferensi):
+        predikat = []
+        for attr, val in preferensi.items():
+            indeks = self.kolom(attr)
+            pred = indeks.kode_untuk(val) if isinstance(indeks, _KolomKategori) else indeks.predikat(val)
+            predikat.append((indeks.perkiraan(pred), attr, indeks, pred))
+        predikat.sort(key=lambda p: p[0])
+        return predikat
+
+    def rencana(self, preferensi):
+        """
+        Urutan evaluasi predikat [(atribut, perkiraan jumlah baris), ...].
+        """
+        return [(attr, jumlah) for jumlah, attr, _, _ in self._predikat(preferensi)]
+
+    @METRIK.ukur("query.cari")
+    def cari(self, preferensi):
+        """
+        Indeks posisi baris (int64, terurut naik) yang memenuhi semua predikat.
+        """
+        if not preferensi:
+            return np.arange(self.n, dtype=np.int64)
+        predikat = self._predikat(preferensi)
+        if predikat[0][0] == 0:
+            return np.empty(0, dtype=np.int64)
+
+        jumlah, _, indeks, pred = predikat[0]
+        ids = bitset = None
+        if jumlah * RASIO_PROBE <= self.n or len(predikat) == 1:
+            ids = indeks.ids(pred)
+        else:
+            bitset = indeks.bitset(pred)
+        for _, _, indeks, pred in predikat[1:]:
+            if bitset is None and len(ids) * RASIO_PROBE <= self.n:
+                ids = indeks.probe(ids, pred)
+                if len(ids) == 0:
+                    break
+                continue
+            if bitset is None:
+                bitset = _bitset(ids, self.n)
+            bitset = bitset & indeks.bitset(pred)
+        if bitset is not None:
+            ids = np.flatnonzero(np.unpackbits(bitset, count=self.n).view(bool))
+        return ids.astype(np.int64, copy=False)
+
+    def hitung(self, preferensi):
+        """
+        Jumlah baris yang cocok (tanpa membentuk DataFrame).
+        """
+        return len(self.cari(preferensi))
+
+    def saring(self, preferensi):
+        """
+        Sama seperti saring_query_based(df, preferensi), tapi lewat indeks.
+        """
+        return self.df.iloc[self.cari(preferensi)]
@@ -0,0 +1,296 @@
+"""
+Registry versi katalog: satu versi aktif, versi baru dimuat di thread latar lalu ditukar atomik.
+
+Versi katalog dinamai seperti akhiran artefaknya ("update1", "update2"). Sumbernya
+bundel katalog_<nama>/ kalau ada, selain itu final_df_<nama>.pkl +
+case_vector_df_<nama>.pkl (+ feature_schema_<nama>.json).
+
+Sesi yang sedang berjalan menyimpan objek VersiKatalog miliknya sendiri, jadi
+penukaran hanya berlaku untuk sesi yang mulai sesudahnya; versi lama dibebaskan
+begitu sesi terakhir yang memakainya selesai.
+"""
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from crscbr.ann import AnnIndex
+from crscbr.bundel import Bundel, bundel_segar, pemakai_bundel
+from crscbr.engine import PENALTI_NUMERIK, CaseBaseEngine
+from crscbr.kartu import KartuKatalog
+from crscbr.metrik import METRIK
+from crscbr.query import IndeksQuery
+from crscbr.schema import muat_atau_bangun_skema, path_skema
+from crscbr.startup import PROFIL_STARTUP
+
+
+def nama_file(awalan, nama, akhiran):
+    """
+    nama_file("final_df", "update1", ".pkl") -> "final_df_update1.pkl" ("" = versi dasar).
+    """
+    return f"{awalan}_{nama}{akhiran}" if nama else f"{awalan}{akhiran}"
+
+
+# ==========================
+# Satu versi katalog
+# ==========================
+class VersiKatalog:
+    """
+    Engine + katalog mentah (untuk UI) dari satu versi, tidak diubah setelah dimuat.
+    Indeks query dan isi kartu hasil dibangun saat pertama diminta.
+    """
+
+    def __init__(self, nama, engine, df, sumber):
+        self.nama = nama
+        self.engine = engine
+        self.df = df
+        self.final_df = engine.final_df
+        self.versi = engine.versi
+        self.sumber = sumber
+        self.dimuat = time.time()
+        self._indeks_query = None
+        self._kartu = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"VersiKatalog({self.nama!r}, versi={self.versi!r}, baris={len(self.engine)})"
+
+    def indeks_query(self):
+        if self._indeks_query is None:
+            with self._lock:
+                if self._indeks_query is None:
+                    self._indeks_query = IndeksQuery(self.df)
+        return self._indeks_query
+
+    def kartu(self):
+        if self._kartu is None:
+            with self._lock:
+                if self._kartu is None:
+                    self._kartu = KartuKatalog(self.df)
+        return self._kartu
+
+
+@METRIK.ukur("storage.katalog.muat_versi")
+def muat_versi(nama, folder=".", ann_min_baris=None):
+    """
+    Muat versi katalog nama dari folder (bundel kalau ada dan dibangun dari pickle
+    yang ada sekarang, selain itu pickle). ann_min_baris: katalog sebesar ini ke atas
+    mendapat AnnIndex untuk top_k (crscbr.ann.ANN_MIN_BARIS; None = tidak pernah).
+    """
+    path_bundel = os.path.join(folder, nama_file("katalog", nama, ""))
+    path_case = os.path.join(folder, nama_file("case_vector_df", nama, ".pkl"))
+    path_final = os.path.join(folder, nama_file("final_df", nama, ".pkl"))
+    segar = False
+    if os.path.isfile(os.path.join(path_bundel, "manifest.json")):
+        segar = bundel_segar(path_bundel, (path_final, path_case, path_skema(path_case)))
+        if not segar:
+            print(f"bundel {path_bundel} lebih lama dari pickle {nama}, memakai pickle "
+                  f"(bangun ulang dengan python -m crscbr.bundel)", file=sys.stderr)
+    if segar:
+        with PROFIL_STARTUP.fase("muat_data"):
+            bundel = Bundel.muat(path_bundel)
+        with PROFIL_STARTUP.fase("bangun_engine"):
+            engine = bundel.engine()
+        _pasang_ann(engine, ann_min_baris)
+        return VersiKatalog(nama, engine, bundel.katalog(), path_bundel)
+
+    with PROFIL_STARTUP.fase("muat_data"):
+        case_vector_df = pd.read_pickle(path_case)
+        final_df = pd.read_pickle(path_final)
+    with PROFIL_STARTUP.fase("bangun_engine"):
+        schema = muat_atau_bangun_skema(path_case, case_vector_df, final_df)
+        engine = CaseBaseEngine(case_vector_df, final_df, schema=schema)
+    _pasang_ann(engine, ann_min_baris)
+    # Katalog mentah = kolom final_df di luar case vector (sama seperti Bundel.katalog)
+    fitur = set(case_vector_df.columns)
+    df = final_df[[c for c in final_df.columns if c not in fitur]]
+    return VersiKatalog(nama, engine, df, path_final)
+
+
+def _pasang_ann(engine, ann_min_baris):
+    if ann_min_baris is not None and len(engine) >= ann_min_baris:
+        with PROFIL_STARTUP.fase("bangun_ann"):
+            engine.pasang_ann(AnnIndex(engine))
+
+
+def cek_kompatibel(lama, baru):
+    """
+    Daftar alasan versi baru tidak bisa menggantikan versi lama (kosong = kompatibel).
+
+    Sesi menyimpan preferensi mentah (atribut -> nilai), bukan vektor, jadi kolom
+    case vector boleh berbeda; yang harus tetap ada adalah atribut yang bisa
+    di-encode, kolom penalti, dan kolom katalog mentah yang ditampilkan.
+    """
+    alasan = []
+    skema_lama, skema_baru = lama.engine.schema, baru.engine.schema
+    for attr, vocab in skema_lama.vocab.items():
+        if vocab and not skema_baru.vocab.get(attr):
+            alasan.append(f"atribut kategori {attr} tidak ada di skema baru")
+    for attr in skema_lama.numerik:
+        if attr not in skema_baru.numerik:
+            alasan.append(f"atribut numerik {attr} tidak ada di skema baru")
+    for kolom, _, _ in PENALTI_NUMERIK:
+        if kolom not in baru.final_df.columns:
+            alasan.append(f"kolom penalti {kolom} tidak ada di final_df baru")
+    hilang = [c for c in lama.df.columns if c not in baru.df.columns]
+    if hilang:
+        alasan.append(f"kolom katalog hilang: {', '.join(map(str, hilang))}")
+    if len(baru.engine) == 0:
+        alasan.append("katalog baru kosong")
+    return alasan
+
+
+# ==========================
+# Registry (satu per proses)
+# ==========================
+class RegistriKatalog:
+    """
+    Pegang referensi versi aktif. ganti() memuat versi baru di thread latar,
+    memvalidasi kompatibilitas skema, lalu menukar referensi di bawah lock;
+    pendengar (misal cache hasil) dipanggil sesudah penukaran.
+
+    Selama pemuatan, aktif() tetap mengembalikan versi lama tanpa menunggu.
+    Kalau beberapa versi diminta berturut-turut, hanya permintaan terakhir yang
+    boleh menjadi aktif; pemuatan yang selesai belakangan untuk permintaan lama dibuang.
+    """
+
+    # Jeda sebelum versi dari file penunjuk yang gagal dimuat dicoba lagi (detik)
+    JEDA_ULANG = 30.0
+
+    def __init__(self, pemuat=muat_versi):
+        self._pemuat = pemuat
+        self._aktif = None
+        self._lock = threading.Lock()
+        self._lock_awal = threading.Lock()
+        self._memuat = set()
+        self._diminta = None  # nama versi yang terakhir diminta (ganti/muat_awal)
+        self._gagal = {}  # nama -> waktu monotonic pemuatan gagal terakhir
+        self._thread = None
+        self._pendengar = []
+        self.error_terakhir = None
+        self.riwayat = []
+        self._penunjuk = None
+
+    def aktif(self):
+        return self._aktif
+
+    def tambah_pendengar(self, fn):
+        """
+        fn(lama, baru) dipanggil setiap kali versi aktif berganti.
+        """
+        with self._lock:
+            self._pendengar.append(fn)
+
+    def muat_awal(self, nama):
+        """
+        Muat versi pertama secara sinkron (kalau belum ada versi aktif).
+        """
+        with self._lock_awal:  # sesi yang datang bersamaan menunggu satu pemuatan saja
+            if self._aktif is None:
+                with self._lock:
+                    if self._diminta is None:
+                        self._diminta = nama
+                self._tukar(self._pemuat(nama))
+        return self._aktif
+
+    def ganti(self, nama, latar=True):
+        """
+        Muat versi nama lalu jadikan aktif kalau kompatibel.
+        latar=True: kembali segera (thread); False: tunggu dan naikkan ValueError kalau gagal.
+        """
+        with self._lock:
+            # Permintaan terbaru selalu dicatat, termasuk kembali ke versi aktif,
+            # supaya pemuatan lain yang masih berjalan tidak menimpanya
+            self._diminta = nama
+            if nama in self._memuat or (self._aktif is not None and self._aktif.nama == nama):
+                return self._thread
+            self._memuat.add(nama)
+        if not latar:
+            self._muat_dan_tukar(nama, naikkan=True)
+            return None
+        thread = threading.Thread(target=self._muat_dan_tukar, args=(nama,), name=f"muat-katalog-{nama}", daemon=True)
+        self._thread = thread
+        thread.start()
+        return thread
+
+    def _muat_dan_tukar(self, nama, naikkan=False):
+        try:
+            baru = self._pemuat(nama)
+            lama = self._aktif
+            if lama is not None:
+                alasan = cek_kompatibel(lama, baru)
+                if alasan:
+                    raise ValueError(f"Katalog {nama} tidak kompatibel: " + "; ".join(alasan))
+            if self._tukar(baru, diminta=nama):
+                self.error_terakhir = None
+                self._gagal.pop(nama, None)
+        except Exception as e:
+            self.error_terakhir = f"{nama}: {e}"
+            self._gagal[nama] = time.monotonic()
+            if naikkan:
+                raise
+        finally:
+            with self._lock:
+                self._memuat.discard(nama)
+
+    def _tukar(self, baru, diminta=None):
+        """
+        Jadikan baru versi aktif. diminta: hanya kalau nama itu masih permintaan
+        terakhir (dicek di bawah lock yang sama dengan penukaran). Kembalikan True kalau ditukar.
+        """
+        with self._lock:
+            if diminta is not None and self._diminta != diminta:
+                return False
+            lama = self._aktif
+            self._aktif = baru  # satu assignment: pembaca melihat versi lama atau baru, tidak pernah setengah
+            self.riwayat.append((time.time(), baru.nama, baru.versi))
+            pendengar = list(self._pendengar)
+        for fn in pendengar:
+            fn(lama, baru)
+        return True
+
+    def pantau_penunjuk(self, path, bawaan):
+        """
+        Baca file penunjuk (isi: nama versi, misal "update2") dan ganti versi di latar
+        kalau isinya berubah. Murah dipanggil di setiap rerun: hanya os.stat kalau
+        file tidak berubah. Kembalikan nama versi yang diminta.
+
+        Yang di-cache hanya isi file; versi aktif dicek setiap panggilan, jadi pemuatan
+        yang gagal dicoba lagi (paling cepat JEDA_ULANG detik kemudian).
+        """
+        try:
+            sidik = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            sidik = None
+        if self._penunjuk is not None and self._penunjuk[0] == sidik:
+            nama = self._penunjuk[1]
+        else:
+            nama = bawaan
+            if sidik is not None:
+                with open(path, encoding="utf-8") as f:
+                    nama = f.read().strip() or bawaan
+            self._penunjuk = (sidik, nama)
+
+        if self._aktif is None:
+            self.muat_awal(nama)
+        elif self._aktif.nama != nama or self._diminta != nama:
+            gagal = self._gagal.get(nama)
+            if gagal is None or time.monotonic() - gagal >= self.JEDA_ULANG:
+                self.ganti(nama)
+        return nama
+
+    def status(self):
+        aktif = self._aktif
+        info = None
+        if aktif is not None:
+            info = {"nama": aktif.nama, "versi": aktif.versi, "baris": len(aktif.engine)}
+            if os.path.isdir(aktif.sumber):
+                info["proses_pemakai"] = len(pemakai_bundel(aktif.sumber))
+        return {
+            "aktif": info,
+            "memuat": sorted(self._memuat),
+            "error": self.error_terakhir,
+            "riwayat": list(self.riwayat),
+        }
@@ -0,0 +1,169 @@
+import json
+import os
+
+import numpy as np
+
+
+KOLOM_KATEGORIKAL = ["Brand", "Category", "Transmission", "ClutchType", "EngineConfig"]
+KOLOM_NUMERIK = ["Price", "Displacement", "FuelConsumptionKML", "FuelTank", "WeightKG", "PowerHP"]
+
+
+# ==========================
+# Skema fitur case vector (dibangun sekali, disimpan di samping case_vector_df_*.pkl)
+# ==========================
+class FeatureSchema:
+    """
+    Peta one-hot (atribut -> nilai lowercase -> indeks kolom) dan statistik
+    min/max per kolom numerik, sama dengan MinMaxScaler di Prototype.ipynb.
+
+    Encode satu query cukup O(jumlah atribut) lookup dictionary, tanpa akses DataFrame.
+    """
+
+    def __init__(self, kolom, vocab, numerik):
+        self.kolom = list(kolom)
+        self.col_index = {col: i for i, col in enumerate(self.kolom)}
+        # vocab: {"Brand": {"honda": 11, ...}, ...}
+        self.vocab = vocab
+        # numerik: {"Price": (indeks kolom, min, max), ...}
+        self.numerik = numerik
+
+    def __len__(self):
+        return len(self.kolom)
+
+    @classmethod
+    def dari_kolom(cls, kolom, stats):
+        """
+        Bangun skema dari daftar kolom case vector dan {atribut: (min, max)}.
+        """
+        kolom = list(kolom)
+        vocab = {attr: {} for attr in KOLOM_KATEGORIKAL}
+        numerik = {}
+        for i, col in enumerate(kolom):
+            if col.endswith("_normalized"):
+                attr = col[: -len("_normalized")]
+                min_val, max_val = stats[attr]
+                numerik[attr] = (i, float(min_val), float(max_val))
+                continue
+            attr, _, val = col.partition("_")
+            if attr in vocab:
+                vocab[attr][val.lower()] = i
+        return cls(kolom, vocab, numerik)
+
+    @classmethod
+    def dari_dataframe(cls, case_vector_df, df_mentah):
+        """
+        Bangun skema dari kolom case_vector_df dan min/max data mentah.
+        """
+        stats = {
+            attr: (df_mentah[attr].min(), df_mentah[attr].max())
+            for attr in KOLOM_NUMERIK
+            if f"{attr}_normalized" in case_vector_df.columns
+        }
+        return cls.dari_kolom(case_vector_df.columns, stats)
+
+    @classmethod
+    def dari_scaler(cls, case_vector_df, numerical_cols, scaler):
+        """
+        Bangun skema langsung dari MinMaxScaler yang sudah di-fit (dipakai di notebook).
+        """
+        stats = dict(zip(numerical_cols, zip(scaler.data_min_, scaler.data_max_)))
+        return cls.dari_kolom(case_vector_df.columns, stats)
+
+    def skala(self, attr, val):
+        """
+        Normalisasi min-max satu nilai numerik (tanpa clipping, sama seperti MinMaxScaler).
+        """
+        _, min_val, max_val = self.numerik[attr]
+        rentang = max_val - min_val
+        return (float(val) - min_val) / (rentang if rentang else 1.0)
+
+    def indeks(self, attr, val):
+        """
+        Indeks kolom case vector untuk satu atribut (None kalau tidak dikenal).
+        """
+        if attr in self.vocab:
+            return self.vocab[attr].get(str(val).lower())
+        if attr in self.numerik:
+            return self.numerik[attr][0]
+        return None
+
+    def encode_ke(self, user_input, prioritas_user, user_vector, weight_vector):
+        """
+        Isi user_vector dan weight_vector (array yang sudah di-nol-kan) untuk satu query.
+        """
+        for attr, val in user_input.items():
+            weight = prioritas_user.get(attr, 1.0)  # default ke 1.0 kalau tidak ditemukan
+            if attr in self.vocab:
+                idx = self.vocab[attr].get(str(val).lower())
+                if idx is not None:
+                    user_vector[idx] = 1.0
+                    weight_vector[idx] = weight
+            elif attr in self.numerik:
+                idx = self.numerik[attr][0]
+                user_vector[idx] = self.skala(attr, val)
+                weight_vector[idx] = weight
+
+    def encode(self, user_input, prioritas_user):
+        """
+        Pengganti buat_user_vector_weighted: kembalikan (user_vector, weight_vector).
+        """
+        user_vector = np.zeros(len(self.kolom), dtype=float)
+        weight_vector = np.zeros(len(self.kolom), dtype=float)
+        self.encode_ke(user_input, prioritas_user, user_vector, weight_vector)
+        return user_vector, weight_vector
+
+    def encode_batch(self, daftar_user_input, daftar_prioritas):
+        """
+        Encode banyak query sekaligus menjadi matriks (Q x D).
+        """
+        n_query = len(daftar_user_input)
+        user_matrix = np.zeros((n_query, len(self.kolom)), dtype=float)
+        weight_matrix = np.zeros((n_query, len(self.kolom)), dtype=float)
+        for q, (user_input, prioritas_user) in enumerate(zip(daftar_user_input, daftar_prioritas)):
+            self.encode_ke(user_input, prioritas_user, user_matrix[q], weight_matrix[q])
+        return user_matrix, weight_matrix
+
+    def to_dict(self):
+        return {
+            "kolom": self.kolom,
+            "vocab": self.vocab,
+            "numerik": {attr: list(v) for attr, v in self.numerik.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        numerik = {attr: (int(v[0]), float(v[1]), float(v[2])) for attr, v in data["numerik"].items()}
+        return cls(data["kolom"], data["vocab"], numerik)
+
+    def simpan(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def muat(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def path_skema(path_case_vector):
+    """
+    Lokasi file skema untuk artefak case vector, misal
+    case_vector_df_update1.pkl -> feature_schema_update1.json
+    """
+    folder, nama = os.path.split(path_case_vector)
+    versi = os.path.splitext(nama)[0].replace("case_vector_df", "")
+    return os.path.join(folder, f"feature_schema{versi}.json")
+
+
+def muat_atau_bangun_skema(path_case_vector, case_vector_df, df_mentah):
+    """
+    Muat skema yang tersimpan di samping case_vector_df; bangun dari data kalau belum ada.
+    """
+    try:
+        schema = FeatureSchema.muat(path_skema(path_case_vector))
+    except FileNotFoundError:
+        return FeatureSchema.dari_dataframe(case_vector_df, df_mentah)
+    if schema.kolom != list(case_vector_df.columns):
+        raise ValueError(f"Skema {path_skema(path_case_vector)} tidak cocok dengan kolom case_vector_df.")
+    return schema
+
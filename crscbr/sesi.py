@@ -0,0 +1,164 @@
+"""
+State sesi ringkas: hasil rekomendasi disimpan sebagai posisi baris katalog + skor,
+bukan DataFrame/Series lebar. Baris dibentuk ulang dari katalog bersama (engine.final_df)
+saat dibutuhkan, dengan kolom yang sama seperti engine.materialisasi.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================
+# Referensi hasil (posisi baris + skor)
+# ==========================
+class HasilRingkas:
+    """
+    Top-k hasil skoring untuk satu versi katalog: posisi baris, FinalScore, Similarity dan
+    user_input saat dihitung (untuk kolom *Penalty). final/sim None untuk baris yang dipilih
+    tanpa skoring (misal dari case historis). tambahan = kolom ekstra, misal {"source": ...}.
+    """
+
+    __slots__ = ("versi", "idx", "final", "sim", "user_input", "tambahan")
+
+    def __init__(self, versi, idx, final=None, sim=None, user_input=None, tambahan=None):
+        self.versi = versi
+        self.idx = np.asarray(idx, dtype=np.int64)
+        self.final = None if final is None else np.asarray(final, dtype=np.float64)
+        self.sim = None if sim is None else np.asarray(sim, dtype=np.float64)
+        self.user_input = dict(user_input or {})
+        self.tambahan = dict(tambahan or {})
+
+    @classmethod
+    def dari_model(cls, engine, model, **tambahan):
+        """
+        Referensi baris pertama katalog dengan nama Model ini (tanpa skor).
+        """
+        posisi = np.flatnonzero((engine.final_df["Model"] == model).to_numpy())
+        if len(posisi) == 0:
+            raise ValueError(f"Model {model!r} tidak ada di katalog versi {engine.versi}.")
+        return cls(engine.versi, posisi[:1], tambahan=tambahan)
+
+    def __len__(self):
+        return len(self.idx)
+
+    def __repr__(self):
+        return f"HasilRingkas(versi={self.versi!r}, idx={self.idx.tolist()})"
+
+    def baris(self, i, **tambahan):
+        """
+        Referensi satu baris (posisi ke-i hasil), dengan kolom tambahan opsional.
+        """
+        return HasilRingkas(
+            self.versi, self.idx[i:i + 1],
+            None if self.final is None else self.final[i:i + 1],
+            None if self.sim is None else self.sim[i:i + 1],
+            self.user_input, {**self.tambahan, **tambahan},
+        )
+
+    def cari(self, engine, model):
+        """
+        Posisi pertama dalam hasil yang nama Model-nya sama, atau None.
+        """
+        nama = engine.final_df["Model"].iloc[self.idx].to_numpy()
+        posisi = np.flatnonzero(nama == model)
+        return int(posisi[0]) if len(posisi) else None
+
+    def model(self, engine):
+        """
+        List nama Model sesuai urutan hasil.
+        """
+        return engine.final_df["Model"].iloc[self.idx].tolist()
+
+    def materialisasi(self, engine):
+        """
+        DataFrame hasil (format engine.materialisasi) dari katalog bersama engine.
+        """
+        if engine.versi != self.versi:
+            raise ValueError(f"Hasil dari katalog versi {self.versi}, engine sesi versi {engine.versi}.")
+        if self.final is None:
+            hasil = engine.final_df.iloc[self.idx].copy()
+        else:
+            hasil = engine.materialisasi(self.idx, self.final, self.sim, self.user_input)
+        for kolom, nilai in self.tambahan.items():
+            hasil[kolom] = nilai
+        return hasil
+
+    def seri(self, engine, i=0):
+        """
+        Satu baris hasil sebagai Series (pengganti hasil.iloc[i]).
+        """
+        return self.baris(i).materialisasi(engine).iloc[0]
+
+
+# ==========================
+# Laporan ukuran session state
+# ==========================
+def _ukuran_kolom(seri):
+    if isinstance(seri.dtype, pd.CategoricalDtype):
+        # Daftar kategori dipakai bersama dengan katalog; yang dimiliki hanya kodenya
+        return int(seri.array.codes.nbytes)
+    return int(seri.memory_usage(deep=True, index=False))
+
+
+def ukuran_objek(obj, bersama=(), _dilihat=None):
+    """
+    Perkiraan byte milik obj (rekursif). Objek yang id-nya ada di bersama (katalog, engine)
+    tidak dihitung, begitu juga array view yang datanya milik objek lain.
+    """
+    dilihat = set() if _dilihat is None else _dilihat
+    if id(obj) in dilihat or id(obj) in bersama:
+        return 0
+    dilihat.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return sum(_ukuran_kolom(obj.iloc[:, i]) for i in range(obj.shape[1])) + int(obj.index.memory_usage(deep=True))
+    if isinstance(obj, pd.Series):
+        return _ukuran_kolom(obj) + int(obj.index.memory_usage(deep=True))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+
+    total = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            total += ukuran_objek(k, bersama, dilihat) + ukuran_objek(v, bersama, dilihat)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            total += ukuran_objek(v, bersama, dilihat)
+    else:
+        if hasattr(obj, "__dict__"):
+            total += ukuran_objek(vars(obj), bersama, dilihat)
+        for nama in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, nama):
+                total += ukuran_objek(getattr(obj, nama), bersama, dilihat)
+    return total
+
+
+def objek_bersama(*katalog):
+    """
+    Id objek yang dipakai bersama antar sesi (VersiKatalog, engine, DataFrame katalog).
+    """
+    ids = set()
+    for k in katalog:
+        if k is None:
+            continue
+        for obj in (k, getattr(k, "engine", None), getattr(k, "df", None), getattr(k, "final_df", None)):
+            if obj is not None:
+                ids.add(id(obj))
+    return ids
+
+
+def laporan_ukuran(state, bersama=()):
+    """
+    [(kunci, byte), ...] untuk tiap kunci session state, terbesar dulu, plus total byte.
+    """
+    baris = []
+    dilihat = set()
+    for kunci in list(state.keys()):
+        baris.append((kunci, ukuran_objek(state[kunci], bersama, dilihat)))
+    baris.sort(key=lambda x: -x[1])
+    return baris, sum(b for _, b in baris)
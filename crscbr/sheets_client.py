@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+from crscbr.metrik import METRIK
+from crscbr.startup import PROFIL_STARTUP
+
+
+# ==========================
+# Pool client Google Sheets (satu per proses)
+# ==========================
+class SheetsClientPool:
+    """
+    Satu client pygsheets untuk seluruh sesi di proses ini.
+
+    - Authorize baru dilakukan saat pertama kali dibutuhkan, langsung dari dict
+      service account (tanpa file sementara).
+    - Handle worksheet di-cache per (spreadsheet_id, sheet_name).
+    - Kalau operasi gagal, client dan handle dibuang lalu dicoba sekali lagi
+      dengan client baru; client juga diperbarui setelah max_age detik.
+    - Transport httplib2 di bawah pygsheets tidak thread-safe, jadi semua operasi
+      lewat dengan_worksheet dijalankan bergantian (satu request pada satu waktu).
+    """
+
+    def __init__(self, service_account_info, authorize=None, max_age=3000):
+        self.service_account_info = dict(service_account_info)
+        self._authorize = authorize
+        self.max_age = max_age
+        self.stats = {"authorize": 0, "cache_hit": 0, "reset": 0}
+
+        self._lock = threading.RLock()
+        self._panggil_lock = threading.Lock()  # serialisasi request ke client bersama
+        self._client = None
+        self._dibuat = 0.0
+        self._worksheets = {}
+
+    def _authorize_baru(self):
+        with PROFIL_STARTUP.fase("auth_sheets"):
+            if self._authorize is None:
+                import pygsheets
+                return pygsheets.authorize(service_account_json=json.dumps(self.service_account_info))
+            return self._authorize(self.service_account_info)
+
+    def client(self):
+        with self._lock:
+            if self._client is None or time.monotonic() - self._dibuat > self.max_age:
+                self._worksheets.clear()
+                self._client = self._authorize_baru()
+                self._dibuat = time.monotonic()
+                self.stats["authorize"] += 1
+            return self._client
+
+    def worksheet(self, spreadsheet_id, sheet_name):
+        key = (spreadsheet_id, sheet_name)
+        with self._lock:
+            client = self.client()
+            wks = self._worksheets.get(key)
+            if wks is None:
+                wks = client.open_by_key(spreadsheet_id).worksheet_by_title(sheet_name)
+                self._worksheets[key] = wks
+            else:
+                self.stats["cache_hit"] += 1
+            return wks
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+            self._worksheets.clear()
+            self.stats["reset"] += 1
+
+    @METRIK.ukur("storage.sheets.dengan_worksheet")
+    def dengan_worksheet(self, spreadsheet_id, sheet_name, fn, coba_ulang=True):
+        """
+        Jalankan fn(worksheet); kalau gagal, reset client lalu coba sekali lagi.
+        coba_ulang=False: setelah reset error langsung diteruskan (untuk operasi
+        tidak idempoten seperti append yang retry-nya diatur pemanggil).
+        """
+        with self._panggil_lock:
+            try:
+                return fn(self.worksheet(spreadsheet_id, sheet_name))
+            except Exception:
+                self.reset()
+                if not coba_ulang:
+                    raise
+                return fn(self.worksheet(spreadsheet_id, sheet_name))
@@ -0,0 +1,231 @@
+"""
+Generator katalog motor dan case base sintetis dengan skema yang sama seperti data asli.
+
+Contoh:
+    python -m crscbr.sintetis -n 100000 --cases 50000 --out-dir data_sintetis
+
+Setiap baris sintetis diturunkan dari satu baris katalog referensi (template) dengan
+kategori yang sama, lalu ukurannya digeser dengan satu faktor skala bersama supaya
+korelasi antar kolom tetap wajar (cc besar -> tenaga, berat, harga ikut naik).
+Bore/Stroke dihitung ulang dari displacement, EngineConfig dari rasio bore/stroke.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from crscbr.katalog import baca_katalog, bangun_artefak
+from crscbr.schema import KOLOM_KATEGORIKAL, KOLOM_NUMERIK
+
+
+KOLOM_MENTAH = [
+    "Brand", "Category", "Model", "Transmission", "ClutchType", "Bore", "Stroke",
+    "PistonCount", "Displacement", "PowerHP", "EngineConfig", "FuelTank",
+    "WeightKG", "FuelConsumptionKML", "Price",
+]
+
+# Elastisitas tiap kolom terhadap faktor skala displacement + noise (log-normal)
+ELASTISITAS = {
+    "Displacement": (1.0, 0.0),
+    "PowerHP": (0.9, 0.06),
+    "WeightKG": (0.25, 0.04),
+    "FuelTank": (0.2, 0.05),
+    "FuelConsumptionKML": (-0.5, 0.06),
+    "Price": (0.8, 0.10),
+}
+
+PEMBULATAN = {
+    "Displacement": 2,
+    "PowerHP": 2,
+    "WeightKG": 0,
+    "FuelTank": 1,
+    "FuelConsumptionKML": 1,
+}
+
+PELUANG_BRAND_TEMPLATE = 0.7
+
+
+def konfigurasi_mesin(bore, stroke):
+    """
+    EngineConfig dari rasio bore/stroke (batas mengikuti data asli).
+    """
+    rasio = np.asarray(bore, dtype=float) / np.asarray(stroke, dtype=float)
+    return np.where(rasio > 1.07, "OverBore", np.where(rasio < 0.97, "OverStroke", "NearSquare"))
+
+
+# ==========================
+# Katalog sintetis
+# ==========================
+def buat_katalog_sintetis(n, referensi, seed=0, sebaran=0.15):
+    """
+    DataFrame mentah berisi n motor sintetis dengan kolom KOLOM_MENTAH.
+
+    referensi = katalog asli (final_df atau df mentah). sebaran = simpangan baku
+    log faktor skala displacement terhadap template.
+    """
+    rng = np.random.default_rng(seed)
+    ref = referensi[KOLOM_MENTAH].reset_index(drop=True)
+
+    # Template diambil terstratifikasi per kategori supaya kategori kecil tetap muncul
+    kategori = ref["Category"].to_numpy()
+    nama_kategori, kode_kategori = np.unique(kategori, return_inverse=True)
+    peluang = np.bincount(kode_kategori).astype(float)
+    peluang = np.sqrt(peluang) / np.sqrt(peluang).sum()
+    pilih_kategori = rng.choice(len(nama_kategori), size=n, p=peluang)
+    baris_per_kategori = [np.flatnonzero(kode_kategori == i) for i in range(len(nama_kategori))]
+    idx = np.empty(n, dtype=np.int64)
+    for i, baris in enumerate(baris_per_kategori):
+        mask = pilih_kategori == i
+        idx[mask] = rng.choice(baris, size=int(mask.sum()))
+    template = ref.iloc[idx].reset_index(drop=True)
+
+    # Brand: kebanyakan ikut template, sisanya brand lain yang punya model di kategori itu
+    brand = template["Brand"].to_numpy(dtype=object).copy()
+    ganti = rng.random(n) > PELUANG_BRAND_TEMPLATE
+    for i, baris in enumerate(baris_per_kategori):
+        mask = ganti & (pilih_kategori == i)
+        if mask.any():
+            brand[mask] = rng.choice(ref["Brand"].to_numpy()[baris], size=int(mask.sum()))
+
+    # Kolom numerik digeser dengan faktor skala bersama
+    log_skala = rng.normal(0.0, sebaran, size=n)
+    hasil = {}
+    for kolom, (elastisitas, noise) in ELASTISITAS.items():
+        min_val, max_val = float(ref[kolom].min()), float(ref[kolom].max())
+        nilai = template[kolom].to_numpy(dtype=float) * np.exp(
+            elastisitas * log_skala + rng.normal(0.0, noise, size=n)
+        )
+        hasil[kolom] = np.clip(nilai, min_val, max_val)
+
+    # Bore/Stroke dari volume per silinder dengan rasio template
+    piston = template["PistonCount"].to_numpy(dtype=np.int64)
+    rasio = template["Bore"].to_numpy(dtype=float) / template["Stroke"].to_numpy(dtype=float)
+    cc_per_silinder = hasil["Displacement"] * 1000.0 / piston
+    stroke = np.cbrt(cc_per_silinder * 4.0 / (np.pi * rasio ** 2))
+    bore = np.round(stroke * rasio, 1)
+    stroke = np.round(stroke, 1)
+
+    df = pd.DataFrame({
+        "Brand": brand,
+        "Category": template["Category"].to_numpy(),
+        "Model": [f"{m} s{i}" for i, m in enumerate(template["Model"])],
+        "Transmission": template["Transmission"].to_numpy(),
+        "ClutchType": template["ClutchType"].to_numpy(),
+        "Bore": bore,
+        "Stroke": stroke,
+        "PistonCount": piston,
+        "Displacement": np.round(hasil["Displacement"], PEMBULATAN["Displacement"]),
+        "PowerHP": np.round(hasil["PowerHP"], PEMBULATAN["PowerHP"]),
+        "EngineConfig": konfigurasi_mesin(bore, stroke),
+        "FuelTank": np.round(hasil["FuelTank"], PEMBULATAN["FuelTank"]),
+        "WeightKG": np.round(hasil["WeightKG"], PEMBULATAN["WeightKG"]),
+        "FuelConsumptionKML": np.round(hasil["FuelConsumptionKML"], PEMBULATAN["FuelConsumptionKML"]),
+        "Price": (np.round(hasil["Price"], -4)).astype(np.int64),
+    })
+    for kolom in ("Brand", "Category", "Model", "Transmission", "ClutchType", "EngineConfig"):
+        df[kolom] = df[kolom].astype("string")
+    return df
+
+
+def vocab_referensi(referensi):
+    """
+    Kategori one-hot dari katalog referensi, supaya kolom case_vector_df sintetis
+    selalu sama dengan katalog asli walaupun ada nilai yang tidak terambil.
+    """
+    return {attr: sorted(referensi[attr].dropna().unique()) for attr in KOLOM_KATEGORIKAL}
+
+
+# ==========================
+# Case base sintetis
+# ==========================
+OPSI_ATRIBUT = [
+    "Category", "Displacement", "PowerHP", "Brand", "Transmission",
+    "ClutchType", "EngineConfig", "FuelTank", "WeightKG",
+    "FuelConsumptionKML", "Price"
+]
+
+
+def _nilai_input(baris, attr):
+    nilai = baris[attr]
+    if attr in KOLOM_NUMERIK:
+        return int(round(float(nilai)))  # number_input di app memakai step=1
+    return str(nilai)
+
+
+def buat_case_base_sintetis(final_df, n, seed=0, rasio_refine=0.3, rasio_historis=0.2):
+    """
+    List baris case_base (format sheet: field JSON berupa string) sebanyak n.
+
+    Preferensi diambil dari motor "jangkar" di final_df; model yang dipilih
+    kebanyakan motor jangkar itu sendiri. Sebagian case punya refine_steps.
+    """
+    rng = np.random.default_rng(seed)
+    kolom = [a for a in OPSI_ATRIBUT if a in final_df.columns]
+    data = final_df[kolom + ["Model"]].to_dict("records")
+    mulai = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+
+    records = []
+    for i in range(n):
+        jangkar = data[rng.integers(len(data))]
+        attrs = rng.choice(kolom, size=rng.integers(1, 6), replace=False)
+        user_input = {a: _nilai_input(jangkar, a) for a in attrs}
+
+        refine_steps = []
+        if rng.random() < rasio_refine:
+            for _ in range(rng.integers(1, 4)):
+                attr = str(rng.choice(attrs))
+                baru = _nilai_input(data[rng.integers(len(data))], attr)
+                refine_steps.append({attr: [user_input[attr], baru]})
+                user_input[attr] = baru
+
+        model = jangkar["Model"] if rng.random() < 0.6 else data[rng.integers(len(data))]["Model"]
+        source = "historical_case" if rng.random() < rasio_historis else "cosine_similarity"
+        records.append({
+            "case_id": f"case_sintetis_{seed}_{i}",
+            "user_input": json.dumps(user_input, ensure_ascii=False),
+            "is_refined": "TRUE" if refine_steps else "FALSE",
+            "refine_steps": json.dumps(refine_steps, ensure_ascii=False),
+            "refine_iteration_count": len(refine_steps),
+            "chosen_models": json.dumps([{"model": str(model), "source": source}], ensure_ascii=False),
+            "user_ranked": "TRUE" if rng.random() < 0.5 else "FALSE",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mulai + i * 60)),
+        })
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat katalog dan case base sintetis.")
+    parser.add_argument("-n", type=int, default=10_000, help="Jumlah motor sintetis")
+    parser.add_argument("--cases", type=int, default=0, help="Jumlah case sintetis")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="data_sintetis")
+    parser.add_argument("--nama", default="sintetis", help="Akhiran nama file artefak")
+    parser.add_argument("--referensi", default="final_df_update1.pkl")
+    args = parser.parse_args(argv)
+
+    referensi = baca_katalog(args.referensi)
+    mentah = buat_katalog_sintetis(args.n, referensi, seed=args.seed)
+    final_df, case_vector_df, schema = bangun_artefak(mentah, vocab=vocab_referensi(referensi))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    final_df.to_pickle(os.path.join(args.out_dir, f"final_df_{args.nama}.pkl"))
+    case_vector_df.to_pickle(os.path.join(args.out_dir, f"case_vector_df_{args.nama}.pkl"))
+    schema.simpan(os.path.join(args.out_dir, f"feature_schema_{args.nama}.json"))
+    print(f"katalog: {len(final_df)} motor, {case_vector_df.shape[1]} fitur", file=sys.stderr)
+
+    if args.cases:
+        records = buat_case_base_sintetis(final_df, args.cases, seed=args.seed)
+        path = os.path.join(args.out_dir, f"case_base_{args.nama}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"case base: {len(records)} case -> {path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
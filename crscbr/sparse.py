@@ -0,0 +1,187 @@
+import numpy as np
+
+
+def gabung_rentang(starts, ends):
+    """
+    Gabungan np.arange(s, e) untuk banyak rentang sekaligus.
+    """
+    panjang = ends - starts
+    total = int(panjang.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = np.repeat(starts - np.cumsum(panjang) + panjang, panjang)
+    return offset + np.arange(total)
+
+
+# ==========================
+# Matriks CSR minimal (numpy saja, tanpa scipy)
+# ==========================
+class MatriksCSR:
+    """
+    Matriks sparse format CSR (indptr, indices, data) untuk blok one-hot case vector.
+
+    Kalau setiap baris punya jumlah non-zero yang sama (satu nilai per atribut
+    kategori), indices/data bisa dibaca sebagai tabel (n x slot) dan perkalian
+    dengan vektor cukup np.take per slot. Slot yang rentang kolomnya tidak
+    menyentuh koefisien non-zero dilewati.
+    """
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.shape = tuple(shape)
+        for arr in (self.indptr, self.indices, self.data):
+            arr.setflags(write=False)
+
+        nnz_baris = np.diff(self.indptr)
+        n = self.shape[0]
+        self.slot = int(nnz_baris[0]) if n and (nnz_baris == nnz_baris[0]).all() else None
+        if self.slot:
+            idx2 = self.indices.reshape(n, self.slot)
+            lo, hi = idx2.min(axis=0), idx2.max(axis=0)
+            kolom = np.arange(self.shape[1])[:, None]
+            # _kolom_slot[c, s] = kolom c mungkin muncul di slot s
+            self._kolom_slot = (kolom >= lo) & (kolom <= hi)
+        else:
+            self._kolom_slot = None
+        self.biner = bool((self.data == 1).all())
+
+    @classmethod
+    def dari_dense(cls, dense, kolom=None):
+        """
+        Bangun CSR dari matriks dense; kolom membatasi kolom yang ikut (lainnya dianggap nol).
+        """
+        dense = np.asarray(dense)
+        n, d = dense.shape
+        mask = dense != 0
+        if kolom is not None:
+            pilih = np.zeros(d, dtype=bool)
+            pilih[list(kolom)] = True
+            mask &= pilih
+        baris, indices = np.nonzero(mask)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(baris, minlength=n), out=indptr[1:])
+        dtype = np.int16 if d <= np.iinfo(np.int16).max else np.int32
+        return cls(indptr, indices.astype(dtype), dense[baris, indices], (n, d))
+
+    @property
+    def nnz(self):
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def _slot_aktif(self, nz):
+        return np.flatnonzero(self._kolom_slot[nz].any(axis=0))
+
+    def matvec(self, vec, indeks=None, awal=None, kuadrat=False):
+        """
+        Hasil (A @ vec) float32 untuk semua baris atau baris indeks.
+
+        awal: akumulator float32 yang ditambah di tempat (dipakai untuk meneruskan
+        jumlah blok dense). kuadrat=True memakai data^2.
+        """
+        vec = np.asarray(vec, dtype=np.float32)
+        n = self.shape[0] if indeks is None else len(indeks)
+        hasil = np.zeros(n, dtype=np.float32) if awal is None else awal
+        nz = np.flatnonzero(vec)
+        if nz.size == 0 or n == 0:
+            return hasil
+
+        if self.slot:
+            idx2 = self.indices.reshape(-1, self.slot)
+            data2 = self.data.reshape(-1, self.slot)
+            for s in self._slot_aktif(nz):
+                idx = idx2[:, s] if indeks is None else idx2[indeks, s]
+                nilai = np.take(vec, idx)
+                if not self.biner:
+                    d = data2[:, s] if indeks is None else data2[indeks, s]
+                    nilai *= d * d if kuadrat else d
+                hasil += nilai
+            return hasil
+
+        # Jumlah non-zero per baris tidak seragam: kumpulkan segmen lalu reduceat
+        if indeks is None:
+            starts, ends = self.indptr[:-1], self.indptr[1:]
+        else:
+            starts, ends = self.indptr[indeks], self.indptr[np.asarray(indeks) + 1]
+        panjang = ends - starts
+        posisi = gabung_rentang(starts, ends)
+        data = self.data[posisi]
+        nilai = np.take(vec, self.indices[posisi]) * (data * data if kuadrat else data)
+        ada = panjang > 0
+        if ada.any():
+            offset = np.concatenate([[0], np.cumsum(panjang)[:-1]])[ada]
+            hasil[ada] += np.add.reduceat(nilai, offset)
+        return hasil
+
+    def matmat(self, koef, r0, r1, kuadrat=False):
+        """
+        A[r0:r1] @ koef untuk koef (d x Q) float32; dipakai skoring batch per blok baris.
+        kuadrat=True memakai data^2.
+        """
+        koef = np.asarray(koef, dtype=np.float32)
+        hasil = np.zeros((r1 - r0, koef.shape[1]), dtype=np.float32)
+        if self.slot:
+            idx2 = self.indices.reshape(-1, self.slot)[r0:r1]
+            data2 = self.data.reshape(-1, self.slot)[r0:r1]
+            nz = np.flatnonzero(np.abs(koef).sum(axis=1))
+            for s in self._slot_aktif(nz):
+                nilai = koef[idx2[:, s]]
+                if not self.biner:
+                    d = data2[:, s, None]
+                    nilai *= d * d if kuadrat else d
+                hasil += nilai
+            return hasil
+        for r in range(r0, r1):
+            a, b = self.indptr[r], self.indptr[r + 1]
+            data = self.data[a:b] * self.data[a:b] if kuadrat else self.data[a:b]
+            hasil[r - r0] = data @ koef[self.indices[a:b]]
+        return hasil
+
+    def ambil_baris(self, indeks):
+        """
+        CSR baru berisi baris indeks (urutan mengikuti indeks).
+        """
+        indeks = np.asarray(indeks, dtype=np.int64)
+        starts, ends = self.indptr[indeks], self.indptr[indeks + 1]
+        posisi = gabung_rentang(starts, ends)
+        indptr = np.zeros(len(indeks) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=indptr[1:])
+        return MatriksCSR(indptr, self.indices[posisi], self.data[posisi], (len(indeks), self.shape[1]))
+
+    def kolom(self, j):
+        """
+        Mask boolean baris yang non-zero di kolom j.
+        """
+        mask = np.zeros(self.shape[0], dtype=bool)
+        posisi = np.flatnonzero(self.indices == j)
+        if posisi.size:
+            baris = np.searchsorted(self.indptr, posisi, side="right") - 1
+            mask[baris] = True
+        return mask
+
+    def kolom_dense(self, j):
+        """
+        Isi kolom j sebagai array float32 (n,).
+        """
+        hasil = np.zeros(self.shape[0], dtype=np.float32)
+        posisi = np.flatnonzero(self.indices == j)
+        if posisi.size:
+            baris = np.searchsorted(self.indptr, posisi, side="right") - 1
+            hasil[baris] = self.data[posisi]
+        return hasil
+
+    def toarray(self, indeks=None):
+        """
+        Bentuk dense float32 (untuk semua baris atau baris indeks).
+        """
+        indeks = np.arange(self.shape[0]) if indeks is None else np.asarray(indeks)
+        starts, ends = self.indptr[indeks], self.indptr[indeks + 1]
+        panjang = ends - starts
+        posisi = gabung_rentang(starts, ends)
+        hasil = np.zeros((len(indeks), self.shape[1]), dtype=np.float32)
+        hasil[np.repeat(np.arange(len(indeks)), panjang), self.indices[posisi]] = self.data[posisi]
+        return hasil
@@ -0,0 +1,128 @@
+"""
+Profil waktu start aplikasi: waktu import per modul dan waktu per fase inisialisasi.
+
+Aktif kalau environment CRSCBR_PROFIL_STARTUP=1, misal:
+    CRSCBR_PROFIL_STARTUP=1 streamlit run streamlit_app.py
+
+Modul ini sengaja hanya memakai standard library supaya bisa dipasang paling awal,
+sebelum numpy/pandas/streamlit ikut ter-import.
+"""
+import builtins
+import contextlib
+import os
+import sys
+import threading
+import time
+
+
+ENV_AKTIF = "CRSCBR_PROFIL_STARTUP"
+
+
+class ProfilStartup:
+    """
+    Mencatat waktu import modul (lewat pembungkus builtins.__import__) dan waktu
+    fase inisialisasi (muat data, bangun engine, authorize, ...).
+
+    Untuk tiap modul yang baru pertama kali di-import dicatat waktu kumulatif
+    (termasuk import di dalamnya) dan waktu sendiri (tanpa import anak).
+    """
+
+    def __init__(self):
+        self.aktif = False
+        self.mulai = None
+        self.modul = {}  # nama -> [kumulatif_s, sendiri_s]
+        self.fase_tercatat = {}  # nama -> [total_s, kali]
+        self._import_asli = None
+        self._lokal = threading.local()
+        self._lock = threading.Lock()
+
+    def mulai_jika_aktif(self):
+        if os.environ.get(ENV_AKTIF) == "1":
+            self.pasang()
+        return self
+
+    def pasang(self):
+        """
+        Mulai mencatat import (idempoten; rerun Streamlit tidak memasang ulang).
+        """
+        with self._lock:
+            if self.aktif:
+                return
+            self.aktif = True
+            self.mulai = time.perf_counter()
+            self._import_asli = builtins.__import__
+            builtins.__import__ = self._import
+
+    def lepas(self):
+        with self._lock:
+            if self._import_asli is not None:
+                builtins.__import__ = self._import_asli
+                self._import_asli = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import_asli(name, globals, locals, fromlist, level)
+
+        tumpukan = getattr(self._lokal, "tumpukan", None)
+        if tumpukan is None:
+            tumpukan = self._lokal.tumpukan = []
+        tumpukan.append(0.0)  # akumulator waktu import anak
+        t0 = time.perf_counter()
+        try:
+            return self._import_asli(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - t0
+            anak = tumpukan.pop()
+            if tumpukan:
+                tumpukan[-1] += total
+            with self._lock:
+                self.modul[name] = [total, total - anak]
+
+    @contextlib.contextmanager
+    def fase(self, nama):
+        """
+        Catat durasi satu fase inisialisasi (dijumlah kalau dipanggil berkali-kali).
+        """
+        if not self.aktif:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            durasi = time.perf_counter() - t0
+            with self._lock:
+                catatan = self.fase_tercatat.setdefault(nama, [0.0, 0])
+                catatan[0] += durasi
+                catatan[1] += 1
+
+    def laporan(self, teratas=20):
+        """
+        {"total_ms", "import": [{modul, kumulatif_ms, sendiri_ms}, ...], "fase": {...}}
+        Import diurutkan dari waktu sendiri terbesar.
+        """
+        with self._lock:
+            modul = sorted(self.modul.items(), key=lambda m: -m[1][1])[:teratas]
+            fase = {nama: {"ms": t * 1e3, "kali": n} for nama, (t, n) in self.fase_tercatat.items()}
+        return {
+            "total_ms": (time.perf_counter() - self.mulai) * 1e3 if self.mulai else 0.0,
+            "import": [
+                {"modul": nama, "kumulatif_ms": kum * 1e3, "sendiri_ms": sendiri * 1e3}
+                for nama, (kum, sendiri) in modul
+            ],
+            "fase": fase,
+        }
+
+    def teks(self, teratas=20):
+        lap = self.laporan(teratas)
+        baris = [f"startup: {lap['total_ms']:.1f} ms sejak profil dipasang", "fase:"]
+        for nama, info in lap["fase"].items():
+            baris.append(f"  {nama:<28} {info['ms']:10.1f} ms  x{info['kali']}")
+        baris.append("import (waktu sendiri / kumulatif):")
+        for m in lap["import"]:
+            baris.append(f"  {m['modul']:<28} {m['sendiri_ms']:10.1f} ms {m['kumulatif_ms']:10.1f} ms")
+        return "\n".join(baris)
+
+
+# Satu profil per proses, dipakai bersama oleh app dan modul crscbr
+PROFIL_STARTUP = ProfilStartup()
@@ -0,0 +1,301 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya kunci antar-thread
+    fcntl = None
+
+from crscbr.metrik import METRIK
+
+
+# ==========================
+# Backend penyimpanan remote
+# ==========================
+class SheetsBackend:
+    """
+    Backend Google Sheets: beberapa baris sekaligus dikirim dengan satu append_table,
+    memakai handle worksheet dari SheetsClientPool.
+
+    append_rows dicoba sekali saja (coba_ulang=False): retry dan backoff diatur
+    WriteBehindQueue, supaya satu kali kirim tidak menjadi beberapa append ganda.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def append_rows(self, spreadsheet_id, sheet_name, rows):
+        self.pool.dengan_worksheet(
+            spreadsheet_id, sheet_name,
+            lambda wks: wks.append_table(rows, dimension="ROWS", overwrite=False),
+            coba_ulang=False,
+        )
+
+
+class FakeBackend:
+    """
+    Backend lokal di memori untuk uji coba offline. Set gagal=True untuk
+    mensimulasikan Google Sheets yang tidak bisa dihubungi.
+    """
+
+    def __init__(self, gagal=False):
+        self.gagal = gagal
+        self.sheets = defaultdict(list)
+        self.jumlah_request = 0
+
+    def append_rows(self, spreadsheet_id, sheet_name, rows):
+        self.jumlah_request += 1
+        if self.gagal:
+            raise ConnectionError("FakeBackend sedang disetel gagal.")
+        self.sheets[(spreadsheet_id, sheet_name)].extend(list(r) for r in rows)
+
+    def get_all_values(self, spreadsheet_id, sheet_name):
+        return list(self.sheets[(spreadsheet_id, sheet_name)])
+
+
+# ==========================
+# Antrean write-behind
+# ==========================
+class WriteBehindQueue:
+    """
+    Penulis latar belakang untuk case dan hasil survei.
+
+    - kirim() hanya memasukkan baris ke antrean terbatas lalu langsung kembali.
+    - Worker menggabungkan baris per (spreadsheet, sheet) menjadi satu append multi-baris.
+    - Gagal kirim dicoba ulang dengan backoff eksponensial; kalau tetap gagal (atau
+      antrean penuh) baris ditulis ke journal JSONL lokal dan dikirim ulang nanti.
+    - stop() (juga dipanggil otomatis saat proses keluar) menunggu antrean dikirim
+      sampai timeout, lalu sisa antrean dan batch yang masih dikirim ditulis ke journal.
+      Baris yang sedang dikirim saat itu bisa terkirim dua kali, tapi tidak hilang.
+    - Journal boleh dipakai bersama beberapa proses: baca/tulis dikunci flock pada
+      <journal>.lock, dan replay memindahkan isi journal ke <journal>.kirim-<pid>-<token>
+      sebelum dikirim, sehingga tidak ada baris yang dikirim dua proses sekaligus.
+    """
+
+    def __init__(self, backend, journal_path="gsheet_journal.jsonl", maxsize=1000,
+                 batch_size=50, flush_interval=1.0, max_retry=4, backoff=0.5):
+        self.backend = backend
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retry = max_retry
+        self.backoff = backoff
+        self.stats = {"diantrekan": 0, "terkirim": 0, "batch": 0, "retry": 0, "dijurnal": 0}
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._journal_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._dikirim = []  # batch yang sedang diproses worker
+        self._thread = threading.Thread(target=self._run, name="gsheet-writer", daemon=True)
+
+    def start(self, tutup_saat_keluar=True):
+        self._thread.start()
+        if tutup_saat_keluar:
+            # Thread daemon mati begitu interpreter keluar; sisa antrean harus masuk journal dulu
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=10):
+        """
+        Hentikan worker. Baris yang belum terkirim setelah timeout ditulis ke journal.
+        """
+        if self._stop.is_set() and not self._thread.is_alive():
+            return
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        sisa = list(self._dikirim) if self._thread.is_alive() else []
+        while True:
+            try:
+                sisa.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        if sisa:
+            self._tulis_journal(sisa)
+
+    @METRIK.ukur("storage.writer.kirim")
+    def kirim(self, spreadsheet_id, sheet_name, row):
+        """
+        Antrekan satu baris. Tidak pernah blocking: kalau antrean penuh, baris langsung ke journal.
+        """
+        item = (spreadsheet_id, sheet_name, list(row))
+        try:
+            self._queue.put_nowait(item)
+            self.stats["diantrekan"] += 1
+        except queue.Full:
+            self._tulis_journal([item])
+
+    def flush(self, timeout=None):
+        """
+        Tunggu sampai semua baris di antrean selesai diproses (terkirim atau masuk journal).
+        """
+        batas = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if batas is not None and time.monotonic() > batas:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def jumlah_journal(self):
+        with self._kunci_journal():
+            return len(self._baca_journal())
+
+    # ---------- worker ----------
+    def _ambil_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _kirim_grup(self, items, max_retry=None):
+        """
+        Kirim item yang dikelompokkan per sheet; kembalikan item yang tetap gagal.
+        """
+        max_retry = max_retry or self.max_retry
+        grup = defaultdict(list)
+        for spreadsheet_id, sheet_name, row in items:
+            grup[(spreadsheet_id, sheet_name)].append(row)
+
+        gagal = []
+        for (spreadsheet_id, sheet_name), rows in grup.items():
+            for percobaan in range(max_retry):
+                try:
+                    with METRIK.span("storage.writer.append_rows"):
+                        self.backend.append_rows(spreadsheet_id, sheet_name, rows)
+                    self.stats["terkirim"] += len(rows)
+                    self.stats["batch"] += 1
+                    break
+                except Exception:
+                    if percobaan == max_retry - 1 or self._stop.is_set():
+                        gagal.extend((spreadsheet_id, sheet_name, row) for row in rows)
+                        break
+                    self.stats["retry"] += 1
+                    time.sleep(self.backoff * (2 ** percobaan))
+        return gagal
+
+    def _run(self):
+        self._replay_journal()
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._ambil_batch()
+            if not batch:
+                continue
+            self._dikirim = batch
+            try:
+                gagal = self._kirim_grup(batch)
+                if gagal:
+                    self._tulis_journal(gagal)
+                elif not self._stop.is_set():
+                    self._replay_journal()
+            finally:
+                self._dikirim = []
+                for _ in batch:
+                    self._queue.task_done()
+
+    # ---------- journal ----------
+    @contextmanager
+    def _kunci_journal(self):
+        """
+        Kunci journal antar-thread (Lock) dan antar-proses (flock pada file .lock).
+        """
+        with self._journal_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.journal_path + ".lock", "a") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _baca_journal(self, path=None):
+        path = path or self.journal_path
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [tuple(json.loads(line)) for line in f if line.strip()]
+
+    def _tambah_journal(self, items):
+        # Pemanggil sudah memegang _kunci_journal
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(list(item), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @METRIK.ukur("storage.writer.journal")
+    def _tulis_journal(self, items):
+        with self._kunci_journal():
+            self._tambah_journal(items)
+        self.stats["dijurnal"] += len(items)
+
+    def _kiriman_yatim(self):
+        """
+        File .kirim-* milik proses yang sudah mati (crash di tengah replay).
+        """
+        if fcntl is None:
+            # Tanpa POSIX os.kill(pid, 0) tidak bisa dipakai untuk cek proses
+            return []
+        yatim = []
+        for path in glob.glob(glob.escape(self.journal_path) + ".kirim-*"):
+            try:
+                pid = int(path.rsplit(".kirim-", 1)[1].split("-", 1)[0])
+            except ValueError:
+                continue
+            if not _pid_hidup(pid):
+                yatim.append(path)
+        return yatim
+
+    def _replay_journal(self):
+        """
+        Kirim ulang isi journal setelah backend terbukti sehat lagi (sekali coba, tanpa backoff).
+
+        Isi journal dipindah ke file .kirim-<pid>-<token> selama lock dipegang, lalu dikirim
+        tanpa lock supaya kirim() dan proses lain tetap bisa menulis journal. Yang gagal
+        ditambahkan kembali ke journal.
+        """
+        with self._kunci_journal():
+            sumber = self._kiriman_yatim()
+            if os.path.exists(self.journal_path):
+                kiriman = f"{self.journal_path}.kirim-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                os.replace(self.journal_path, kiriman)
+                sumber.append(kiriman)
+            items = [item for path in sumber for item in self._baca_journal(path)]
+            if not items:
+                for path in sumber:
+                    os.remove(path)
+                return
+
+        gagal = self._kirim_grup(items, max_retry=1)
+        with self._kunci_journal():
+            if gagal:
+                self._tambah_journal(gagal)
+            for path in sumber:
+                os.remove(path)
+
+
+def _pid_hidup(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
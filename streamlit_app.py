@@ -1,16 +1,29 @@
+# Profil startup dipasang sebelum import lain (aktif kalau CRSCBR_PROFIL_STARTUP=1)
+from crscbr.startup import PROFIL_STARTUP
+PROFIL_STARTUP.mulai_jika_aktif()
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 import json
 import uuid
-from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
-import pytz
 from collections import defaultdict, Counter, deque
 import streamlit.components.v1 as components
 import os
-import pygsheets
-import tempfile
+import sys
+from crscbr.ann import ANN_MIN_BARIS
+from crscbr.cache import SessionResultCache, SharedResultCache, kunci_query
+from crscbr.case_store import CaseStore, SinkronLatar, buat_data_case
+from crscbr.inkremental import INKREMENTAL_MIN_BARIS, SesiSkor
+from crscbr.metrik import METRIK
+from crscbr.registry import RegistriKatalog, muat_versi
+from crscbr.sesi import HasilRingkas, laporan_ukuran, objek_bersama
+from crscbr.sheets_client import SheetsClientPool
+from crscbr.writer import SheetsBackend, WriteBehindQueue
+
+# Metrik latensi per tahap (CRSCBR_METRIK=1, endpoint Prometheus di CRSCBR_METRIK_PORT)
+METRIK.mulai_jika_aktif()
 
 
 st.set_page_config(page_title="Sistem Rekomendasi Motor", layout="centered")
@@ -20,41 +33,42 @@ st.markdown("---")
 
 
 # =================== Variable Global ===================
-@st.cache_data
-def load_df():
-    df = pd.read_excel("data_motor_excel_update1.xlsx")
-    for col in df.columns:
-        if pd.api.types.is_string_dtype(df[col]):
-            df[col] = df[col].astype(str)
-    return df
-
-@st.cache_data
-def load_case_vector_df():
-    df = pd.read_pickle("case_vector_df_update1.pkl")
-    for col in df.columns:
-        if pd.api.types.is_string_dtype(df[col]):
-            df[col] = df[col].astype(str)
-    return df
-
-@st.cache_data
-def load_final_df():
-    df = pd.read_pickle("final_df_update1.pkl")
-    for col in df.columns:
-        if pd.api.types.is_string_dtype(df[col]):
-            df[col] = df[col].astype(str)
-    return df
-
-df = load_df()
-final_df = load_final_df()
-case_vector_df = load_case_vector_df()
-case_matrix = case_vector_df.to_numpy()
-
-json_key = dict(st.secrets["gcp_service_account"])
-with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as tmp:
-    json.dump(json_key, tmp)
-    tmp_path = tmp.name
-
-gc = pygsheets.authorize(service_file=tmp_path)
+# Versi katalog aktif dibaca dari file penunjuk (isi: akhiran artefak, misal "update2").
+# Mengubah isi file menukar katalog tanpa restart: versi baru dimuat di latar,
+# divalidasi, lalu dipakai sesi yang mulai sesudahnya. Sumber tiap versi adalah
+# bundel katalog_<nama>/ kalau ada, selain itu final_df_<nama>.pkl + case_vector_df_<nama>.pkl.
+PENUNJUK_KATALOG = "katalog_aktif.txt"
+KATALOG_BAWAAN = "update1"
+
+@st.cache_resource
+def load_registri():
+    # Katalog besar (>= ANN_MIN_BARIS baris) mendapat indeks AnnIndex untuk top-k
+    registri = RegistriKatalog(pemuat=lambda nama: muat_versi(nama, ann_min_baris=ANN_MIN_BARIS))
+    cache = load_result_cache()
+    # Cache hasil lintas sesi dikosongkan begitu versi aktif berganti
+    registri.tambah_pendengar(lambda lama, baru: cache.pastikan_versi(baru.versi))
+    return registri
+
+# Katalog dan engine dimuat saat pertama dibutuhkan, bukan saat modul di-import,
+# supaya halaman pembuka tampil sebelum data/engine siap (lihat dispatch di bawah)
+katalog = engine = df = final_df = None
+
+def muat_katalog():
+    global katalog, engine, df, final_df
+    if katalog is not None:
+        return
+    registri = load_registri()
+    registri.pantau_penunjuk(PENUNJUK_KATALOG, KATALOG_BAWAAN)
+    # Sesi memakai versi yang aktif saat sesi dimulai sampai kembali ke halaman awal
+    if st.session_state.get("katalog") is None or st.session_state.step == "intro":
+        st.session_state.katalog = registri.aktif()
+    katalog = st.session_state.katalog
+    engine, df, final_df = katalog.engine, katalog.df, katalog.final_df
+
+# Client Google Sheets dipakai bersama semua sesi, authorize baru saat pertama dipakai
+@st.cache_resource
+def load_sheets_pool():
+    return SheetsClientPool(dict(st.secrets["gcp_service_account"]))
 
 
 # =================== Fungsi segmentasi tahap proses ===================
@@ -70,6 +84,7 @@ if "prioritas_user" not in st.session_state:
 
 
 def step_intro():
+    lepas_skor_sesi()
     st.subheader("🧪 Uji Coba Aplikasi Rekomendasi Motor")
 
     st.markdown("""
@@ -270,12 +285,30 @@ def step_query_based():
         if st.checkbox(f"Gunakan {label_id}", key=f"query_use_{attr}"):
             selected_attrs.append(attr)
 
-            if attr in ["Displacement", "PowerHP", "FuelTank", "WeightKG", "FuelConsumptionKML"]:
-                preferensi[attr] = st.number_input(f"{label_id}:", step=1, key=f"query_val_{attr}")
-            elif attr == "Price":
-                preferensi[attr] = st.number_input(f"{label_id}:", min_value=0, step=1_000_000, key=f"query_val_{attr}")
+            if attr in ["Displacement", "PowerHP", "FuelTank", "WeightKG", "FuelConsumptionKML", "Price"]:
+                # Nilai persis, atau rentang min - maks (tuple; kosong = tanpa batas)
+                mode = st.radio(
+                    f"Cara mengisi {label_id}:", ["Nilai persis", "Rentang (min - maks)"],
+                    horizontal=True, key=f"query_mode_{attr}",
+                )
+                langkah = 1_000_000 if attr == "Price" else 1
+                if mode == "Nilai persis" and attr == "Price":
+                    preferensi[attr] = st.number_input(f"{label_id}:", min_value=0, step=1_000_000, key=f"query_val_{attr}")
+                elif mode == "Nilai persis":
+                    preferensi[attr] = st.number_input(f"{label_id}:", step=1, key=f"query_val_{attr}")
+                else:
+                    kolom_min, kolom_maks = st.columns(2)
+                    bawah = kolom_min.number_input(
+                        f"{label_id} minimum:", min_value=0, step=langkah, value=None,
+                        placeholder="tanpa batas", key=f"query_min_{attr}",
+                    )
+                    atas = kolom_maks.number_input(
+                        f"{label_id} maksimum:", min_value=0, step=langkah, value=None,
+                        placeholder="tanpa batas", key=f"query_maks_{attr}",
+                    )
+                    preferensi[attr] = (bawah, atas)
             elif attr in df.columns:
-                options = sorted(df[attr].dropna().unique())
+                options = katalog.indeks_query().nilai(attr)
             
                 if attr == "Category":
                     label_options = [category_label_map.get(o, o) for o in options]
@@ -288,9 +321,16 @@ def step_query_based():
                 else:
                     label_options = options
             
-                pilihan_label = st.selectbox(f"Silakan isi kolom atribut {label_id} di bawah ini.", label_options, key=f"val_{attr}")
-                index = label_options.index(pilihan_label)
-                val = options[index]
+                if st.checkbox(f"Boleh salah satu dari beberapa {label_id}", key=f"query_banyak_{attr}"):
+                    # Daftar nilai: cocok kalau sama dengan salah satunya
+                    pilihan_label = st.multiselect(f"Pilih satu atau lebih {label_id}:", label_options, key=f"vals_{attr}")
+                    if not pilihan_label:
+                        continue
+                    val = [options[label_options.index(label)] for label in pilihan_label]
+                else:
+                    pilihan_label = st.selectbox(f"Silakan isi kolom atribut {label_id} di bawah ini.", label_options, key=f"val_{attr}")
+                    index = label_options.index(pilihan_label)
+                    val = options[index]
                 preferensi[attr] = val 
             else:
                 preferensi[attr] = st.text_input(f"{label_id}:", key=f"query_val_{attr}")
@@ -298,22 +338,17 @@ def step_query_based():
     st.markdown("---")
 
     if st.button("🔎 Cari Motor yang Cocok"):
-        hasil = df.copy()
-        for attr, val in preferensi.items():
-            # Kalau numeric, cocokkan dengan toleransi kecil karena bisa float
-            if pd.api.types.is_numeric_dtype(df[attr]):
-                hasil = hasil[np.isclose(hasil[attr], float(val), atol=1e-1)]
-            else:
-                hasil = hasil[hasil[attr] == val]
+        query_idx = katalog.indeks_query().cari(preferensi)
+        hasil = katalog.df.iloc[query_idx]
 
         if not hasil.empty:
             st.success(f"🎉 Ditemukan {len(hasil)} motor yang cocok dengan preferensimu!")
-            for i, row in hasil.iterrows():
-                tampilkan_model(row, judul=f"🏍️ {row['Model']}")
+            tampilkan_banyak_model([(row, f"🏍️ {row['Model']}") for _, row in hasil.iterrows()])
         else:
             st.warning("😕 Tidak ada motor yang 100% cocok dengan preferensimu.")
 
-        st.session_state.query_result = hasil.to_dict(orient="records")
+        # Hanya posisi baris yang disimpan di sesi; record dibentuk ulang saat ditampilkan/disimpan
+        st.session_state.query_result_idx = query_idx.astype(np.int32)
         st.session_state.query_input = preferensi
         st.session_state.query_has_run = True  # ✅ Flag bahwa pencarian udah dijalankan
 
@@ -490,7 +525,7 @@ def step_input():
                 )
                 
             elif attr in df.columns:
-                options = sorted(df[attr].dropna().unique())
+                options = katalog.indeks_query().nilai(attr)
                 
                 # Konversi label ke user-friendly jika perlu
                 if attr == "Category":
@@ -609,12 +644,14 @@ def step_rekomendasi():
         st.markdown(f"{i}. **{label}**")
 
 
-     # ⏪ Cek case historis serupa
-    populer_dari_case = hitung_model_terpopuler_dari_case_gsheet(
-        st.session_state.user_input,
-        spreadsheet_id='193gZBpZUWYv1GJxvgibbf04uR_txgJPiFoEIGTuVPSM',
-        sheet_name="case_base"
-    )
+     # ⏪ Cek case historis serupa (lookup lokal, Google Sheets disinkron di latar belakang)
+    populer_dari_case = load_case_store().model_terpopuler(st.session_state.user_input)
+    sinkron = load_sinkron_case_base(load_case_store())
+    if sinkron.last_error is not None:
+        st.caption(f"⚠️ Sinkron case base dari Google Sheets gagal: {sinkron.last_error}")
+    if sinkron.dilewati:
+        st.caption(f"⚠️ {len(sinkron.dilewati)} baris sheet case_base rusak dilewati saat sinkron "
+                   f"(baris {', '.join(str(no) for no, _ in sinkron.dilewati[:5])}).")
 
     if populer_dari_case:
         st.markdown("## 📊 Model yang Sering Dipilih oleh Pengguna Lain")
@@ -624,8 +661,8 @@ def step_rekomendasi():
         with st.expander("🛠️ Pilih salah satu model dari data historis?"):
             pilihan = st.selectbox("Pilih model:", [model for model, _ in populer_dari_case])
             if st.button("✅ Gunakan model ini sebagai pilihan akhir"):
-                model_final = final_df[final_df["Model"] == pilihan].iloc[0]
-                model_final["source"] = "historical_case"
+                pilihan_ringkas = HasilRingkas.dari_model(engine, pilihan, source="historical_case")
+                model_final = pilihan_ringkas.seri(engine)
                 simpan_case_model_gsheet(
                     user_input=st.session_state.user_input,
                     row_model=model_final,
@@ -635,7 +672,7 @@ def step_rekomendasi():
                     refine_log=[],
                     user_ranked=False
                 )
-                st.session_state.final_chosen_model = model_final
+                st.session_state.final_chosen_model = pilihan_ringkas
                 st.success(f"✅ Model '{pilihan}' disimpan sebagai pilihan akhir.")
                 # st.session_state.step = "survey_1_app1"
                 st.session_state.step = "survey_1_app2"
@@ -648,8 +685,8 @@ def step_rekomendasi():
     user_input = st.session_state.user_input
     prioritas = st.session_state.prioritas_user
 
-    user_vec, weight_vec = buat_user_vector_weighted(user_input, prioritas, case_vector_df, df)
-    hasil = rekomendasi_cosine_weighted(user_vec, weight_vec, case_matrix, final_df, user_input, top_n=6)
+    ringkas = hitung_rekomendasi_ringkas(user_input, prioritas, top_n=6)
+    hasil = ringkas.materialisasi(engine)
 
 
 
@@ -660,10 +697,11 @@ def step_rekomendasi():
     st.markdown("---")
 
     st.subheader("🔍 5 Model Alternatif Lainnya yang Masih Mirip:")
+    alternatif = []
     for i in range(1, min(6, len(hasil))):
         row = hasil.iloc[i]
-        tampilkan_model(row, judul=f"🏍️ Model Alternatif {i}: **{(row.get('Model', f'Model {i+1}')).upper()}**")
-        st.markdown("----")
+        alternatif.append((row, f"🏍️ Model Alternatif {i}: **{(row.get('Model', f'Model {i+1}')).upper()}**"))
+    tampilkan_banyak_model(alternatif, pemisah=True)
 
 
 
@@ -683,7 +721,7 @@ def step_rekomendasi():
                 refine_log=[],
                 user_ranked=False
             )
-            st.session_state.final_chosen_model = top1_model
+            st.session_state.final_chosen_model = ringkas.baris(0, source="cosine_similarity")
             st.success("✅ Terima kasih! Rekomendasi telah disimpan.")
             # st.session_state.step = "survey_1_app1"
             st.session_state.step = "survey_1_app2"
@@ -721,7 +759,7 @@ def step_rekomendasi():
                     refine_log=[],
                     user_ranked=True
                 )
-                st.session_state.final_chosen_model = model_lain
+                st.session_state.final_chosen_model = ringkas.baris(ringkas.cari(engine, cocok_lain), source="cosine_similarity")
                 st.success(f"✅ Model '{cocok_lain}' disimpan sebagai pilihan Anda.")
                 # st.session_state.step = "survey_1_app1"
                 st.session_state.step = "survey_1_app2"
@@ -730,14 +768,14 @@ def step_rekomendasi():
         elif cocok_lain == "Tidak ada":
             if st.button("🔧 Mau di-update agar lebih sesuai?"):
                 st.session_state.step = "refinement"
-                st.session_state.refine_base_model = hasil.iloc[0].to_dict()
+                st.session_state.refine_base_model = ringkas.baris(0)
                 st.session_state.refine_steps = []
                 st.rerun()
 
         elif cocok_lain == "Saya ingin keluar saja":
             st.warning("🚪 Serius nih? kamu masih bisa refine loh...")
             if st.button("Pokoknya, saya mau keluar!"):
-                st.session_state.refine_base_model = hasil.iloc[0].to_dict()
+                st.session_state.refine_base_model = ringkas.baris(0)
                 # st.session_state.step = "survey_1_app1"
                 st.session_state.step = "survey_1_app2"
                 st.rerun()
@@ -758,7 +796,7 @@ def step_refinement():
         st.error("Tidak ada referensi motor untuk refinement.")
         return
 
-    model_awal = st.session_state.refine_base_model
+    model_awal = st.session_state.refine_base_model.seri(engine)
     user_input = st.session_state.user_input.copy()
 
     st.markdown("##### 📌 Model Referensi (Top-1 Terakhir):")
@@ -849,7 +887,7 @@ def step_refinement():
         if aktif:
             refine_selected_attrs.append(attr)
 
-            if attr in df.columns and df[attr].dtype == object:
+            if attr in df.columns and not pd.api.types.is_numeric_dtype(df[attr]):
                 opsi = sorted(df[attr].dropna().unique())
             
                 # Konversi label untuk tampil ke user
@@ -957,10 +995,9 @@ def step_refine_prioritas():
             st.session_state.prioritas_user = prioritas
 
             user_input = st.session_state.user_input
-            user_vec, weight_vec = buat_user_vector_weighted(user_input, prioritas, case_vector_df, df)
-            hasil_refined = rekomendasi_cosine_weighted(user_vec, weight_vec, case_matrix, final_df, user_input, top_n=6)
+            hasil_refined = hitung_rekomendasi_ringkas(user_input, prioritas, top_n=6)
 
-            st.session_state.refine_base_model = hasil_refined.iloc[0].to_dict()
+            st.session_state.refine_base_model = hasil_refined.baris(0)
             st.session_state.last_refined_result = hasil_refined
             st.success("✅ Rekomendasi diperbarui!")
             st.session_state.step = "refinement_result"
@@ -1006,7 +1043,8 @@ def step_refinement_result():
         st.markdown(f"{i}. **{label}**")
 
 
-    hasil = st.session_state.get("last_refined_result", None)
+    ringkas = st.session_state.get("last_refined_result", None)
+    hasil = ringkas.materialisasi(engine) if ringkas is not None else None
 
     if hasil is not None:
         st.markdown("#### 🚀 Top-1 Refined Model Paling Mendekati Preferensi baru kamu:")
@@ -1016,10 +1054,11 @@ def step_refinement_result():
         st.markdown("---")
 
         st.markdown("#### 🔍 5 Refined Model Alternatif Lainnya yang Masih Mirip:")
+        alternatif = []
         for i in range(1, min(6, len(hasil))):
             row_refined = hasil.iloc[i]
-            tampilkan_model(row_refined, judul=f"🏍️ Model Alternatif {i}: **{(row_refined.get('Model', f'Model {i+1}')).upper()}**")
-            st.markdown("----")
+            alternatif.append((row_refined, f"🏍️ Model Alternatif {i}: **{(row_refined.get('Model', f'Model {i+1}')).upper()}**"))
+        tampilkan_banyak_model(alternatif, pemisah=True)
     else:
         st.warning("Belum ada hasil terbaru dari refinement.")
 
@@ -1038,7 +1077,7 @@ def step_refinement_result():
                 refine_log=st.session_state.get("refine_steps", []),
                 user_ranked=False
             )
-            st.session_state.final_chosen_model = top1_refinedmodel
+            st.session_state.final_chosen_model = ringkas.baris(0, source="cosine_similarity")
             st.success("✅ Terima kasih! Rekomendasi telah disimpan.")
             # st.session_state.step = "survey_1_app1"
             st.session_state.step = "survey_1_app2"
@@ -1067,7 +1106,7 @@ def step_refinement_result():
                     refine_log=st.session_state.get("refine_steps", []),
                     user_ranked=True
                 )
-                st.session_state.final_chosen_model = hasil.iloc[0]  # atau hasil.iloc[0]
+                st.session_state.final_chosen_model = ringkas.baris(0)  # atau hasil.iloc[0]
                 st.success(f"✅ Model '{pilih_lain}' disimpan sebagai pilihan Anda.")
                 # st.session_state.step = "survey_1_app1"
                 st.session_state.step = "survey_1_app2"
@@ -1076,7 +1115,7 @@ def step_refinement_result():
         elif pilih_lain == "Tidak ada":
             if st.button("🔁 Refine Lagi"):
                 st.session_state.refine_iteration_count = len(st.session_state.get("refine_steps", [])) + 1
-                st.session_state.refine_base_model = hasil.iloc[0].to_dict()
+                st.session_state.refine_base_model = ringkas.baris(0)
                 st.session_state.step = "refinement"
                 st.session_state.pop("show_refine_options", None)
                 st.rerun()
@@ -1211,6 +1250,7 @@ def step_survey_2():
 
 
 def step_finish_evaluation():
+    lepas_skor_sesi()
     st.title("🎉 Evaluasi Selesai")
 
     st.markdown("""
@@ -1233,10 +1273,9 @@ def step_finish_evaluation():
         st.markdown(f"- **{k}**: {v}")
     
     st.markdown("**Hasil Rekomendasi:**")
-    query_result = st.session_state.get("query_result", [])
+    query_result = query_result_sesi(batas=3) or []
     if query_result:
-        for i, row in enumerate(query_result[:3]):
-            tampilkan_model(row, judul=f"📌 Hasil {i+1}: " + row["Model"])
+        tampilkan_banyak_model([(row, f"📌 Hasil {i+1}: " + row["Model"]) for i, row in enumerate(query_result)])
     else:
         st.info("Tidak ada hasil yang cocok.")
 
@@ -1259,13 +1298,15 @@ def step_finish_evaluation():
     st.markdown("**Hasil Rekomendasi terakhir:**")
     if "refine_base_model" in st.session_state: # keluar dari app
         st.info("Model rekomendasi terakhir dari sistem:") 
-        tampilkan_model(st.session_state.refine_base_model)
-        st.session_state.final_CRSCBR_answer = st.session_state.refine_base_model.copy()
+        model_akhir = st.session_state.refine_base_model.seri(engine)
+        tampilkan_model(model_akhir)
+        st.session_state.final_CRSCBR_answer = model_akhir.to_dict()
 
     elif "final_chosen_model" in st.session_state: # historical/cosine top1/cosine top2-6
         st.success("Model yang dipilih olehmu sebagai rekomendasi akhir:")
-        tampilkan_model(st.session_state.final_chosen_model)
-        st.session_state.final_CRSCBR_answer = st.session_state.final_chosen_model.copy().to_dict()
+        model_akhir = st.session_state.final_chosen_model.seri(engine)
+        tampilkan_model(model_akhir)
+        st.session_state.final_CRSCBR_answer = model_akhir.to_dict()
 
     elif "hasil" in st.session_state: # where the fvck is this came from?
         st.warning("Model rekomendasi awal:")
@@ -1362,7 +1403,7 @@ def step_finish_evaluation():
         final_data = {
             "identity": st.session_state.get("user_identity"),
             "query_input": st.session_state.get("query_input"),
-            "query_result": st.session_state.get("query_result"),
+            "query_result": query_result_sesi(),
             "user_input": st.session_state.get("user_input"),
             "prioritas_user": st.session_state.get("prioritas_user"),
             "final_CRSCBR_answer": st.session_state.get("final_CRSCBR_answer"),
@@ -1392,99 +1433,69 @@ def step_finish_evaluation():
 
 
 # ==========================
-# Buat user_vector dan weight_vector berdasarkan preferensi user
+# Hitung rekomendasi (di-memo per sesi, lalu cache bersama antar sesi)
 # ==========================
-def buat_user_vector_weighted(user_input, prioritas_user, final_df, df_mentah):
-    """
-    Buat user_vector dan weight_vector berdasarkan preferensi user,
-    dengan bobot eksplisit dari prioritas_user.
-    """
-    user_vector = np.zeros(len(final_df.columns), dtype=float)
-    weight_vector = np.zeros(len(final_df.columns), dtype=float)
-    col_index = {col: i for i, col in enumerate(final_df.columns)}
-
-    for attr, val in user_input.items():
-        weight = prioritas_user.get(attr, 1.0)  # default ke 1.0 kalau tidak ditemukan
-
-        # One-hot encoding
-        if attr in ["Brand", "Category", "Transmission", "ClutchType", "EngineConfig"]:
-            prefix = attr.replace(" ", "")
-            col_name = f"{prefix}_{val}".lower()
-            match = [col for col in final_df.columns if col.lower() == col_name]
-            if match:
-                idx = col_index[match[0]]
-                user_vector[idx] = 1.0
-                weight_vector[idx] = weight
-
-        # Numerikal
-        else:
-            norm_col = f"{attr}_normalized"
-            if norm_col in final_df.columns and attr in df_mentah.columns:
-                idx = col_index[norm_col]
-                max_val = df_mentah[attr].max()
-                norm_val = float(val) / max_val
-                user_vector[idx] = norm_val
-                weight_vector[idx] = weight
+@st.cache_resource
+def load_result_cache():
+    return SharedResultCache(max_bytes=8 * 1024 * 1024)
 
-    return user_vector, weight_vector
 
+# Jumlahan parsial skor per sesi (iterasi refinement hanya menghitung kolom yang berubah),
+# dibagi semua sesi dengan batas total byte (LRU), bukan disimpan di session_state
+@st.cache_resource
+def load_skor_sesi():
+    return SesiSkor(maks_byte=64 * 1024 * 1024)
 
-# ==========================
-# Rekomendasi Cosine Similarity Berbobot
-# ==========================
-def rekomendasi_cosine_weighted(user_vec, weight_vec, case_matrix, final_df, user_input, top_n=6):
-    """
-    Menghitung cosine similarity berbobot + penalti selisih nilai numerik dari preferensi user.
-    """
-    # Konversi preferensi user ke dict
-    user_pref = dict(user_input)
-
-    # Siapkan target numerik dari preferensi user (jika ada)
-    target_power = float(user_pref.get("PowerHP", 0))
-    target_cc = float(user_pref.get("Displacement", 0))
-    target_price = float(user_pref.get("Price", 0))
-    target_weight = float(user_pref.get("WeightKG", 0))
-    target_fuel = float(user_pref.get("FuelTank", 0))
-
-    # Hitung cosine similarity (berbobot)
-    weighted_user_vector = user_vec * weight_vec
-    weighted_case_matrix = case_matrix * weight_vec
-    similarity_scores = cosine_similarity([weighted_user_vector], weighted_case_matrix)[0]
-
-    # Tempel ke final_df
-    final_df_with_score = final_df.copy()
-    final_df_with_score["Similarity"] = similarity_scores
-
-    # Hitung penalti
-    final_df_with_score["PowerPenalty"] = abs(final_df_with_score["PowerHP"] - target_power) if target_power else 0
-    final_df_with_score["CCPenalty"] = abs(final_df_with_score["Displacement"] - target_cc) if target_cc else 0
-    final_df_with_score["PricePenalty"] = abs(final_df_with_score["Price"] - target_price) / 1_000_000 if target_price else 0
-    final_df_with_score["WeightPenalty"] = abs(final_df_with_score["WeightKG"] - target_weight) if target_weight else 0
-    final_df_with_score["FuelPenalty"] = abs(final_df_with_score["FuelTank"] - target_fuel) if target_fuel else 0
-
-    # Final score: cosine - penalti (atur skala sesuai preferensi) <<<<<------ buat atur skala prioritas numerikal
-    final_df_with_score["FinalScore"] = (
-        final_df_with_score["Similarity"]
-        - 0.04 * final_df_with_score["PowerPenalty"]
-        - 0.02 * final_df_with_score["CCPenalty"]
-        - 0.01 * final_df_with_score["PricePenalty"]
-        - 0.01 * final_df_with_score["WeightPenalty"]
-        - 0.01 * final_df_with_score["FuelPenalty"]
+
+def id_sesi():
+    if "id_sesi" not in st.session_state:
+        st.session_state.id_sesi = uuid.uuid4().hex
+    return st.session_state.id_sesi
+
+
+def lepas_skor_sesi():
+    if "id_sesi" in st.session_state:
+        load_skor_sesi().hapus(st.session_state.id_sesi)
+
+@METRIK.ukur("skor.rekomendasi")
+def hitung_rekomendasi_ringkas(user_input, prioritas, top_n=6):
+    # Hasil untuk session state: posisi baris + skor (crscbr/sesi.py), bukan DataFrame
+    if "cache_rekomendasi" not in st.session_state:
+        st.session_state.cache_rekomendasi = SessionResultCache()
+    shared_cache = load_result_cache()
+    kunci = kunci_query(user_input, prioritas, engine.versi, top_n)
+
+    def hitung():
+        user_vec, weight_vec = engine.encode(user_input, prioritas)
+        if len(engine) >= INKREMENTAL_MIN_BARIS:
+            return load_skor_sesi().top_k(id_sesi(), engine, user_vec, weight_vec, user_input, k=top_n)
+        return engine.top_k(user_vec, weight_vec, user_input, k=top_n)
+
+    idx, final, sim = st.session_state.cache_rekomendasi.ambil_atau_hitung(
+        kunci, lambda: shared_cache.ambil_atau_hitung(kunci, hitung)
     )
+    return HasilRingkas(engine.versi, idx, final, sim, user_input)
 
-    # Urutkan dan ambil top-N
-    sorted_df = final_df_with_score.sort_values(by="FinalScore", ascending=False)
-    return sorted_df.head(top_n)
+def query_result_sesi(batas=None):
+    # Record hasil query-based dari posisi baris yang disimpan di sesi (None kalau belum ada query)
+    idx = st.session_state.get("query_result_idx")
+    if idx is None:
+        return None
+    return katalog.df.iloc[idx[:batas]].to_dict(orient="records")
 
 
 # ==========================
 # Timing dan ID Case
 # ==========================
+def zona_WIB():
+    import pytz  # baru di-import saat pertama menulis timestamp
+    return pytz.timezone("Asia/Jakarta")
+
 def timestamp_WIB():
-    return datetime.now(pytz.timezone('Asia/Jakarta')).strftime("%Y-%m-%d %H:%M:%S")
+    return datetime.now(zona_WIB()).strftime("%Y-%m-%d %H:%M:%S")
 
 def generate_case_id():
-    return f"case_{datetime.now(pytz.timezone('Asia/Jakarta')).strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    return f"case_{datetime.now(zona_WIB()).strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
 
 # ==========================
 # Format data user untuk Google Sheets
@@ -1506,79 +1517,55 @@ def format_data_for_gsheet(data_dict):
     return formatted
 
 
-def kirim_data_ke_gsheet(data_dict, spreadsheet_id, sheet_name="hasil_user_testing"):
-    try:
-        json_key = dict(st.secrets["gcp_service_account"])
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as tmp:
-            json.dump(json_key, tmp)
-            tmp_path = tmp.name
+# ==========================
+# Penulis latar belakang ke Google Sheets (batch + retry + journal lokal)
+# ==========================
+@st.cache_resource
+def load_penulis_gsheet():
+    return WriteBehindQueue(SheetsBackend(load_sheets_pool()), journal_path="gsheet_journal.jsonl").start()
 
-        gc = pygsheets.authorize(service_file=tmp_path)
-        sh = gc.open_by_key(spreadsheet_id)
-        wks = sh.worksheet_by_title(sheet_name)
 
+def kirim_data_ke_gsheet(data_dict, spreadsheet_id, sheet_name="hasil_user_testing"):
+    try:
         # FORMAT DULU
         formatted_data = format_data_for_gsheet(data_dict)
 
-        wks.append_table(list(formatted_data.values()), dimension='ROWS')
-        return True, "✅ Data berhasil dikirim ke Google Sheets."
+        # Masuk antrean, dikirim di latar belakang
+        load_penulis_gsheet().kirim(spreadsheet_id, sheet_name, list(formatted_data.values()))
+        return True, "✅ Data masuk antrean pengiriman ke Google Sheets."
     except Exception as e:
         return False, f"❌ Gagal mengirim data ke Google Sheets: {e}"
 
 
 
 # ==========================
-# Load case base dari Google Sheets (digunakan oleh hitung_model_terpopuler_dari_case_gsheet)
+# Load case base dari Google Sheets (disinkron ke case base lokal oleh load_case_store)
 # ==========================
 def load_case_base_from_gsheet(spreadsheet_id, sheet_name="CaseBase"):
-    json_key = dict(st.secrets["gcp_service_account"])
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as tmp:
-        json.dump(json_key, tmp)
-        tmp_path = tmp.name
-    
-    gc = pygsheets.authorize(service_file=tmp_path)
-    sh = gc.open_by_key(spreadsheet_id)
-    wks = sh.worksheet_by_title(sheet_name)
-    records = wks.get_all_records()
-
-    # Parse ulang field JSON
-    for r in records:
-        r["user_input"] = json.loads(r["user_input"])
-        r["refine_steps"] = json.loads(r["refine_steps"])
-        r["chosen_models"] = json.loads(r["chosen_models"])
-        r["is_refined"] = r["is_refined"].lower() == "true"
-        r["user_ranked"] = r["user_ranked"].lower() == "true"
-        r["refine_iteration_count"] = int(r["refine_iteration_count"])
-    return records
+    # Baris mentah; SinkronLatar mem-parse per baris dan mencatat baris rusak yang dilewati
+    return load_sheets_pool().dengan_worksheet(
+        spreadsheet_id, sheet_name, lambda wks: wks.get_all_records()
+    )
 
 
 # ==========================
-# Hitung model terpopuler dari case base GSheets (showed at step_rekomendasi)
+# Case base lokal (SQLite) dengan Google Sheets sebagai mirror (showed at step_rekomendasi)
 # ==========================
-def hitung_model_terpopuler_dari_case_gsheet(user_input, spreadsheet_id, sheet_name="CaseBase"):
-    records = load_case_base_from_gsheet(spreadsheet_id, sheet_name)
-    
-    # Normalisasi preferensi user
-    user_set = set((k.lower(), str(v).lower()) for k, v in user_input.items())
+@st.cache_resource
+def load_case_store():
+    store = CaseStore("case_base.sqlite")
+    load_sinkron_case_base(store)
+    return store
 
-    hitung_model = {}
-    for case in records:
-        case_input = case.get("user_input", {})
-        
-        # ⛔ Skip kalau user_input-nya bukan dict
-        if not isinstance(case_input, dict):
-            continue
 
-        case_set = set((k.lower(), str(v).lower()) for k, v in case_input.items())
-
-        if case_set == user_set:
-            for model_info in case.get("chosen_models", []):
-                model = model_info.get("model")
-                if model:
-                    hitung_model[model] = hitung_model.get(model, 0) + 1
-
-    hasil = sorted(hitung_model.items(), key=lambda x: x[1], reverse=True)
-    return hasil  # list of (model, jumlah)
+# Satu thread sinkron per proses; statusnya (last_error, baris dilewati) ditampilkan di step_rekomendasi
+@st.cache_resource
+def load_sinkron_case_base(_store):
+    return SinkronLatar(
+        _store,
+        lambda: load_case_base_from_gsheet('193gZBpZUWYv1GJxvgibbf04uR_txgJPiFoEIGTuVPSM', sheet_name="case_base"),
+        interval=300
+    ).start()
 
 
 # ==========================
@@ -1587,33 +1574,16 @@ def hitung_model_terpopuler_dari_case_gsheet(user_input, spreadsheet_id, sheet_n
 def simpan_case_model_gsheet(user_input, row_model, spreadsheet_id, sheet_name="case_base", refined=False, refine_log=None, user_ranked=False):
 
     # Siapkan data case
-    case_data = {
-        "case_id": generate_case_id(),
-        "user_input": json.dumps(user_input, ensure_ascii=False),
-        "is_refined": refined,
-        "refine_steps": json.dumps(refine_log if refine_log else [], ensure_ascii=False),
-        "refine_iteration_count": len(refine_log) if refine_log else 0,
-        "chosen_models": json.dumps([{
-            "model": row_model["Model"],
-            "similarity_score": float(row_model["Similarity"]) if "Similarity" in row_model else None,
-            "source": row_model.get("source", "cosine_similarity")
-        }], ensure_ascii=False),
-        "user_ranked": user_ranked,
-        "timestamp": datetime.now(pytz.timezone("Asia/Jakarta")).strftime("%Y-%m-%d %H:%M:%S")
-    }
+    case_data = buat_data_case(
+        generate_case_id(), timestamp_WIB(), user_input, row_model,
+        refined=refined, refine_log=refine_log, user_ranked=user_ranked
+    )
 
-    # Connect ke GSheet
-    json_key = dict(st.secrets["gcp_service_account"])
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as tmp:
-        json.dump(json_key, tmp)
-        tmp_path = tmp.name
-    
-    gc = pygsheets.authorize(service_file=tmp_path)
-    sh = gc.open_by_key(spreadsheet_id)
-    wks = sh.worksheet_by_title(sheet_name)
+    # Simpan dulu ke case base lokal supaya langsung terbaca di lookup berikutnya
+    load_case_store().tambah_case(case_data)
 
-    # Append baris baru
-    wks.append_table(list(case_data.values()), dimension='ROWS', overwrite=False)
+    # Append baris baru lewat antrean (tidak menunggu Google Sheets)
+    load_penulis_gsheet().kirim(spreadsheet_id, sheet_name, list(case_data.values()))
 
 
 # ==========================
@@ -1634,105 +1604,81 @@ def write_log_refine_iteration(refine_queue, user_input_before):
 # ==========================
 # Tampilkan model dengan atribut terstruktur
 # ==========================
+@METRIK.ukur("render.tampilkan_model")
 def tampilkan_model(row, judul=None):
-    atribut_kelompok = {
-        "🔧 Spesifikasi Mesin": [
-            "Displacement", "PowerHP", "Bore", "Stroke", "PistonCount", "EngineConfig"
-        ],
-        "⚙️ Transmisi & Struktur": [
-            "Transmission", "ClutchType", "WeightKG", "Brand", "Category"
-        ],
-        "⛽ Konsumsi & Kapasitas": [
-            "FuelTank", "FuelConsumptionKML"
-        ],
-        "💰 Harga": [
-            "Price"
-        ],
-        "📊 Skor Kemiripan": [
-            "Similarity"
-        ]
-    }
-
-    label_mapping = {
-        "Brand": "Merek",
-        "Category": "Kategori",
-        "Transmission": "Transmisi",
-        "ClutchType": "Jenis Kopling",
-        "Bore": "Diameter Silinder (mm)",
-        "Stroke": "Langkah Piston (mm)",
-        "PistonCount": "Jumlah Piston",
-        "Displacement": "Kapasitas Mesin (cc)",
-        "PowerHP": "Tenaga Maksimum (HP)",
-        "EngineConfig": "Konfigurasi Mesin",
-        "FuelTank": "Kapasitas Tangki (L)",
-        "WeightKG": "Berat Motor (kg)",
-        "FuelConsumptionKML": "Konsumsi BBM (km/L)",
-        "Similarity": "Skor Kemiripan",
-        "Price": "Harga (Rp)"
-    }
+    # Satu elemen per kartu; isi atribut sudah diformat sekali per baris katalog (crscbr/kartu.py)
+    st.markdown(katalog.kartu().kartu(row, judul), unsafe_allow_html=True)
 
-    nama_model = row.get("Model", "Model X")
-    model_judul = judul if judul else f"🏍️ **{nama_model.upper()}**"
-
-    with st.expander(model_judul):
-        for kategori, atribut_list in atribut_kelompok.items():
-            st.markdown(f"**{kategori}**")
-            for attr in atribut_list:
-                if attr in row:
-                    label = label_mapping.get(attr, attr)
-                    value = row[attr]
-                    if attr == "Price":
-                        try:
-                            formatted = f"{int(value):,}".replace(",", ".")
-                        except:
-                            formatted = value
-                    elif attr == "Similarity":
-                        try:
-                            formatted = f"{float(value)*100:.4f}%"
-                        except:
-                            formatted = value
-                    elif isinstance(value, float):
-                        formatted = f"{value:.2f}"
-                    else:
-                        formatted = value
-                    st.markdown(f"- **{label}**: {formatted}")
-            st.markdown("")
+@METRIK.ukur("render.tampilkan_model")
+def tampilkan_banyak_model(daftar, pemisah=False):
+    # Beberapa kartu [(row, judul), ...] dalam satu elemen
+    st.markdown(katalog.kartu().kartu_banyak(daftar, pemisah=pemisah), unsafe_allow_html=True)
 
 
 # =================== STREAMLIT APP ===================
 
 
-if st.session_state.step == "intro":
-    step_intro()
-elif st.session_state.step == "identity":
-    step_identity()
-elif st.session_state.step == "intro_query_based":
-    step_intro_query_based()
-elif st.session_state.step == "intro_query_for_dummies":
-    step_intro_query_for_dummies()
-elif st.session_state.step == "query_based":
-    step_query_based()
-elif st.session_state.step == "intro_CRSCBR":
-    step_intro_CRSCBR()
-elif st.session_state.step == "intro_CRSCBR_for_dummies":
-    step_intro_CRSCBR_for_dummies()
-elif st.session_state.step == "input":
-    step_input()
-elif st.session_state.step == "prioritas":
-    step_prioritas()
-elif st.session_state.step == "rekomendasi":
-    step_rekomendasi()
-elif st.session_state.step == "refinement":
-    step_refinement()
-elif st.session_state.step == "refine_prioritas":
-    step_refine_prioritas()
-elif st.session_state.step == "refinement_result":
-    step_refinement_result()
-elif st.session_state.step == "survey_1_app1":
-    step_survey_1_app1()
-elif st.session_state.step == "survey_1_app2":
-    step_survey_1_app2()
-elif st.session_state.step == "survey_2":
-    step_survey_2()
-elif st.session_state.step == "finish":
-    step_finish_evaluation()
+# Halaman pembuka tidak memakai katalog; tahap lain memuat katalog/engine dulu
+LANGKAH_TANPA_KATALOG = {
+    "intro", "identity", "intro_query_based", "intro_query_for_dummies",
+    "intro_CRSCBR", "intro_CRSCBR_for_dummies",
+}
+# Setiap rerun dicatat sebagai span per tahap (aktif kalau CRSCBR_METRIK=1, lihat crscbr/metrik.py)
+with METRIK.konteks(step=st.session_state.step), METRIK.span("rerun"):
+    if st.session_state.step not in LANGKAH_TANPA_KATALOG:
+        with METRIK.span("muat_katalog"):
+            muat_katalog()
+
+    with METRIK.konteks(versi=katalog.versi if katalog is not None else None), METRIK.span("step"):
+        if st.session_state.step == "intro":
+            step_intro()
+        elif st.session_state.step == "identity":
+            step_identity()
+        elif st.session_state.step == "intro_query_based":
+            step_intro_query_based()
+        elif st.session_state.step == "intro_query_for_dummies":
+            step_intro_query_for_dummies()
+        elif st.session_state.step == "query_based":
+            step_query_based()
+        elif st.session_state.step == "intro_CRSCBR":
+            step_intro_CRSCBR()
+        elif st.session_state.step == "intro_CRSCBR_for_dummies":
+            step_intro_CRSCBR_for_dummies()
+        elif st.session_state.step == "input":
+            step_input()
+        elif st.session_state.step == "prioritas":
+            step_prioritas()
+        elif st.session_state.step == "rekomendasi":
+            step_rekomendasi()
+        elif st.session_state.step == "refinement":
+            step_refinement()
+        elif st.session_state.step == "refine_prioritas":
+            step_refine_prioritas()
+        elif st.session_state.step == "refinement_result":
+            step_refinement_result()
+        elif st.session_state.step == "survey_1_app1":
+            step_survey_1_app1()
+        elif st.session_state.step == "survey_1_app2":
+            step_survey_1_app2()
+        elif st.session_state.step == "survey_2":
+            step_survey_2()
+        elif st.session_state.step == "finish":
+            step_finish_evaluation()
+
+    # Halaman sudah terkirim; panaskan cache katalog/engine untuk tahap berikutnya
+    with METRIK.span("muat_katalog"):
+        muat_katalog()
+
+if PROFIL_STARTUP.aktif:
+    with st.sidebar.expander("⏱️ Profil startup"):
+        st.code(PROFIL_STARTUP.teks())
+    if "profil_startup_dicetak" not in st.session_state:
+        st.session_state.profil_startup_dicetak = True
+        print(PROFIL_STARTUP.teks(), file=sys.stderr)
+
+if METRIK.aktif:
+    # Ukuran session state sesi ini; katalog/engine dipakai bersama sehingga tidak dihitung
+    with st.sidebar.expander("📦 Ukuran session state"):
+        ukuran, total = laporan_ukuran(st.session_state, objek_bersama(katalog, st.session_state.get("katalog")))
+        st.caption(f"Total {total / 1024:.1f} KiB")
+        st.table(pd.DataFrame(ukuran, columns=["kunci", "byte"]))
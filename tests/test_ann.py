@@ -0,0 +1,69 @@
+"""
+AnnIndex (toleransi 0) harus identik dengan engine.top_k, langsung maupun lewat
+engine.pasang_ann dan muat_versi(ann_min_baris=...).
+"""
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.hot_paths import buat_profil, perbesar_katalog
+from crscbr.ann import AnnIndex
+from crscbr.engine import CaseBaseEngine
+from crscbr.katalog import baca_katalog
+from crscbr.registry import muat_versi
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def engine_besar():
+    final_df = baca_katalog(os.path.join(ROOT, "final_df_update1.pkl"))
+    final_besar, case_besar, schema = perbesar_katalog(final_df, 30_000)
+    return CaseBaseEngine(case_besar, final_besar, schema=schema)
+
+
+def profil_uji(final_df):
+    return buat_profil(final_df, 150, seed=4) + [
+        ({}, {}),
+        ({"Brand": "Honda"}, {"Brand": 1}),
+        ({"Transmission": "Manual", "ClutchType": "Wet"}, {"Transmission": 2, "ClutchType": 1}),
+    ]
+
+
+@pytest.mark.parametrize("k", [1, 6, 40])
+def test_ann_sama_dengan_top_k(engine_besar, k):
+    indeks = AnnIndex(engine_besar, ukuran_bucket=64)
+    for user_input, prioritas in profil_uji(engine_besar.final_df):
+        user_vec, weight_vec = engine_besar.encode(user_input, prioritas)
+        hasil = indeks.top_k(user_vec, weight_vec, user_input, k=k)
+        harapan = engine_besar.top_k(user_vec, weight_vec, user_input, k=k, pruning=False)
+        for a, b in zip(hasil, harapan):
+            np.testing.assert_array_equal(a, b, err_msg=str(user_input))
+
+
+def test_engine_memakai_ann_yang_dipasang(engine_besar):
+    indeks = AnnIndex(engine_besar)
+    engine_besar.pasang_ann(indeks)
+    try:
+        for user_input, prioritas in profil_uji(engine_besar.final_df)[:40]:
+            user_vec, weight_vec = engine_besar.encode(user_input, prioritas)
+            hasil = engine_besar.top_k(user_vec, weight_vec, user_input)
+            harapan = engine_besar.top_k(user_vec, weight_vec, user_input, pruning=False)
+            for a, b in zip(hasil, harapan):
+                np.testing.assert_array_equal(a, b)
+        indeks.statistik_terakhir = {}
+        user_vec, weight_vec = engine_besar.encode({"Brand": "Honda"}, {"Brand": 1})
+        engine_besar.top_k(user_vec, weight_vec, {"Brand": "Honda"})
+        assert indeks.statistik_terakhir["baris"] < len(engine_besar)
+    finally:
+        engine_besar.pasang_ann(None)
+
+
+def test_muat_versi_memasang_ann_untuk_katalog_besar():
+    assert muat_versi("update1", ROOT).engine.ann is None
+    versi = muat_versi("update1", ROOT, ann_min_baris=100)
+    assert isinstance(versi.engine.ann, AnnIndex)
+    with pytest.raises(ValueError):
+        muat_versi("update1", ROOT).engine.pasang_ann(versi.engine.ann)
@@ -0,0 +1,118 @@
+"""
+Bundel katalog: engine dari bundel sama dengan engine dari pickle, cek kesegaran
+terhadap pickle sumber, pembersihan bundel tak terpakai dan kolom string berkamus.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.hot_paths import buat_profil, perbesar_katalog
+from crscbr.bundel import KAMUS_LAZY_MIN, Bundel, bundel_segar, hapus_bundel_tak_terpakai, simpan_bundel
+from crscbr.engine import CaseBaseEngine
+from crscbr.kamus import KolomKamus
+from crscbr.katalog import baca_katalog
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def katalog_asli():
+    final_df = pd.read_pickle(os.path.join(ROOT, "final_df_update1.pkl"))
+    case_vector_df = pd.read_pickle(os.path.join(ROOT, "case_vector_df_update1.pkl"))
+    return final_df, case_vector_df
+
+
+def test_engine_bundel_sama_dengan_pickle(tmp_path, katalog_asli):
+    final_df, case_vector_df = katalog_asli
+    path = str(tmp_path / "katalog_update1")
+    simpan_bundel(path, final_df, case_vector_df)
+    bundel = Bundel.muat(path)
+    engine = bundel.engine()
+    acuan = CaseBaseEngine(case_vector_df, final_df)
+
+    assert engine.versi == acuan.versi
+    assert list(bundel.final_df().columns) == list(final_df.columns)
+    assert list(bundel.case_vector_df().columns) == list(case_vector_df.columns)
+    np.testing.assert_array_equal(bundel.case_vector_df().to_numpy(), case_vector_df.to_numpy(dtype=np.float64))
+    for user_input, prioritas in buat_profil(final_df, 100, seed=6):
+        user_vec, weight_vec = acuan.encode(user_input, prioritas)
+        hasil = engine.top_k(user_vec, weight_vec, user_input, k=10)
+        harapan = acuan.top_k(user_vec, weight_vec, user_input, k=10)
+        for a, b in zip(hasil, harapan):
+            np.testing.assert_array_equal(a, b)
+        tampil = engine.materialisasi(*hasil, user_input)
+        assert tampil["Model"].tolist() == final_df["Model"].iloc[harapan[0]].tolist()
+
+
+def test_bundel_segar_mengikuti_pickle_sumber(tmp_path, katalog_asli):
+    final_df, case_vector_df = katalog_asli
+    path_final = str(tmp_path / "final_df_x.pkl")
+    path_case = str(tmp_path / "case_vector_df_x.pkl")
+    final_df.to_pickle(path_final)
+    case_vector_df.to_pickle(path_case)
+    path = str(tmp_path / "katalog_x")
+    simpan_bundel(path, final_df, case_vector_df, sumber=(path_final, path_case))
+    assert bundel_segar(path, (path_final, path_case))
+
+    # mtime berubah (checkout ulang) tapi isi sama: tetap segar
+    os.utime(path_final, ns=(0, 0))
+    assert bundel_segar(path, (path_final, path_case))
+    # Pickle sumber yang tidak ada di deploy diabaikan
+    assert bundel_segar(path, (path_final, str(tmp_path / "tidak_ada.pkl")))
+
+    final_df.iloc[:-1].to_pickle(path_final)
+    assert not bundel_segar(path, (path_final, path_case))
+    # Bundel tanpa catatan sumber dianggap usang kalau pickle-nya ada
+    simpan_bundel(path, final_df, case_vector_df)
+    assert not bundel_segar(path, (path_case,))
+    assert not bundel_segar(str(tmp_path / "katalog_tidak_ada"), ())
+
+
+def test_bersihkan_melindungi_versi_aktif(tmp_path, katalog_asli):
+    final_df, case_vector_df = katalog_asli
+    for nama in ("update1", "update2", "update3", "update4"):
+        simpan_bundel(str(tmp_path / f"katalog_{nama}"), final_df, case_vector_df)
+    (tmp_path / "katalog_aktif.txt").write_text("update3\n", encoding="utf-8")
+    # Sisa penerbitan yang sedang berjalan
+    for nama in ("katalog_update5.tmp", "katalog_update2.lama-123"):
+        os.makedirs(tmp_path / nama)
+        (tmp_path / nama / "manifest.json").write_text("{}", encoding="utf-8")
+
+    dihapus = hapus_bundel_tak_terpakai(str(tmp_path), simpan=["update4"])
+    assert dihapus == [str(tmp_path / "katalog_update2")]
+    assert sorted(p for p in os.listdir(tmp_path) if p.startswith("katalog_")) == [
+        "katalog_aktif.txt", "katalog_update1", "katalog_update2.lama-123",
+        "katalog_update3", "katalog_update4", "katalog_update5.tmp",
+    ]
+
+
+def test_bersihkan_melewati_bundel_yang_dipakai(tmp_path, katalog_asli):
+    final_df, case_vector_df = katalog_asli
+    path = str(tmp_path / "katalog_update2")
+    simpan_bundel(path, final_df, case_vector_df)
+    bundel = Bundel.muat(path)
+    assert hapus_bundel_tak_terpakai(str(tmp_path)) == []
+    del bundel
+
+
+def test_kolom_kamus_dekode_sesuai_pickle(tmp_path):
+    final_df = baca_katalog(os.path.join(ROOT, "final_df_update1.pkl"))
+    final_besar, case_besar, schema = perbesar_katalog(final_df, KAMUS_LAZY_MIN + 500)
+    path = str(tmp_path / "katalog_besar")
+    simpan_bundel(path, final_besar, case_besar, schema=schema)
+    katalog = Bundel.muat(path).katalog()
+
+    model = katalog["Model"]
+    assert isinstance(model.array, KolomKamus)
+    assert isinstance(katalog["Brand"].dtype, pd.CategoricalDtype)
+
+    idx = np.array([5, 0, len(katalog) - 1, 5])
+    assert model.iloc[idx].tolist() == final_besar["Model"].iloc[idx].tolist()
+    assert katalog.iloc[7]["Model"] == final_besar["Model"].iloc[7]
+    nama = final_besar["Model"].iloc[123]
+    np.testing.assert_array_equal((model == nama).to_numpy(), (final_besar["Model"] == nama).to_numpy())
+    assert not (model == "tidak ada").any()
+    assert model.iloc[idx].to_numpy().dtype == object
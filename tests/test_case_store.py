@@ -0,0 +1,45 @@
+"""
+Sinkron case base dari sheet: baris rusak dilewati dan dihitung, baris lain tetap diimpor.
+"""
+from crscbr.case_store import CaseStore, SinkronLatar, buat_data_case, parse_records
+
+
+def baris_sheet(jumlah):
+    """
+    Baris seperti get_all_records: semua nilai berupa string/angka mentah dari sheet.
+    """
+    baris = []
+    for i in range(jumlah):
+        case = buat_data_case(f"c{i}", "2024-01-01 10:00:00", {"Brand": "Honda"}, {"Model": f"m{i % 2}"})
+        baris.append({k: str(v).upper() if isinstance(v, bool) else v for k, v in case.items()})
+    return baris
+
+
+def test_parse_records_melewati_baris_rusak():
+    baris = baris_sheet(5)
+    baris[1]["user_input"] = "{bukan json"
+    baris[3]["refine_iteration_count"] = ""
+    del baris[4]["chosen_models"]
+    dilewati = []
+    hasil = parse_records(baris, dilewati)
+    assert [r["case_id"] for r in hasil] == ["c0", "c2"]
+    assert hasil[0]["user_input"] == {"Brand": "Honda"}
+    assert [no for no, _ in dilewati] == [3, 5, 6]
+
+
+def test_sinkron_mencatat_baris_dilewati():
+    baris = baris_sheet(4)
+    baris[2]["case_id"] = ""
+    store = CaseStore(":memory:")
+    sinkron = SinkronLatar(store, lambda: [dict(r) for r in baris])
+    assert sinkron.sinkron_sekarang() == 3
+    assert sinkron.last_error is None
+    assert [no for no, _ in sinkron.dilewati] == [4]
+    assert store.model_terpopuler({"Brand": "Honda"}) == [("m1", 2), ("m0", 1)]
+
+    def gagal():
+        raise ConnectionError("sheet tidak bisa dihubungi")
+
+    sinkron.loader = gagal
+    assert sinkron.sinkron_sekarang() == 0
+    assert isinstance(sinkron.last_error, ConnectionError)
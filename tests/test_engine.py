@@ -0,0 +1,75 @@
+"""
+top_k_batch harus identik dengan top_k per query (indeks, urutan seri, skor),
+dicek pada katalog update1 yang ikut di repo; top_k dengan pruning posting list
+harus identik dengan scan penuh pada katalog sintetis di atas PRUNING_MIN_BARIS.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.hot_paths import buat_profil, perbesar_katalog
+from crscbr.engine import PRUNING_MIN_BARIS, CaseBaseEngine
+from crscbr.schema import muat_atau_bangun_skema
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    path_case = os.path.join(ROOT, "case_vector_df_update1.pkl")
+    case_vector_df = pd.read_pickle(path_case)
+    final_df = pd.read_pickle(os.path.join(ROOT, "final_df_update1.pkl"))
+    schema = muat_atau_bangun_skema(path_case, case_vector_df, final_df)
+    return CaseBaseEngine(case_vector_df, final_df, schema=schema)
+
+
+def profil_uji(engine):
+    profil = buat_profil(engine.final_df, 200, seed=1)
+    # Profil dengan banyak baris bernilai sama (seri di batas top-k)
+    profil += [
+        ({}, {}),
+        ({"Brand": "Honda"}, {"Brand": 1}),
+        ({"Transmission": "Manual"}, {"Transmission": 1}),
+        ({"Brand": "Yamaha", "Category": "SportNaked"}, {"Brand": 2, "Category": 1}),
+    ]
+    return profil
+
+
+@pytest.mark.parametrize("k", [1, 6, 20])
+@pytest.mark.parametrize("blok_baris", [None, 16])
+def test_top_k_batch_sama_dengan_top_k(engine, k, blok_baris):
+    profil = profil_uji(engine)
+    daftar_input = [p[0] for p in profil]
+    user_matrix, weight_matrix = engine.schema.encode_batch(daftar_input, [p[1] for p in profil])
+    opsi = {} if blok_baris is None else {"blok_query": 32, "blok_baris": blok_baris}
+    idx, final, sim = engine.top_k_batch(user_matrix, weight_matrix, daftar_input, k=k, **opsi)
+
+    for q, user_input in enumerate(daftar_input):
+        e_idx, e_final, e_sim = engine.top_k(user_matrix[q], weight_matrix[q], user_input, k=k)
+        np.testing.assert_array_equal(idx[q], e_idx)
+        np.testing.assert_array_equal(final[q], e_final)
+        np.testing.assert_array_equal(sim[q], e_sim)
+
+
+@pytest.fixture(scope="module")
+def engine_besar():
+    final_df = pd.read_pickle(os.path.join(ROOT, "final_df_update1.pkl"))
+    final_besar, case_besar, schema = perbesar_katalog(final_df, PRUNING_MIN_BARIS + 5_000)
+    return CaseBaseEngine(case_besar, final_besar, schema=schema)
+
+
+@pytest.mark.parametrize("k", [1, 6, 50])
+def test_top_k_pruning_sama_dengan_scan(engine_besar, k):
+    dipangkas = 0
+    for user_input, prioritas in profil_uji(engine_besar):
+        user_vec, weight_vec = engine_besar.encode(user_input, prioritas)
+        hasil = engine_besar.top_k(user_vec, weight_vec, user_input, k=k, pruning=True)
+        harapan = engine_besar.top_k(user_vec, weight_vec, user_input, k=k, pruning=False)
+        for a, b in zip(hasil, harapan):
+            np.testing.assert_array_equal(a, b, err_msg=str(user_input))
+        dipangkas += engine_besar._top_k_pruning(user_vec, weight_vec, user_input, k) is not None
+    # Sebagian besar query dengan atribut kategori benar-benar lewat jalur pruning
+    assert dipangkas > 50
@@ -0,0 +1,42 @@
+"""
+Gerbang regresi benchmark: jalur yang dijaga tetapi belum ada di baseline dihitung
+gagal, dan baseline di repo mencakup semua jalur katalog yang dijaga.
+"""
+import json
+import os
+import re
+
+from benchmarks.hot_paths import JALUR_REKOMENDASI, bandingkan
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_bandingkan_jalur_tanpa_baseline_gagal():
+    hasil = {
+        "engine_top_k[n=100]": {"median_s": 1.0},
+        "query_indeks[n=100]": {"median_s": 1.0},
+        "engine_scan[n=100]": {"median_s": 9.0},
+    }
+    baseline = {"engine_top_k[n=100]": {"median_s": 0.5}, "engine_scan[n=100]": {"median_s": 1.0}}
+    assert bandingkan(hasil, baseline, 1.5) == [
+        ("engine_top_k[n=100]", 1.0, 0.5),
+        ("query_indeks[n=100]", 1.0, None),
+    ]
+    assert bandingkan(hasil, {**baseline, "query_indeks[n=100]": {"median_s": 1.0}}, 2.5) == []
+
+
+def test_baseline_mencakup_jalur_yang_dijaga():
+    with open(os.path.join(ROOT, "benchmarks", "baseline.json"), encoding="utf-8") as f:
+        baseline = json.load(f)["hasil"]
+    ukuran = [m.group(1) for m in map(re.compile(r"engine_scan\[n=(\d+)\]").fullmatch, baseline) if m]
+    assert ukuran
+    for n in ukuran:
+        for jalur in JALUR_REKOMENDASI:
+            if jalur in ("populer_store", "bulk_score"):
+                continue
+            assert f"{jalur}[n={n}]" in baseline
+        # Pruning tidak boleh lebih lambat dari scan penuh (toleransi derau pengukuran)
+        assert baseline[f"engine_top_k[n={n}]"]["median_s"] <= baseline[f"engine_scan[n={n}]"]["median_s"] * 1.2
+    assert any(nama.startswith("bulk_score[") for nama in baseline)
+    assert any(nama.startswith("populer_store[") for nama in baseline)
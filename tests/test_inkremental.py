@@ -0,0 +1,82 @@
+"""
+Rantai refinement lewat SesiSkor harus identik dengan engine.top_k di tiap iterasi,
+dan SesiSkor menjaga total byte jumlahan parsial di bawah maks_byte.
+"""
+import os
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.hot_paths import OPSI_ATRIBUT, RENTANG_NUMERIK, buat_profil, perbesar_katalog
+from crscbr.engine import CaseBaseEngine
+from crscbr.inkremental import INKREMENTAL_MIN_BARIS, SesiSkor
+from crscbr.katalog import baca_katalog
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def engine_besar():
+    final_df = baca_katalog(os.path.join(ROOT, "final_df_update1.pkl"))
+    final_besar, case_besar, schema = perbesar_katalog(final_df, INKREMENTAL_MIN_BARIS + 5_000)
+    return CaseBaseEngine(case_besar, final_besar, schema=schema)
+
+
+def ubah_profil(rng, opsi, user_input, prioritas):
+    """
+    Satu langkah refinement acak: ganti nilai, ganti prioritas, tambah atau buang atribut.
+    """
+    user_input, prioritas = dict(user_input), dict(prioritas)
+    atribut = rng.choice(list(user_input))
+    r = rng.random()
+    if r < 0.5:
+        user_input[atribut] = nilai_acak(rng, opsi, atribut)
+    elif r < 0.7:
+        prioritas[atribut] = rng.randint(1, 6)
+    elif r < 0.85 and len(user_input) < 7:
+        baru = rng.choice(OPSI_ATRIBUT)
+        user_input[baru] = nilai_acak(rng, opsi, baru)
+        prioritas[baru] = rng.randint(1, 6)
+    elif len(user_input) > 1:
+        del user_input[atribut]
+        prioritas.pop(atribut, None)
+    return user_input, prioritas
+
+
+def nilai_acak(rng, opsi, atribut):
+    if atribut in RENTANG_NUMERIK:
+        return rng.randint(*RENTANG_NUMERIK[atribut])
+    return rng.choice(opsi[atribut])
+
+
+def test_rantai_refinement_sama_dengan_top_k(engine_besar):
+    final_df = engine_besar.final_df
+    opsi = {a: sorted(final_df[a].unique()) for a in OPSI_ATRIBUT if a not in RENTANG_NUMERIK}
+    rng = random.Random(1)
+    sesi_skor = SesiSkor()
+    for sesi, (user_input, prioritas) in enumerate(buat_profil(final_df, 4, seed=3)):
+        for _ in range(25):
+            user_input, prioritas = ubah_profil(rng, opsi, user_input, prioritas)
+            user_vec, weight_vec = engine_besar.encode(user_input, prioritas)
+            hasil = sesi_skor.top_k(sesi, engine_besar, user_vec, weight_vec, user_input, k=6)
+            harapan = engine_besar.top_k(user_vec, weight_vec, user_input, k=6)
+            for a, b in zip(hasil, harapan):
+                np.testing.assert_array_equal(a, b)
+
+
+def test_sesi_dibatasi_byte(engine_besar):
+    user_input, prioritas = buat_profil(engine_besar.final_df, 1, seed=5)[0]
+    user_vec, weight_vec = engine_besar.encode(user_input, prioritas)
+    per_sesi = 34 * len(engine_besar)
+    sesi_skor = SesiSkor(maks_byte=int(2.5 * per_sesi))
+    for sesi in range(5):
+        sesi_skor.top_k(sesi, engine_besar, user_vec, weight_vec, user_input)
+        assert sesi_skor.bytes <= sesi_skor.maks_byte
+    assert len(sesi_skor) == 2
+    assert sesi_skor.evictions == 3
+
+    sesi_skor.hapus(4)
+    assert len(sesi_skor) == 1
+    assert sesi_skor.bytes == per_sesi
@@ -0,0 +1,93 @@
+"""
+Layanan lewat HTTP sungguhan (KlienLayanan): /top_k dan rantai /refine harus memberi
+indeks dan skor yang sama dengan engine.top_k langsung, termasuk jalur skor inkremental
+di katalog sintetis di atas INKREMENTAL_MIN_BARIS.
+"""
+import asyncio
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmarks.hot_paths import buat_profil, perbesar_katalog
+from crscbr.engine import CaseBaseEngine
+from crscbr.inkremental import INKREMENTAL_MIN_BARIS
+from crscbr.layanan import GalatLayanan, KlienLayanan, Layanan
+from crscbr.registry import RegistriKatalog, VersiKatalog
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def versi():
+    final_df = pd.read_pickle(os.path.join(ROOT, "final_df_update1.pkl"))
+    final_besar, case_besar, schema = perbesar_katalog(final_df, INKREMENTAL_MIN_BARIS + 5_000)
+    engine = CaseBaseEngine(case_besar, final_besar, schema=schema)
+    return VersiKatalog("sintetis", engine, final_besar, "uji")
+
+
+@pytest.fixture(scope="module")
+def url(versi):
+    registri = RegistriKatalog(pemuat=lambda nama: versi)
+    registri.muat_awal("sintetis")
+    layanan = Layanan(registri, worker=2)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(layanan.mulai(port=0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{port}"
+    asyncio.run_coroutine_threadsafe(layanan.berhenti(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def harapan(engine, user_input, prioritas, k):
+    user_vec, weight_vec = engine.encode(user_input, prioritas)
+    idx, final, _ = engine.top_k(user_vec, weight_vec, user_input, k=k)
+    return idx.tolist(), final.tolist()
+
+
+def ringkas(jawaban):
+    return [r["indeks"] for r in jawaban["hasil"]], [r["FinalScore"] for r in jawaban["hasil"]]
+
+
+def test_top_k_sama_dengan_engine(url, versi):
+    klien = KlienLayanan(url)
+    try:
+        for user_input, prioritas in buat_profil(versi.final_df, 40, seed=3):
+            jawaban = klien.top_k(user_input, prioritas, k=6)
+            assert jawaban["versi"] == versi.versi
+            assert ringkas(jawaban) == harapan(versi.engine, user_input, prioritas, 6), user_input
+    finally:
+        klien.tutup()
+
+
+def test_rantai_refine_sama_dengan_engine(url, versi):
+    klien = KlienLayanan(url)
+    try:
+        user_input, prioritas = buat_profil(versi.final_df, 1, seed=5)[0]
+        prioritas = {**prioritas, "Price": 1}
+        for harga in range(20_000_000, 40_000_000, 4_000_000):
+            jawaban = klien.refine("s1", user_input, {"Price": harga}, prioritas, k=6)
+            user_input = jawaban["user_input"]
+            assert user_input["Price"] == harga
+            assert ringkas(jawaban) == harapan(versi.engine, user_input, prioritas, 6), harga
+        # Sesi benar-benar memakai jumlahan parsial inkremental
+        sesi = klien.status()["sesi"]
+        assert sesi["sesi"] == 1 and sesi["bytes"] > 0
+    finally:
+        klien.tutup()
+
+
+def test_body_tidak_valid_ditolak(url):
+    klien = KlienLayanan(url)
+    try:
+        with pytest.raises(GalatLayanan) as galat:
+            klien._panggil("POST", "/top_k", {"user_input": {}, "k": 0})
+        assert galat.value.status == 400
+    finally:
+        klien.tutup()
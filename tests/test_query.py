@@ -0,0 +1,70 @@
+"""
+IndeksQuery.cari harus memilih baris yang sama dengan saring_query_based untuk nilai
+persis, rentang (Rentang / tuple) dan daftar nilai kategori.
+"""
+import os
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.hot_paths import OPSI_ATRIBUT, RENTANG_NUMERIK, perbesar_katalog
+from crscbr.katalog import baca_katalog
+from crscbr.query import IndeksQuery, Rentang, saring_query_based
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module", params=["asli", "sintetis"])
+def katalog(request):
+    df = baca_katalog(os.path.join(ROOT, "final_df_update1.pkl"))
+    if request.param == "sintetis":
+        # Cukup besar supaya jalur bitset (kandidat > n / RASIO_PROBE) ikut teruji
+        df = perbesar_katalog(df, 20_000)[0]
+    return df
+
+
+def preferensi_acak(rng, df, opsi):
+    preferensi = {}
+    for attr in rng.sample(OPSI_ATRIBUT, rng.randint(1, 4)):
+        if attr in RENTANG_NUMERIK:
+            nilai = df[attr].to_numpy()
+            r = rng.random()
+            if r < 0.4:
+                preferensi[attr] = float(nilai[rng.randrange(len(nilai))])
+            else:
+                a, b = sorted(rng.uniform(*RENTANG_NUMERIK[attr]) for _ in range(2))
+                if r < 0.6:
+                    preferensi[attr] = Rentang(a, b)
+                elif r < 0.8:
+                    preferensi[attr] = (a, None)
+                else:
+                    preferensi[attr] = (None, b)
+        elif rng.random() < 0.5:
+            preferensi[attr] = rng.choice(opsi[attr])
+        else:
+            preferensi[attr] = rng.sample(opsi[attr], rng.randint(1, min(3, len(opsi[attr]))))
+    return preferensi
+
+
+def test_cari_sama_dengan_saring_query_based(katalog):
+    opsi = {a: sorted(katalog[a].dropna().unique()) for a in OPSI_ATRIBUT if a not in RENTANG_NUMERIK}
+    indeks = IndeksQuery(katalog)
+    rng = random.Random(7)
+    for _ in range(300):
+        preferensi = preferensi_acak(rng, katalog, opsi)
+        harapan = katalog.index.get_indexer(saring_query_based(katalog, preferensi).index)
+        np.testing.assert_array_equal(indeks.cari(preferensi), harapan, err_msg=str(preferensi))
+
+
+def test_rentang_dan_daftar(katalog):
+    indeks = IndeksQuery(katalog)
+    harga = katalog["Price"].to_numpy()
+    a, b = np.percentile(harga, [25, 50])
+    np.testing.assert_array_equal(indeks.cari({"Price": (a, b)}), np.flatnonzero((harga >= a) & (harga <= b)))
+    np.testing.assert_array_equal(
+        indeks.cari({"Brand": ["Honda", "Yamaha"]}),
+        np.flatnonzero(katalog["Brand"].isin(["Honda", "Yamaha"]).to_numpy()),
+    )
+    assert len(indeks.cari({"Brand": []})) == 0
@@ -0,0 +1,90 @@
+"""
+RegistriKatalog: hanya permintaan versi terakhir yang menjadi aktif, versi yang tidak
+kompatibel ditolak, dan file penunjuk menukar versi tanpa restart.
+"""
+import os
+import threading
+
+import pytest
+
+from crscbr.registry import RegistriKatalog, VersiKatalog, muat_versi
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def versi_dasar():
+    return muat_versi("update1", ROOT)
+
+
+class PemuatUji:
+    """
+    Pemuat palsu: versi nama = salinan versi dasar; versi di tahan menunggu event-nya.
+    """
+
+    def __init__(self, dasar):
+        self.dasar = dasar
+        self.tahan = {}
+        self.rusak = set()
+
+    def __call__(self, nama):
+        if nama in self.tahan:
+            assert self.tahan[nama].wait(5)
+        df = self.dasar.df.drop(columns=["Model"]) if nama in self.rusak else self.dasar.df
+        return VersiKatalog(nama, self.dasar.engine, df, self.dasar.sumber)
+
+
+def test_permintaan_terakhir_yang_menang(versi_dasar):
+    pemuat = PemuatUji(versi_dasar)
+    registri = RegistriKatalog(pemuat=pemuat)
+    registri.muat_awal("a")
+    ditukar = []
+    registri.tambah_pendengar(lambda lama, baru: ditukar.append((lama.nama, baru.nama)))
+
+    pemuat.tahan["b"] = threading.Event()
+    lambat = registri.ganti("b")
+    registri.ganti("c").join(5)
+    assert registri.aktif().nama == "c"
+
+    # b selesai belakangan: dibuang karena bukan permintaan terakhir
+    pemuat.tahan["b"].set()
+    lambat.join(5)
+    assert registri.aktif().nama == "c"
+    assert [nama for _, nama, _ in registri.riwayat] == ["a", "c"]
+    assert ditukar == [("a", "c")]
+
+    # Kembali ke versi aktif membatalkan pemuatan lain yang masih berjalan
+    pemuat.tahan["d"] = threading.Event()
+    lambat = registri.ganti("d")
+    registri.ganti("c")
+    pemuat.tahan["d"].set()
+    lambat.join(5)
+    assert registri.aktif().nama == "c"
+
+
+def test_versi_tidak_kompatibel_ditolak(versi_dasar):
+    pemuat = PemuatUji(versi_dasar)
+    pemuat.rusak.add("rusak")
+    registri = RegistriKatalog(pemuat=pemuat)
+    registri.muat_awal("a")
+    with pytest.raises(ValueError, match="kolom katalog hilang: Model"):
+        registri.ganti("rusak", latar=False)
+    assert registri.aktif().nama == "a"
+    assert registri.error_terakhir.startswith("rusak:")
+
+    registri.ganti("b", latar=False)
+    assert registri.aktif().nama == "b"
+    assert registri.error_terakhir is None
+
+
+def test_penunjuk_menukar_versi(tmp_path, versi_dasar):
+    registri = RegistriKatalog(pemuat=PemuatUji(versi_dasar))
+    penunjuk = tmp_path / "katalog_aktif.txt"
+    assert registri.pantau_penunjuk(str(penunjuk), "update1") == "update1"
+    assert registri.aktif().nama == "update1"
+
+    penunjuk.write_text("update2\n", encoding="utf-8")
+    assert registri.pantau_penunjuk(str(penunjuk), "update1") == "update2"
+    registri._thread.join(5)
+    assert registri.aktif().nama == "update2"
@@ -0,0 +1,41 @@
+"""
+SheetsClientPool: request ke client bersama tidak boleh berjalan bersamaan antar-thread.
+"""
+import threading
+import time
+
+from crscbr.sheets_client import SheetsClientPool
+
+
+class ClientPalsu:
+    def __init__(self):
+        self.aktif = 0
+        self.maks_aktif = 0
+
+    def open_by_key(self, spreadsheet_id):
+        return self
+
+    def worksheet_by_title(self, sheet_name):
+        return self
+
+
+def test_dengan_worksheet_berjalan_bergantian():
+    client = ClientPalsu()
+    pool = SheetsClientPool({}, authorize=lambda info: client)
+
+    def request(wks):
+        wks.aktif += 1
+        wks.maks_aktif = max(wks.maks_aktif, wks.aktif)
+        time.sleep(0.002)
+        wks.aktif -= 1
+
+    threads = [
+        threading.Thread(target=lambda: [pool.dengan_worksheet("ss", "cases", request) for _ in range(10)])
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.maks_aktif == 1
+    assert pool.stats["authorize"] == 1
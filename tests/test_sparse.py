@@ -0,0 +1,70 @@
+"""
+MatriksCSR: bolak-balik dense <-> CSR dan similarity engine (blok CSR + dense)
+dibanding cosine berbobot langsung di matriks case vector.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.hot_paths import buat_profil
+from crscbr.engine import CaseBaseEngine
+from crscbr.schema import muat_atau_bangun_skema
+from crscbr.sparse import MatriksCSR
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def katalog():
+    path_case = os.path.join(ROOT, "case_vector_df_update1.pkl")
+    case_vector_df = pd.read_pickle(path_case)
+    final_df = pd.read_pickle(os.path.join(ROOT, "final_df_update1.pkl"))
+    schema = muat_atau_bangun_skema(path_case, case_vector_df, final_df)
+    return case_vector_df, final_df, CaseBaseEngine(case_vector_df, final_df, schema=schema)
+
+
+def test_csr_bolak_balik_dense():
+    rng = np.random.default_rng(0)
+    dense = np.where(rng.random((50, 12)) < 0.3, rng.random((50, 12)), 0).astype(np.float32)
+    dense[7] = 0  # baris kosong: jumlah non-zero per baris tidak seragam
+    csr = MatriksCSR.dari_dense(dense)
+    assert csr.slot is None
+    np.testing.assert_array_equal(csr.toarray(), dense)
+
+    indeks = np.array([3, 7, 0, 49, 3])
+    np.testing.assert_array_equal(csr.toarray(indeks), dense[indeks])
+    np.testing.assert_array_equal(csr.ambil_baris(indeks).toarray(), dense[indeks])
+    np.testing.assert_array_equal(csr.kolom(4), dense[:, 4] != 0)
+    np.testing.assert_array_equal(csr.kolom_dense(4), dense[:, 4])
+
+    vec = rng.random(12).astype(np.float32)
+    np.testing.assert_allclose(csr.matvec(vec), dense @ vec, rtol=1e-6)
+    np.testing.assert_allclose(csr.matvec(vec, indeks), dense[indeks] @ vec, rtol=1e-6)
+    np.testing.assert_allclose(csr.matvec(vec, kuadrat=True), (dense * dense) @ vec, rtol=1e-6)
+    koef = rng.random((12, 3)).astype(np.float32)
+    np.testing.assert_allclose(csr.matmat(koef, 10, 30), dense[10:30] @ koef, rtol=1e-6)
+
+
+def test_blok_onehot_engine_bolak_balik(katalog):
+    case_vector_df, _, engine = katalog
+    matrix = case_vector_df.to_numpy(dtype=np.float32)
+    onehot = engine.onehot
+    assert onehot.slot is not None  # satu non-zero per atribut kategori
+    kolom_onehot = np.setdiff1d(np.arange(matrix.shape[1]), engine.kolom_dense)
+    np.testing.assert_array_equal(onehot.toarray()[:, kolom_onehot], matrix[:, kolom_onehot])
+    np.testing.assert_array_equal(engine.dense, matrix[:, engine.kolom_dense])
+
+
+def test_similarity_sama_dengan_cosine_dense(katalog):
+    case_vector_df, final_df, engine = katalog
+    matrix = case_vector_df.to_numpy(dtype=np.float64)
+    for user_input, prioritas in buat_profil(final_df, 100, seed=2):
+        user_vec, weight_vec = engine.encode(user_input, prioritas)
+        uw = user_vec * weight_vec
+        xw = matrix * weight_vec
+        norma = np.linalg.norm(xw, axis=1) * np.linalg.norm(uw)
+        harapan = np.divide(xw @ uw, norma, out=np.zeros(len(matrix)), where=norma > 0)
+        np.testing.assert_allclose(engine.similarity(user_vec, weight_vec), harapan, atol=1e-6)
@@ -0,0 +1,82 @@
+"""
+Jalur offline WriteBehindQueue: baris yang gagal dikirim masuk journal, dikirim ulang
+begitu backend sehat, dan journal aman dipakai bersama thread/proses lain.
+"""
+import os
+import threading
+
+from crscbr.writer import FakeBackend, WriteBehindQueue
+
+
+def buat_queue(tmp_path, backend, **opsi):
+    opsi = {"flush_interval": 0.01, "max_retry": 2, "backoff": 0.001, **opsi}
+    return WriteBehindQueue(backend, journal_path=str(tmp_path / "journal.jsonl"), **opsi)
+
+
+def test_gagal_masuk_journal_lalu_dikirim_ulang(tmp_path):
+    backend = FakeBackend(gagal=True)
+    wq = buat_queue(tmp_path, backend).start(tutup_saat_keluar=False)
+    for i in range(5):
+        wq.kirim("ss", "cases", [i, "a"])
+    assert wq.flush(timeout=5)
+    assert wq.jumlah_journal() == 5
+    assert backend.get_all_values("ss", "cases") == []
+
+    backend.gagal = False
+    wq.kirim("ss", "cases", [5, "a"])
+    assert wq.flush(timeout=5)
+    wq.stop()
+    assert sorted(r[0] for r in backend.get_all_values("ss", "cases")) == list(range(6))
+    assert wq.jumlah_journal() == 0
+    assert sorted(os.listdir(tmp_path)) == ["journal.jsonl.lock"]
+
+
+def test_replay_gagal_dikembalikan_ke_journal(tmp_path):
+    backend = FakeBackend(gagal=True)
+    wq = buat_queue(tmp_path, backend)
+    wq._tulis_journal([("ss", "cases", [i]) for i in range(3)])
+    wq._replay_journal()
+    assert wq.jumlah_journal() == 3
+    assert [p for p in os.listdir(tmp_path) if ".kirim-" in p] == []
+
+
+def test_kirim_tidak_menunggu_replay(tmp_path):
+    """
+    Selama replay mengirim (backend lambat), kirim() dengan antrean penuh tetap bisa
+    menulis journal, dan baris itu tidak hilang ketika replay selesai.
+    """
+    mulai, lanjut = threading.Event(), threading.Event()
+
+    class BackendLambat(FakeBackend):
+        def append_rows(self, spreadsheet_id, sheet_name, rows):
+            mulai.set()
+            lanjut.wait(5)
+            super().append_rows(spreadsheet_id, sheet_name, rows)
+
+    backend = BackendLambat(gagal=True)
+    wq = buat_queue(tmp_path, backend, maxsize=1)
+    wq._tulis_journal([("ss", "cases", [i]) for i in range(3)])
+    replay = threading.Thread(target=wq._replay_journal)
+    replay.start()
+    assert mulai.wait(5)
+
+    wq.kirim("ss", "cases", ["antre"])
+    wq.kirim("ss", "cases", ["penuh"])  # antrean penuh: langsung ke journal
+    assert wq.jumlah_journal() == 1
+    lanjut.set()
+    replay.join(5)
+
+    baris = sorted(str(item[2][0]) for item in wq._baca_journal())
+    assert baris == ["0", "1", "2", "penuh"]
+
+
+def test_kiriman_proses_mati_dipulihkan(tmp_path):
+    backend = FakeBackend()
+    wq = buat_queue(tmp_path, backend)
+    # Sisa replay proses yang crash (PID tidak ada lagi)
+    with open(wq.journal_path + ".kirim-999999999-abcd1234", "w", encoding="utf-8") as f:
+        f.write('["ss", "cases", [1]]\n')
+    wq._tulis_journal([("ss", "cases", [2])])
+    wq._replay_journal()
+    assert sorted(r[0] for r in backend.get_all_values("ss", "cases")) == [1, 2]
+    assert [p for p in os.listdir(tmp_path) if ".kirim-" in p] == []